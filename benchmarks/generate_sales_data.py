@@ -0,0 +1,153 @@
+import argparse
+import datetime
+import random
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+REGIONS = ["North", "South", "East", "West"]
+PRODUCT_NAMES = [
+    "Mouse", "Wireless Mouse", "Keyboard", "Mechanical Keyboard", "USB Cable", "Laptop",
+    "Laptop Charger", "Monitor", "Webcam", "Headphones", "External Hard Drive", "Phone",
+]
+BAD_ROW_KINDS = [
+    "missing_field", "zero_quantity", "negative_price", "bad_transaction_id",
+    "bad_customer_id", "bad_number", "empty_region",
+]
+WRITE_BATCH = 100_000
+
+
+def _format_amount(value, rng, comma_rate):
+    text = str(value)
+    if value >= 1000 and rng.random() < comma_rate:
+        text = f"{value:,}"
+    return text
+
+
+def generate_sales_file(
+    path,
+    rows,
+    seed=42,
+    customers=1000,
+    products=50,
+    regions=None,
+    start_date="2024-01-01",
+    days=365,
+    bad_row_rate=0.02,
+    duplicate_id_rate=0.01,
+    comma_rate=0.1,
+):
+    """
+    Writes a synthetic sales file in the pipe-delimited format of data/sales_data.txt.
+
+    Parameters:
+        path (str): file to write
+        rows (int): number of data lines (header excluded)
+        seed (int): random seed; the same arguments always produce the same file
+        customers (int): distinct CustomerIDs (C0001, ...)
+        products (int): distinct ProductIDs (P101, ...), each with a fixed name and base price
+        regions (list): region names (default: North, South, East, West)
+        start_date (str): first date, YYYY-MM-DD
+        days (int): number of distinct dates
+        bad_row_rate (float): share of rows broken in one of BAD_ROW_KINDS
+        duplicate_id_rate (float): share of rows reusing an earlier TransactionID
+        comma_rate (float): share of numbers >= 1000 written with thousands commas
+                            and of product names containing a comma
+
+    Returns:
+        dict: {'rows', 'bad_rows', 'duplicate_ids', 'bytes'}
+
+    Requirements:
+    - Stream the file in batches so 10^8 rows need constant memory
+    """
+
+    rng = random.Random(seed)
+    regions = regions or REGIONS
+    first_day = datetime.date.fromisoformat(start_date)
+    dates = [(first_day + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+    catalog = [
+        (
+            f"P{101 + i}",
+            PRODUCT_NAMES[i % len(PRODUCT_NAMES)] + (f" {i // len(PRODUCT_NAMES)}" if i >= len(PRODUCT_NAMES) else ""),
+            rng.choice([49, 99, 173, 523, 899, 1916, 2826, 4999, 12999, 45000]),
+        )
+        for i in range(products)
+    ]
+    id_width = max(3, len(str(rows)))
+
+    stats = {"rows": rows, "bad_rows": 0, "duplicate_ids": 0, "bytes": 0}
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(HEADER + "\n")
+        stats["bytes"] += len(HEADER) + 1
+        batch = []
+        for n in range(1, rows + 1):
+            txn_id = f"T{n:0{id_width}d}"
+            if n > 1 and rng.random() < duplicate_id_rate:
+                txn_id = f"T{rng.randint(1, n - 1):0{id_width}d}"
+                stats["duplicate_ids"] += 1
+
+            product_id, name, base_price = rng.choice(catalog)
+            if rng.random() < comma_rate:
+                name = name.replace(" ", ", ", 1) if " " in name else name + ", Standard"
+            fields = [
+                txn_id,
+                rng.choice(dates),
+                product_id,
+                name,
+                str(rng.randint(1, 20)),
+                _format_amount(base_price, rng, comma_rate),
+                f"C{rng.randint(1, customers):04d}",
+                rng.choice(regions),
+            ]
+
+            if rng.random() < bad_row_rate:
+                stats["bad_rows"] += 1
+                kind = rng.choice(BAD_ROW_KINDS)
+                if kind == "missing_field":
+                    fields.pop(rng.randrange(len(fields)))
+                elif kind == "zero_quantity":
+                    fields[4] = "0"
+                elif kind == "negative_price":
+                    fields[5] = f"-{fields[5]}"
+                elif kind == "bad_transaction_id":
+                    fields[0] = "X" + fields[0][1:]
+                elif kind == "bad_customer_id":
+                    fields[6] = fields[6][1:]
+                elif kind == "bad_number":
+                    fields[4] = "abc"
+                else:
+                    fields[7] = ""
+
+            batch.append("|".join(fields))
+            if len(batch) >= WRITE_BATCH:
+                text = "\n".join(batch) + "\n"
+                f.write(text)
+                stats["bytes"] += len(text.encode("utf-8"))
+                batch = []
+
+        if batch:
+            text = "\n".join(batch) + "\n"
+            f.write(text)
+            stats["bytes"] += len(text.encode("utf-8"))
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic pipe-delimited sales file")
+    parser.add_argument("output", help="file to write")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--bad-row-rate", type=float, default=0.02)
+    parser.add_argument("--duplicate-id-rate", type=float, default=0.01)
+    parser.add_argument("--comma-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    result = generate_sales_file(
+        args.output, args.rows, seed=args.seed, customers=args.customers, products=args.products,
+        days=args.days, bad_row_rate=args.bad_row_rate, duplicate_id_rate=args.duplicate_id_rate,
+        comma_rate=args.comma_rate,
+    )
+    print(f"Wrote {result['rows']:,} rows ({result['bad_rows']:,} bad, "
+          f"{result['duplicate_ids']:,} duplicate IDs, {result['bytes']:,} bytes) to {args.output}")
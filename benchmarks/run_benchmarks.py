@@ -0,0 +1,268 @@
+import argparse
+import contextlib
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate_sales_data import generate_sales_file
+from utils.file_handler import read_sales_data
+from utils.parse_transactions import parse_transactions
+from utils.validate_filter import validate_and_filter
+from utils.total_revenue import calculate_total_revenue
+from utils.region_wise_sales import region_wise_sales
+from utils.top_selling_products import top_selling_products
+from utils.customer_analysis import customer_analysis
+from utils.daily_sales_trend import daily_sales_trend
+from utils.peak_sales_day import find_peak_sales_day
+from utils.low_performing_products import low_performing_products
+from utils.sales_aggregator import analyze_sales
+from utils.api_handler import fetch_catalog, create_product_mapping, enrich_sales_data
+from utils.enriched_writer import save_enriched_data
+from utils.report_generator import generate_sales_report
+from utils.product_api_stub import start_product_api_stub
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+REGRESSION_THRESHOLD = 1.25
+
+
+def _stages(ctx):
+    """
+    Pipeline stages in order: (name, input rows, function returning output rows).
+
+    Each function reads its inputs from ctx and stores its output there.
+    """
+
+    def run(key, func, count=len):
+        def stage():
+            ctx[key] = func()
+            return count(ctx[key])
+        return stage
+
+    return [
+        ("read_sales_data", lambda: ctx["size"], run("raw", lambda: read_sales_data(ctx["data_file"]))),
+        ("parse_transactions", lambda: len(ctx["raw"]), run("transactions", lambda: parse_transactions(ctx["raw"]))),
+        ("validate_and_filter", lambda: len(ctx["transactions"]),
+         run("valid", lambda: validate_and_filter(ctx["transactions"])[0])),
+        ("calculate_total_revenue", lambda: len(ctx["valid"]),
+         run("total_revenue", lambda: calculate_total_revenue(ctx["valid"]), lambda _: 1)),
+        ("region_wise_sales", lambda: len(ctx["valid"]), run("region_stats", lambda: region_wise_sales(ctx["valid"]))),
+        ("top_selling_products", lambda: len(ctx["valid"]),
+         run("top_products", lambda: top_selling_products(ctx["valid"]))),
+        ("customer_analysis", lambda: len(ctx["valid"]), run("customer_stats", lambda: customer_analysis(ctx["valid"]))),
+        ("daily_sales_trend", lambda: len(ctx["valid"]), run("daily_stats", lambda: daily_sales_trend(ctx["valid"]))),
+        ("find_peak_sales_day", lambda: len(ctx["valid"]),
+         run("peak_day", lambda: find_peak_sales_day(ctx["valid"]), lambda _: 1)),
+        ("low_performing_products", lambda: len(ctx["valid"]),
+         run("low_products", lambda: low_performing_products(ctx["valid"]))),
+        ("analyze_sales", lambda: len(ctx["valid"]), run("analysis", lambda: analyze_sales(ctx["valid"]), lambda _: 1)),
+        ("fetch_catalog", lambda: 0,
+         run("product_mapping", lambda: create_product_mapping(fetch_catalog(base_url=ctx["api_url"])["products"]))),
+        ("enrich_sales_data", lambda: len(ctx["valid"]),
+         run("enriched", lambda: enrich_sales_data(ctx["valid"], ctx["product_mapping"]))),
+        ("save_enriched_data", lambda: len(ctx["enriched"]),
+         run("saved", lambda: save_enriched_data(ctx["enriched"], ctx["enriched_file"]), lambda _: len(ctx["enriched"]))),
+        ("save_enriched_gzip", lambda: len(ctx["enriched"]),
+         run("saved", lambda: save_enriched_data(ctx["enriched"], ctx["enriched_file"] + ".gz"),
+             lambda _: len(ctx["enriched"]))),
+        ("save_enriched_columnar", lambda: len(ctx["enriched"]),
+         run("saved", lambda: save_enriched_data(ctx["enriched"], ctx["enriched_file"] + ".bin"),
+             lambda _: len(ctx["enriched"]))),
+        ("generate_sales_report", lambda: len(ctx["valid"]),
+         run("report", lambda: generate_sales_report(
+             ctx["valid"], ctx["enriched"], ctx["report_file"], analysis=ctx["analysis"]
+         ), lambda _: 1)),
+    ]
+
+
+def measure(func, memory=True):
+    """
+    Runs func and returns (result, seconds, peak_bytes).
+
+    Time is measured without tracemalloc; when memory is True func is run a
+    second time under tracemalloc for the peak (None otherwise).
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def benchmark_size(size, workdir, api_url, seed=42, memory=True, generator_options=None):
+    """
+    Generates a file of size rows and measures every pipeline stage on it.
+
+    Returns:
+        list of result dictionaries:
+        {'size', 'stage', 'seconds', 'rows_in', 'rows_out', 'rows_per_sec', 'peak_bytes'}
+    """
+
+    data_file = os.path.join(workdir, f"sales_{size}.txt")
+    generate_sales_file(data_file, size, seed=seed, **(generator_options or {}))
+    ctx = {
+        "size": size,
+        "data_file": data_file,
+        "api_url": api_url,
+        "enriched_file": os.path.join(workdir, "data", "enriched_sales_data.txt"),
+        "report_file": os.path.join(workdir, "output", "sales_report.txt"),
+    }
+
+    results = []
+    for name, rows_in, stage in _stages(ctx):
+        # The pipeline functions print progress; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows_in = rows_in()
+            rows_out, seconds, peak = measure(stage, memory=memory)
+        results.append({
+            "size": size,
+            "stage": name,
+            "seconds": seconds,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "rows_per_sec": rows_in / seconds if seconds and rows_in else None,
+            "peak_bytes": peak,
+        })
+        print(format_result(results[-1]))
+
+    os.remove(data_file)
+    return results
+
+
+def format_result(result):
+    rate = f"{result['rows_per_sec']:>14,.0f}" if result["rows_per_sec"] else f"{'-':>14}"
+    peak = f"{result['peak_bytes'] / (1024 * 1024):>10,.1f}" if result["peak_bytes"] is not None else f"{'-':>10}"
+    return (
+        f"{result['size']:>11,}  {result['stage']:<24} {result['seconds']:>10.4f}  "
+        f"{rate}  {peak}"
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=None, seed=42, memory=True, generator_options=None):
+    """
+    Benchmarks every pipeline stage at every size, fully offline.
+
+    The product API is served by a local ProductAPIStub and all files are written
+    to a temporary working directory, so the repository's data/ and output/ are
+    never touched.
+
+    Returns:
+        dict: {'meta': {...}, 'results': [...]} ready to be saved as a baseline
+    """
+
+    sizes = sizes or DEFAULT_SIZES
+    stub = start_product_api_stub()
+    cwd = os.getcwd()
+    results = []
+
+    print(f"{'rows':>11}  {'stage':<24} {'seconds':>10}  {'rows/sec':>14}  {'peak MiB':>10}")
+    try:
+        with tempfile.TemporaryDirectory(prefix="sales_bench_") as workdir:
+            os.makedirs(os.path.join(workdir, "data"))
+            os.makedirs(os.path.join(workdir, "output"))
+            # enrich_sales_data() saves to data/enriched_sales_data.txt relative to the cwd
+            os.chdir(workdir)
+            for size in sizes:
+                results.extend(benchmark_size(size, workdir, stub.url, seed, memory, generator_options))
+    finally:
+        os.chdir(cwd)
+        stub.shutdown()
+
+    return {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "sizes": sizes,
+            "memory": memory,
+            "generator_options": generator_options or {},
+        },
+        "results": results,
+    }
+
+
+def save_baseline(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved benchmark results to {path}")
+
+
+def compare_with_baseline(report, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints the time ratio of every (size, stage) against a saved baseline.
+
+    Returns:
+        list of (size, stage, ratio) whose time grew by more than threshold
+    """
+
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["size"], r["stage"]): r for r in baseline["results"]}
+
+    regressions = []
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for result in report["results"]:
+        old = previous.get((result["size"], result["stage"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['size']:>11,}  {result['stage']:<24} {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append((result["size"], result["stage"], ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every sales pipeline stage on synthetic data")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated row counts (e.g. 1000,1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc run (halves the runtime on large sizes)")
+    parser.add_argument("--output", help="baseline file to write (default: benchmarks/baselines/<commit>.json)")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        seed=args.seed,
+        memory=not args.no_memory,
+        generator_options={"customers": args.customers, "products": args.products},
+    )
+    output = args.output or os.path.join(BASELINE_DIR, f"{report['meta']['commit'] or 'latest'}.json")
+    save_baseline(report, output)
+    if args.compare and compare_with_baseline(report, args.compare):
+        sys.exit(1)
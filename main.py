@@ -1,99 +1,538 @@
 import os
+import argparse
 from utils.file_handler import read_sales_data
-from utils.parse_transactions import parse_transactions
+from utils.parse_transactions import parse_transactions, parse_transactions_table
 from utils.validate_filter import validate_and_filter
-from utils.total_revenue import calculate_total_revenue
-from utils.region_wise_sales import region_wise_sales
-from utils.top_selling_products import top_selling_products
-from utils.customer_analysis import customer_analysis
-from utils.daily_sales_trend import daily_sales_trend
-from utils.peak_sales_day import find_peak_sales_day
-from utils.low_performing_products import low_performing_products
-from utils.api_handler import fetch_all_products, create_product_mapping, enrich_sales_data
+from utils.dedup import deduplicate, new_id_set, default_store_path, DEDUP_MODES, DEFAULT_CAPACITY
+from utils.sales_aggregator import analyze_sales
+from utils.api_handler import enrich_sales_data, new_join_stats
+from utils.enriched_writer import save_enriched_data, ENRICHED_FORMATS, ENRICHED_FILES
+from utils.catalog_cache import (
+    load_product_mapping,
+    format_cache_stats,
+    wait_for_revalidation,
+    CACHE_TTL,
+    REVALIDATION_GRACE,
+)
 from utils.report_generator import generate_sales_report
+from utils.transaction_table import TransactionTable
+from utils.stream_pipeline import stream_sales_analysis
+from utils.parallel_ingest import parallel_parse_transactions, parallel_sales_analysis
+from utils.checkpoint import incremental_sales_analysis
+from utils.shard_analysis import sharded_sales_analysis
+from utils.parse_cache import cached_parse_transactions
+from utils.scenarios import (
+    load_scenarios,
+    run_scenarios,
+    run_indexed_scenarios,
+    write_scenario_reports,
+    SCENARIO_REPORT_DIR,
+)
+from utils.task_graph import TaskGraph
+from utils.rollup_cube import build_rollup_cube, save_rollup_cube, CUBE_FILE
+from utils.instrumentation import (
+    stage,
+    start_instrumentation,
+    stop_instrumentation,
+    get_instrumentation,
+    PROFILE_DIR,
+)
 
-def main():
+DATA_FILE = "data/sales_data.txt"
+REPORT_FILE = "output/sales_report.txt"
+
+
+def parse_args(argv=None):
     """
-    Main execution function
+    Parses command line options.
+    """
+    parser = argparse.ArgumentParser(description="Sales Analytics System")
+    parser.add_argument("--scenarios", metavar="FILE",
+                        help="JSON list of filter scenarios, all analyzed in one pass with one report each")
+    parser.add_argument("--scenario-index", action="store_true",
+                        help="with --scenarios: load the rows into memory, index them by region and "
+                             "amount once, and answer each scenario from the index")
+    parser.add_argument("--stream", action="store_true",
+                        help="process the file in one lazy pass with constant memory")
+    parser.add_argument("--columnar", action="store_true",
+                        help="keep parsed transactions in a columnar TransactionTable")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python",
+                        help="analysis backend for step [5/10] (numpy is vectorized)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for parsing (byte-range sharding)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="streaming mode that only processes lines appended since the last run")
+    parser.add_argument("--shards", metavar="DIR_OR_GLOB",
+                        help="analyze a directory (*.txt) or glob of shard files instead of the data file, "
+                             "one process per shard; unchanged shards reuse their saved partial aggregates")
+    parser.add_argument("--checkpoint", help="checkpoint file for --incremental (default: next to the data file)")
+    parser.add_argument("--parse-cache", action="store_true",
+                        help="reuse parsed data from a binary cache next to the data file")
+    parser.add_argument("--approx-distinct", type=float, metavar="ERROR",
+                        help="estimate daily unique customers with HyperLogLog sketches "
+                             "of this relative error (e.g. 0.02)")
+    parser.add_argument("--heavy-hitters", type=int, metavar="CAPACITY",
+                        help="track top products and customers with fixed-memory Space-Saving "
+                             "sketches of this capacity instead of exact totals")
+    parser.add_argument("--dedup", choices=DEDUP_MODES,
+                        help="drop rows whose TransactionID was already seen: exact (in-memory set, kept in an "
+                             "append-only log for --incremental and --shards) or "
+                             "bloom (bounded-memory Bloom filter, suspects confirmed in an on-disk store)")
+    parser.add_argument("--dedup-capacity", type=int, default=DEFAULT_CAPACITY, metavar="IDS",
+                        help="TransactionIDs the --dedup bloom filter is sized for (per shard with --shards)")
+    parser.add_argument("--enriched-format", choices=ENRICHED_FORMATS + ["none"], default="text",
+                        help="format of the enriched output file (none skips writing it); columnar is "
+                             "written from all rows at once, so it is not available with --stream")
+    parser.add_argument("--cube", nargs="?", const=CUBE_FILE, metavar="FILE",
+                        help="save a date x region x product rollup cube of the valid rows for "
+                             f"drill-down queries with python -m utils.rollup_cube (default: {CUBE_FILE})")
+    parser.add_argument("--offline", action="store_true",
+                        help="serve the product catalog from the local cache only")
+    parser.add_argument("--refresh-catalog", action="store_true",
+                        help="revalidate the cached product catalog now")
+    parser.add_argument("--catalog-ttl", type=float, default=CACHE_TTL,
+                        help="seconds a cached product catalog is used without revalidation")
+    parser.add_argument("--region", help="region filter (streaming mode)")
+    parser.add_argument("--min-amount", type=float, help="minimum amount filter (streaming mode)")
+    parser.add_argument("--max-amount", type=float, help="maximum amount filter (streaming mode)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="export per-stage metrics (JSON for .json files, line protocol otherwise)")
+    parser.add_argument("--metrics-format", choices=["json", "line"],
+                        help="format of --metrics-file (default: from the file extension)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record the tracemalloc peak of every stage (slower)")
+    parser.add_argument("--profile-stage", action="append", default=[], metavar="NAME",
+                        help="run a stage under cProfile (repeatable, 'all' for every stage)")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR,
+                        help="directory for the .prof files of --profile-stage")
+    return parser.parse_args(argv)
+
+
+def fetch_product_mapping(args):
+    """
+    Loads the product mapping through the local catalog cache (without printing)
+    """
+    return load_product_mapping(
+        ttl=args.catalog_ttl,
+        offline=args.offline,
+        force_refresh=args.refresh_catalog,
+    )
+
+
+def print_catalog_summary(product_mapping):
+    print(f"✓ Fetched {len(product_mapping)} products (catalog cache: {format_cache_stats()})")
+
+
+def load_catalog(args):
+    """
+    Loads the product mapping through the local catalog cache
+    """
+    product_mapping = fetch_product_mapping(args)
+    print_catalog_summary(product_mapping)
+    return product_mapping
+
+
+def enriched_output(args):
+    """
+    Returns the enriched output path for --enriched-format, or None if it is not written
+    """
+    return ENRICHED_FILES.get(args.enriched_format)
+
+
+def report_error(e):
+    """
+    Prints an exception together with the pipeline stage it was raised in
+    """
+    recorder = get_instrumentation()
+    failed = recorder.failed_stage if recorder else None
+    if failed is None:
+        print(f"\n❌ An error occurred: {e}")
+    elif failed["parent"]:
+        print(f"\n❌ An error occurred in {failed['name']} (stage {failed['parent']}): {e}")
+    else:
+        print(f"\n❌ An error occurred in stage {failed['name']}: {e}")
+    print("Process terminated gracefully.")
+
+
+def finish_instrumentation(args):
+    """
+    Prints the per-stage summary table and exports it if requested
+    """
+    recorder = stop_instrumentation()
+    if recorder is None or not recorder.records:
+        return
+    print("\nStage timings:")
+    print(recorder.format_summary())
+    if args.metrics_file:
+        recorder.export(args.metrics_file, args.metrics_format)
+        print(f"✓ Metrics saved to: {args.metrics_file}")
+
+
+def run_streaming(args):
+    """
+    Streaming execution: one lazy pass from file to accumulators
     """
 
     try:
-        # Welcome message
         print("=======================================")
         print("        SALES ANALYTICS SYSTEM")
+        print("          (streaming mode)")
         print("=======================================")
 
-        # [1/10] Reading sales data
-        print("\n[1/10] Reading sales data...")
-        transactions_raw = read_sales_data("data/sales_data.txt")
-        print(f"✓ Successfully read {len(transactions_raw)} transactions")
+        # [1/4] The catalog is needed before the pass so rows can be enriched in flight
+        print("\n[1/4] Fetching product data from API...")
+        with stage("[1/4] fetch catalog"):
+            product_mapping = load_catalog(args)
+
+        # [2/4] Read, parse, validate, filter, enrich, save and analyze in one pass
+        print("\n[2/4] Streaming sales data...")
+        stream_kwargs = dict(
+            region=args.region,
+            min_amount=args.min_amount,
+            max_amount=args.max_amount,
+            product_mapping=product_mapping,
+            enriched_file=enriched_output(args),
+            enriched_format=args.enriched_format,
+            distinct_error=args.approx_distinct,
+            heavy_hitter_capacity=args.heavy_hitters,
+            dedup=args.dedup,
+            dedup_capacity=args.dedup_capacity,
+        )
+        with stage("[2/4] stream") as step:
+            if args.shards:
+                # Only shards without a matching partial are read; no enriched file is written
+                stream_kwargs.pop("enriched_file")
+                stream_kwargs.pop("enriched_format")
+                analysis, filter_summary, run_info = sharded_sales_analysis(
+                    args.shards, workers=args.workers if args.workers > 1 else None, **stream_kwargs
+                )
+                print(f"✓ {run_info['shards']} shards: processed {len(run_info['processed'])}, "
+                      f"reused {run_info['reused']} saved partials")
+                if run_info["rerun"]:
+                    print(f"✓ Re-aggregated {len(run_info['rerun'])} shards for duplicates of earlier shards")
+            elif args.incremental:
+                # The enriched file is only written by full passes
+                stream_kwargs.pop("enriched_file")
+                stream_kwargs.pop("enriched_format")
+                analysis, filter_summary, run_info = incremental_sales_analysis(
+                    DATA_FILE, args.checkpoint, **stream_kwargs
+                )
+                print(f"✓ {run_info['mode'].capitalize()} run ({run_info['reason']}): "
+                      f"processed {run_info['bytes_processed']:,} bytes")
+            elif args.workers > 1:
+                analysis, filter_summary = parallel_sales_analysis(DATA_FILE, workers=args.workers, **stream_kwargs)
+            else:
+                analysis, filter_summary = stream_sales_analysis(DATA_FILE, **stream_kwargs)
+            step["rows_in"] = filter_summary["total_input"]
+            step["rows_out"] = filter_summary["final_count"]
+        enrichment = analysis["enrichment"]
+        print(f"✓ Parsed {filter_summary['total_input']} records")
+        if args.dedup:
+            print(f"✓ Duplicates removed: {filter_summary['duplicates']}")
+        print(f"✓ Valid: {filter_summary['final_count']} | Invalid: {filter_summary['invalid']}")
+        print(f"✓ Enriched {enrichment['enriched_count']}/{enrichment['total']} transactions ({enrichment['success_rate']}%)")
+        if not (args.incremental or args.shards) and enriched_output(args):
+            print(f"✓ Saved to: {enriched_output(args)}")
+
+        # [3/4] Generating report
+        print("\n[3/4] Generating report...")
+        with stage("[3/4] report"):
+            generate_sales_report(None, None, REPORT_FILE, analysis=analysis)
+        print(f"✓ Report saved to: {REPORT_FILE}")
 
-        # [2/10] Parsing and cleaning data
-        print("\n[2/10] Parsing and cleaning data...")
+        # [4/4] Completion
+        print("\n[4/4] Process Complete!")
+        print("=======================================")
+
+    except Exception as e:
+        report_error(e)
+
+
+def load_unique_transactions(args):
+    """
+    Reads and parses the data file into memory (a TransactionTable with --columnar),
+    dropping repeated TransactionIDs with --dedup
+
+    Returns:
+        tuple: (transactions, duplicate_count), duplicate_count is None without --dedup
+    """
+    transactions_raw = read_sales_data(DATA_FILE)
+    if args.columnar:
+        transactions = parse_transactions_table(transactions_raw)
+    else:
         transactions = parse_transactions(transactions_raw)
+    if not args.dedup:
+        return transactions, None
+    store = default_store_path(DATA_FILE) if args.dedup == "bloom" else None
+    seen = new_id_set(args.dedup, store, args.dedup_capacity)
+    try:
+        return deduplicate(transactions, seen)
+    finally:
+        seen.close()
+
+
+def run_scenarios_batch(args):
+    """
+    Batch execution: every filter scenario from a JSON file in one pass, one report each
+    """
+
+    try:
+        print("=======================================")
+        print("        SALES ANALYTICS SYSTEM")
+        print("          (scenario batch)")
+        print("=======================================")
+
+        # [1/4] Scenarios and catalog are loaded once for all scenarios
+        print("\n[1/4] Loading scenarios and product data...")
+        with stage("[1/4] load"):
+            scenarios = load_scenarios(args.scenarios)
+            print(f"✓ Loaded {len(scenarios)} scenarios from {args.scenarios}")
+            product_mapping = load_catalog(args)
+
+        if args.scenario_index:
+            # [2/4] Rows are loaded and indexed once, each scenario is a lookup
+            print("\n[2/4] Indexing the data and analyzing all scenarios...")
+            with stage("[2/4] analyze"):
+                transactions, duplicates = load_unique_transactions(args)
+                results = run_indexed_scenarios(
+                    transactions,
+                    scenarios,
+                    product_mapping=product_mapping,
+                    backend=args.backend,
+                    distinct_error=args.approx_distinct,
+                    heavy_hitter_capacity=args.heavy_hitters,
+                    duplicates=duplicates,
+                )
+        else:
+            # [2/4] One pass over the data, each row routed to every matching scenario
+            print("\n[2/4] Analyzing all scenarios in one pass...")
+            with stage("[2/4] analyze"):
+                results = run_scenarios(
+                    DATA_FILE,
+                    scenarios,
+                    product_mapping=product_mapping,
+                    distinct_error=args.approx_distinct,
+                    heavy_hitter_capacity=args.heavy_hitters,
+                    dedup=args.dedup,
+                    dedup_capacity=args.dedup_capacity,
+                )
+        if args.dedup and results:
+            print(f"✓ Duplicates removed: {results[0][2]['duplicates']}")
+        for scenario, analysis, filter_summary in results:
+            print(f"✓ {scenario['name']}: {filter_summary['final_count']} transactions, "
+                  f"revenue ₹{analysis['total_revenue']:,.2f}")
+
+        # [3/4] Generating reports
+        print("\n[3/4] Generating reports...")
+        with stage("[3/4] reports"):
+            write_scenario_reports(results)
+        print(f"✓ {len(results)} reports saved to: {SCENARIO_REPORT_DIR}/")
+
+        # [4/4] Completion
+        print("\n[4/4] Process Complete!")
+        print("=======================================")
+
+    except Exception as e:
+        report_error(e)
+
+
+def main(argv=None):
+    """
+    Main execution function
+    """
+
+    args = parse_args(argv)
+    start_instrumentation(
+        trace_memory=args.trace_memory,
+        profile=True if "all" in args.profile_stage else args.profile_stage,
+        profile_dir=args.profile_dir,
+    )
+    try:
+        if args.scenarios:
+            run_scenarios_batch(args)
+        elif args.stream or args.incremental or args.shards:
+            run_streaming(args)
+        else:
+            run_pipeline(args)
+    finally:
+        # A stale catalog being revalidated gets a moment to update the cache, no more
+        wait_for_revalidation(REVALIDATION_GRACE)
+        finish_instrumentation(args)
+
+
+def run_pipeline(args):
+    """
+    Default execution: the interactive 10-step pipeline, run as a small task graph
+
+    Steps [1/10]-[4/10] run on the main thread (step 4 prompts for filters). The
+    network-bound catalog fetch [6/10] starts in the background at startup, analysis
+    [5/10] and enrichment [7/10] start as soon as their inputs are ready, and saving
+    [8/10] and the report [9/10] run side by side. Results, and anything the tasks
+    print, are shown in step order.
+    """
+
+    try:
+        with TaskGraph(capture_output=True) as graph:
+            run_pipeline_steps(args, graph)
+    except Exception as e:
+        report_error(e)
+
+
+def task_result(graph, name):
+    """
+    Waits for a graph task, prints what it printed while running, and returns its result
+    """
+    try:
+        return graph.result(name)
+    finally:
+        print(graph.output(name), end="")
+
+
+def run_pipeline_steps(args, graph):
+    """
+    Body of run_pipeline(); tasks are added to graph as their inputs become available
+    """
+
+    # Welcome message
+    print("=======================================")
+    print("        SALES ANALYTICS SYSTEM")
+    print("=======================================")
+
+    # [6/10] starts first: the catalog fetch overlaps reading, parsing and analysis
+    graph.add("[6/10] fetch catalog", lambda: fetch_product_mapping(args))
+
+    # [1/10] Reading sales data
+    print("\n[1/10] Reading sales data...")
+    with stage("[1/10] read") as step:
+        if args.parse_cache:
+            # Reading and parsing are skipped when the file is unchanged since the last run
+            transactions, lines_read, cache_status = cached_parse_transactions(DATA_FILE, workers=args.workers)
+            print(f"✓ Successfully read {lines_read} transactions (parse cache: {cache_status})")
+        elif args.workers > 1:
+            # Reading and parsing run together, one byte range per worker
+            transactions, lines_read = parallel_parse_transactions(DATA_FILE, workers=args.workers)
+            print(f"✓ Successfully read {lines_read} transactions")
+        else:
+            transactions_raw = read_sales_data(DATA_FILE)
+            lines_read = len(transactions_raw)
+            print(f"✓ Successfully read {lines_read} transactions")
+        step["rows_out"] = lines_read
+
+    # [2/10] Parsing and cleaning data
+    print("\n[2/10] Parsing and cleaning data...")
+    with stage("[2/10] parse", rows_in=lines_read) as step:
+        if args.parse_cache:
+            if not args.columnar:
+                transactions = transactions.to_records()
+        elif args.workers > 1:
+            if args.columnar:
+                transactions = TransactionTable.from_records(transactions)
+        elif args.columnar:
+            transactions = parse_transactions_table(transactions_raw)
+        else:
+            transactions = parse_transactions(transactions_raw)
+        step["rows_out"] = len(transactions)
         print(f"✓ Parsed {len(transactions)} records")
 
-        # [3/10] Filter Options Available
-        print("\n[3/10] Filter Options Available:")
+    # [3/10] Filter Options Available
+    print("\n[3/10] Filter Options Available:")
+    with stage("[3/10] filter options", rows_in=len(transactions)):
         regions = sorted(set(txn["Region"] for txn in transactions))
         amounts = [txn["UnitPrice"] for txn in transactions]
         print(f"Regions: {', '.join(regions)}")
         print(f"Amount Range: ₹{min(amounts)} - ₹{max(amounts)}")
 
-        # [4/10] Validating transactions
-        print("\n[4/10] Validating transactions...")
-        
-        choice = input("\nDo you want to filter data? (y/n): ").strip().lower()
-        if choice == "y":
-            region_choice = input("Enter region to filter (or press Enter to skip): ").strip()
-            min_amt = float(input("Enter minimum amount (or press Enter to skip): ").strip())
-            max_amt = float(input("Enter maximum amount (or press Enter to skip): ").strip())
-            valid_txns, invalid_count = validate_and_filter(transactions, region_choice, min_amt, max_amt)
-            print(f"✓ Valid: {len(valid_txns)} | Invalid: {invalid_count}")
-        else:
-            valid_txns, invalid_count = validate_and_filter(transactions)
-            print(f"✓ Valid: {len(valid_txns)} | Invalid: {invalid_count}")
-
-        # [5/10] Performing analysis
-        print("\n[5/10] Analyzing sales data...")
-        _ = calculate_total_revenue(valid_txns)
-        _ = region_wise_sales(valid_txns)
-        _ = top_selling_products(valid_txns)
-        _ = customer_analysis(valid_txns)
-        _ = daily_sales_trend(valid_txns)
-        _ = find_peak_sales_day(valid_txns)
-        _ = low_performing_products(valid_txns)
-        print("✓ Analysis complete")
-
-        # [6/10] Fetching product data
-        print("\n[6/10] Fetching product data from API...")
-        api_products = fetch_all_products()
-        product_mapping = create_product_mapping(api_products)
-        print(f"✓ Fetched {len(api_products)} products")
-
-        # [7/10] Enriching sales data
-        print("\n[7/10] Enriching sales data...")
-        enriched_txns = enrich_sales_data(valid_txns, product_mapping)
-        enriched_count = sum(1 for txn in enriched_txns if txn.get("API_Match"))
-        success_rate = round((enriched_count / len(enriched_txns)) * 100, 2) if enriched_txns else 0
-        print(f"✓ Enriched {enriched_count}/{len(enriched_txns)} transactions ({success_rate}%)")
-
-        # [8/10] Saving enriched data
-        print("\n[8/10] Saving enriched data...")
-        print("✓ Saved to: data/enriched_sales_data.txt")
-
-        # [9/10] Generating report
-        print("\n[9/10] Generating report...")
-        generate_sales_report(valid_txns, enriched_txns)
-        print("✓ Report saved to: output/sales_report.txt")
-
-        # [10/10] Completion
-        print("\n[10/10] Process Complete!")
-        print("=======================================")
+    # [4/10] Validating transactions
+    print("\n[4/10] Validating transactions...")
+    
+    # Prompts are answered before the stage starts so waiting for input is not timed
+    filters = ()
+    choice = input("\nDo you want to filter data? (y/n): ").strip().lower()
+    if choice == "y":
+        region_choice = input("Enter region to filter (or press Enter to skip): ").strip()
+        min_amt = float(input("Enter minimum amount (or press Enter to skip): ").strip())
+        max_amt = float(input("Enter maximum amount (or press Enter to skip): ").strip())
+        filters = (region_choice, min_amt, max_amt)
+    duplicates = None
+    if args.dedup:
+        with stage("[4/10] dedup", rows_in=len(transactions)) as step:
+            store = default_store_path(DATA_FILE) if args.dedup == "bloom" else None
+            seen = new_id_set(args.dedup, store, args.dedup_capacity)
+            try:
+                transactions, duplicates = deduplicate(transactions, seen)
+            finally:
+                seen.close()
+            step["rows_out"] = len(transactions)
+            print(f"✓ Duplicates removed: {duplicates}")
+    with stage("[4/10] validate", rows_in=len(transactions)) as step:
+        valid_txns, invalid_count = validate_and_filter(transactions, *filters)
+        step["rows_out"] = len(valid_txns)
+        print(f"✓ Valid: {len(valid_txns)} | Invalid: {invalid_count}")
 
-    except Exception as e:
-        print(f"\n❌ An error occurred: {e}")
-        print("Process terminated gracefully.")
+    # [5/10] and [7/10] only wait for the inputs they need
+    join_stats = new_join_stats()
+    graph.set_result("valid", valid_txns)
+    graph.add("[5/10] analyze", lambda valid: dict(analyze_sales(
+        valid,
+        backend=args.backend,
+        distinct_error=args.approx_distinct,
+        heavy_hitter_capacity=args.heavy_hitters,
+    ), duplicates=duplicates), "valid")
+    if args.cube:
+        graph.add("[5/10] cube", lambda valid: build_rollup_cube(
+            valid, distinct_error=args.approx_distinct
+        ), "valid")
+        graph.add("[5/10] save cube", lambda cube: save_rollup_cube(cube, args.cube), "[5/10] cube")
+    graph.add("[7/10] enrich", lambda valid, product_mapping: enrich_sales_data(
+        valid, product_mapping, stats=join_stats
+    ), "valid", "[6/10] fetch catalog")
+    # [8/10] and [9/10] both only read the enriched rows, so they run concurrently
+    enriched_file = enriched_output(args)
+    if enriched_file:
+        graph.add("[8/10] save", lambda enriched: save_enriched_data(
+            enriched, enriched_file, args.enriched_format
+        ), "[7/10] enrich")
+    graph.add("[9/10] report", lambda valid, enriched, analysis: generate_sales_report(
+        valid, enriched, REPORT_FILE, analysis=analysis
+    ), "valid", "[7/10] enrich", "[5/10] analyze")
+
+    # [5/10] Performing analysis
+    print("\n[5/10] Analyzing sales data...")
+    task_result(graph, "[5/10] analyze")
+    print("✓ Analysis complete")
+    if args.cube:
+        cube = task_result(graph, "[5/10] cube")
+        task_result(graph, "[5/10] save cube")
+        print(f"✓ Rollup cube of {len(cube)} cells saved to: {args.cube}")
+
+    # [6/10] Fetching product data
+    print("\n[6/10] Fetching product data from API...")
+    print_catalog_summary(task_result(graph, "[6/10] fetch catalog"))
+
+    # [7/10] Enriching sales data
+    print("\n[7/10] Enriching sales data...")
+    task_result(graph, "[7/10] enrich")
+    enriched_count = join_stats["matched_rows"]
+    success_rate = round((enriched_count / join_stats["rows"]) * 100, 2) if join_stats["rows"] else 0
+    print(f"✓ Enriched {enriched_count}/{join_stats['rows']} transactions ({success_rate}%)")
+    print(f"  Matched {join_stats['matched_products']}/{join_stats['distinct_products']} distinct products")
+
+    # [8/10] Saving enriched data
+    print("\n[8/10] Saving enriched data...")
+    if enriched_file:
+        task_result(graph, "[8/10] save")
+        print(f"✓ Saved to: {enriched_file}")
+    else:
+        print("✓ Skipped (--enriched-format none)")
+
+    # [9/10] Generating report
+    print("\n[9/10] Generating report...")
+    task_result(graph, "[9/10] report")
+    print(f"✓ Report saved to: {REPORT_FILE}")
+
+    # [10/10] Completion
+    print("\n[10/10] Process Complete!")
+    print("=======================================")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
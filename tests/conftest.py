@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+REGIONS = ["North", "South", "East", "West"]
+
+
+def make_sales_lines(rows=600, seed=7, duplicate_rate=0.1, invalid_rate=0.05):
+    """
+    Returns pipe-delimited sales lines (without header) with some repeated
+    TransactionIDs and some rows that fail validation.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for i in range(rows):
+        txn_id = f"T{rng.randrange(max(i, 1)):05d}" if i and rng.random() < duplicate_rate else f"T{i:05d}"
+        quantity = rng.randrange(1, 20)
+        if rng.random() < invalid_rate:
+            quantity = 0
+        lines.append("|".join([
+            txn_id,
+            f"2024-12-{rng.randrange(1, 29):02d}",
+            f"P{rng.randrange(101, 115)}",
+            f"Product {rng.randrange(101, 115)}",
+            str(quantity),
+            str(rng.randrange(50, 3000)),
+            f"C{rng.randrange(1, 40):03d}",
+            rng.choice(REGIONS),
+        ]))
+    return lines
+
+
+@pytest.fixture
+def sales_lines():
+    return make_sales_lines()
+
+
+@pytest.fixture
+def sales_file(tmp_path, sales_lines):
+    path = tmp_path / "sales_data.txt"
+    path.write_text("\n".join([HEADER, *sales_lines]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def product_mapping():
+    # Products 112-114 are missing so some rows stay unenriched
+    return {
+        pid: {"title": f"Product {pid}", "category": "misc", "brand": "Acme", "rating": 4.0}
+        for pid in range(101, 112)
+    }
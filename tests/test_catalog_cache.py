@@ -0,0 +1,128 @@
+import json
+import socket
+import time
+
+import pytest
+
+from utils import catalog_cache
+from utils.api_handler import fetch_catalog
+from utils.catalog_cache import load_product_mapping, _read_cache, _write_cache
+from utils.product_api_stub import start_product_api_stub
+
+URL = "http://127.0.0.1:9/products"
+MAPPING = {1: {"title": "Phone", "category": "smartphones", "brand": "Acme", "rating": 4.5}}
+
+
+def cache_entry(**changes):
+    entry = {
+        "source": URL,
+        "fetched_at": time.time(),
+        "pages": [{"skip": 0, "limit": 50, "etag": '"v1"', "last_modified": None}],
+        "product_count": 1,
+        "mapping": MAPPING,
+    }
+    entry.update(changes)
+    return entry
+
+
+def test_read_cache_round_trip(tmp_path):
+    cache_file = str(tmp_path / "catalog.json")
+    _write_cache(cache_file, cache_entry())
+    assert _read_cache(cache_file)["mapping"] == MAPPING
+
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    "[]",
+    '"a string"',
+    "{}",
+    json.dumps({k: v for k, v in cache_entry().items() if k != "mapping"}),
+    json.dumps(cache_entry(mapping=[1, 2])),
+    json.dumps(cache_entry(mapping={"P1": {}})),
+    json.dumps(cache_entry(mapping={"1": "Phone"})),
+    json.dumps(cache_entry(fetched_at="yesterday")),
+    json.dumps({k: v for k, v in cache_entry().items() if k != "fetched_at"}),
+    json.dumps(cache_entry(pages={"skip": 0})),
+    json.dumps(cache_entry(pages=[{"skip": "0", "limit": 50}])),
+    json.dumps(cache_entry(pages=[{"skip": 0, "limit": 50, "etag": 42}])),
+])
+def test_malformed_cache_is_a_miss(tmp_path, content):
+    cache_file = tmp_path / "catalog.json"
+    cache_file.write_text(content, encoding="utf-8")
+    assert _read_cache(str(cache_file)) is None
+    assert load_product_mapping(str(cache_file), offline=True, base_url=URL) == {}
+
+
+def test_stale_revalidation_does_not_block_exit(tmp_path):
+    # Accepts connections but never answers, like a hung endpoint
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    url = f"http://127.0.0.1:{server.getsockname()[1]}/products"
+    cache_file = str(tmp_path / "catalog.json")
+    _write_cache(cache_file, cache_entry(source=url, fetched_at=time.time() - 2 * catalog_cache.CACHE_TTL))
+
+    try:
+        started = time.monotonic()
+        assert load_product_mapping(cache_file, timeout=30, base_url=url) == MAPPING
+        assert time.monotonic() - started < 5
+        thread = catalog_cache._revalidation_thread
+        assert thread.is_alive() and thread.daemon
+        catalog_cache.wait_for_revalidation(0.1)
+        assert thread.is_alive()
+    finally:
+        server.close()
+
+
+@pytest.fixture
+def api():
+    server = start_product_api_stub(product_count=194)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_catalog_revalidates_every_page(api):
+    first = fetch_catalog(base_url=api.url, page_size=50)
+    assert [product["id"] for product in first["products"]] == list(range(1, 195))
+    assert [page["skip"] for page in first["pages"]] == [0, 50, 100, 150]
+
+    requests_before = api.request_count
+    again = fetch_catalog(pages=first["pages"], base_url=api.url, page_size=50)
+    assert again["not_modified"] and again["products"] is None
+    assert again["pages"] == first["pages"]
+    assert api.request_count - requests_before == len(first["pages"])
+
+
+def test_fetch_catalog_picks_up_a_change_on_a_later_page(api):
+    first = fetch_catalog(base_url=api.url, page_size=50)
+    api.products[180]["rating"] = 1.0
+
+    changed = fetch_catalog(pages=first["pages"], base_url=api.url, page_size=50)
+    assert not changed["not_modified"]
+    assert changed["products"] == fetch_catalog(base_url=api.url, page_size=50)["products"]
+    assert changed["products"][180]["rating"] == 1.0
+    assert changed["pages"][:3] == first["pages"][:3]
+    assert changed["pages"][3] != first["pages"][3]
+
+
+def test_fetch_catalog_picks_up_added_products(api):
+    first = fetch_catalog(base_url=api.url, page_size=50)
+    api.products.append(dict(api.products[0], id=195))
+
+    changed = fetch_catalog(pages=first["pages"], base_url=api.url, page_size=50)
+    assert not changed["not_modified"]
+    assert [product["id"] for product in changed["products"]] == list(range(1, 196))
+
+
+def test_stale_cache_revalidation_updates_the_mapping(api, tmp_path):
+    cache_file = str(tmp_path / "catalog.json")
+    assert len(load_product_mapping(cache_file, base_url=api.url)) == 194
+
+    api.products[180]["brand"] = "Changed"
+    assert load_product_mapping(cache_file, force_refresh=True, base_url=api.url)[181]["brand"] == "Changed"
+    assert _read_cache(cache_file)["mapping"][181]["brand"] == "Changed"
+
+    revalidated = catalog_cache.CACHE_STATS["revalidated"]
+    load_product_mapping(cache_file, force_refresh=True, base_url=api.url)
+    assert catalog_cache.CACHE_STATS["revalidated"] == revalidated + 1
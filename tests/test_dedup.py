@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from conftest import HEADER, make_sales_lines
+from utils.checkpoint import incremental_sales_analysis, default_checkpoint_path
+from utils.dedup import (
+    PackedKeySet,
+    ExactIdSet,
+    BloomIdSet,
+    new_id_set,
+    id_set_from_dict,
+    deduplicate,
+)
+from utils.parse_transactions import parse_transactions
+from utils.shard_analysis import sharded_sales_analysis
+from utils.stream_pipeline import stream_sales_analysis
+
+MODES = ["exact", "bloom"]
+
+
+def write_lines(path, lines, header=True):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join([HEADER, *lines] if header else lines) + "\n")
+
+
+def append_lines(path, lines):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def test_packed_key_set():
+    keys = PackedKeySet(bits=2)
+    values = [0, 1, 2**64 - 1, *range(1000, 6000, 7)]
+    assert all(keys.add(value) for value in values)
+    assert not any(keys.add(value) for value in values)
+    assert len(keys) == len(values)
+    assert all(value in keys for value in values)
+    assert 3 not in keys
+    assert sorted(keys) == sorted(values)
+    assert len(keys.slots) >= 1.5 * keys.count
+
+
+def test_exact_id_set_round_trip(tmp_path):
+    ids = ["T1", "T0001234", "T00012345", "", "\x00A", "A", "Tö", "T" * 40]
+    for store in (None, str(tmp_path / "ids.seen.log")):
+        seen = ExactIdSet(store=store)
+        assert all(seen.add(txn_id) for txn_id in ids)
+        assert not any(seen.add(txn_id) for txn_id in ids)
+        assert len(seen) == len(ids)
+        assert sorted(seen.iter_ids()) == sorted(ids)
+        saved = json.loads(json.dumps(seen.to_dict()))
+        seen.close()
+
+        restored = id_set_from_dict(saved)
+        assert sorted(restored.iter_ids()) == sorted(ids)
+        assert "T2" not in restored and "T0001234" in restored
+        restored.close()
+
+
+def test_exact_log_drops_ids_added_after_saving(tmp_path):
+    store = str(tmp_path / "ids.seen.log")
+    seen = new_id_set("exact", store)
+    seen.add("T1")
+    saved = seen.to_dict()
+    seen.add("T2")
+    seen.close()
+
+    restored = id_set_from_dict(saved)
+    assert "T1" in restored and "T2" not in restored
+    restored.close()
+
+
+def test_bloom_store_committed_after_saving_is_rejected(tmp_path):
+    store = str(tmp_path / "ids.seen.sqlite")
+    seen = new_id_set("bloom", store, capacity=100)
+    seen.add("T1")
+    saved = seen.to_dict()
+    seen.close()
+
+    # Reopening an unchanged store works, and closing it without new IDs keeps it valid
+    id_set_from_dict(saved).close()
+    restored = id_set_from_dict(saved)
+    assert "T1" in restored
+    restored.add("T2")
+    restored.close()
+
+    with pytest.raises(ValueError):
+        id_set_from_dict(saved)
+
+
+def test_exact_and_bloom_agree(tmp_path):
+    lines = make_sales_lines(rows=3000, duplicate_rate=0.3)
+    results = {}
+    for mode in MODES:
+        # A tiny bloom filter forces many false positives through the store
+        seen = new_id_set(mode, str(tmp_path / f"ids.{mode}"), capacity=50)
+        results[mode] = deduplicate(parse_transactions(lines), seen)
+        if mode == "bloom":
+            assert seen.false_positives > 0
+        seen.close()
+
+    assert results["exact"] == results["bloom"]
+    unique, duplicates = results["exact"]
+    assert duplicates > 0
+    assert len(unique) + duplicates == len(lines)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_incremental_round_trip(tmp_path, mode):
+    lines = make_sales_lines(rows=900, duplicate_rate=0.2)
+    data_file = str(tmp_path / "sales.txt")
+    write_lines(data_file, lines[:300])
+
+    for end in (300, 600, 900):
+        if end > 300:
+            # Later appends also re-deliver lines from earlier runs
+            append_lines(data_file, lines[end - 300:end] + lines[end - 350:end - 330])
+        analysis, summary, run_info = incremental_sales_analysis(data_file, dedup=mode, dedup_capacity=200)
+        # A copy, so the full run's bloom store does not replace the checkpointed one
+        reference_file = shutil.copy(data_file, str(tmp_path / "reference.txt"))
+        expected, expected_summary = stream_sales_analysis(reference_file, dedup=mode, dedup_capacity=200)
+        assert run_info["mode"] == ("full" if end == 300 else "incremental")
+        assert summary == expected_summary
+        assert analysis == expected
+        assert analysis["duplicates"] > 0
+
+
+def test_incremental_rebuilds_when_the_store_is_ahead(tmp_path):
+    data_file = str(tmp_path / "sales.txt")
+    write_lines(data_file, make_sales_lines(rows=200))
+    incremental_sales_analysis(data_file, dedup="bloom", dedup_capacity=50)
+
+    # A run that committed new IDs but crashed before saving its checkpoint
+    with open(default_checkpoint_path(data_file), encoding="utf-8") as f:
+        saved = json.load(f)["dedup"]
+    seen = BloomIdSet.from_dict(saved)
+    seen.add("T99999")
+    seen.close()
+
+    _, _, run_info = incremental_sales_analysis(data_file, dedup="bloom", dedup_capacity=50)
+    assert run_info["mode"] == "full"
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_cross_shard_duplicates(tmp_path, mode):
+    lines = make_sales_lines(rows=900, duplicate_rate=0.2)
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    # The last shard re-delivers lines of the first one
+    shards = [lines[:300], lines[300:600], lines[600:] + lines[100:150]]
+    for i, shard_lines in enumerate(shards):
+        write_lines(str(shard_dir / f"part-{i}.txt"), shard_lines)
+    combined = str(tmp_path / "all.txt")
+    write_lines(combined, [line for shard_lines in shards for line in shard_lines])
+
+    expected, expected_summary = stream_sales_analysis(combined, dedup=mode, dedup_capacity=200)
+    for _ in range(2):
+        # The second run reuses every partial
+        analysis, summary, run_info = sharded_sales_analysis(
+            str(shard_dir), workers=2, dedup=mode, dedup_capacity=200
+        )
+        assert summary == expected_summary
+        assert analysis == expected
+    assert run_info["reused"] == len(shards)
+    assert os.path.exists(str(shard_dir / "part-0.txt.partial.json"))
@@ -0,0 +1,79 @@
+from utils.api_handler import enrich_sales_data, iter_enrich_sales_data, new_join_stats, API_FIELDS
+from utils.parse_transactions import parse_transactions, parse_transactions_table
+from utils.transaction_table import TRANSACTION_FIELDS
+
+
+def expected_rows(sales_lines, product_mapping):
+    return list(iter_enrich_sales_data(parse_transactions(sales_lines), product_mapping))
+
+
+def test_list_input_behaves_like_a_list(sales_lines, product_mapping):
+    transactions = parse_transactions(sales_lines)
+    enriched = enrich_sales_data(transactions, product_mapping)
+    expected = expected_rows(sales_lines, product_mapping)
+
+    assert enriched == expected
+    assert expected == enriched
+    assert len(enriched) == len(expected)
+    assert enriched[3] == expected[3]
+    assert enriched[-1] == expected[-1]
+    assert enriched[10:20] == expected[10:20]
+    assert enriched[::7] == expected[::7]
+    assert list(enriched) == expected
+    assert [row.copy() for row in enriched] == expected
+    assert enriched != expected[:-1]
+
+
+def test_list_input_is_not_modified(sales_lines, product_mapping):
+    transactions = parse_transactions(sales_lines)
+    enrich_sales_data(transactions, product_mapping)
+    assert transactions == parse_transactions(sales_lines)
+    assert all(set(txn) == set(TRANSACTION_FIELDS) for txn in transactions)
+
+
+def test_table_input_returns_a_new_table(sales_lines, product_mapping):
+    table = parse_transactions_table(sales_lines)
+    columns_before = dict(table.columns)
+    enriched = enrich_sales_data(table, product_mapping)
+
+    assert enriched is not table
+    assert table.columns == columns_before
+    assert not any(name in table.columns for name in API_FIELDS)
+    assert all(enriched.columns[name] is column for name, column in columns_before.items())
+    assert [dict(row) for row in enriched] == expected_rows(sales_lines, product_mapping)
+
+
+def test_join_stats_agree(sales_lines, product_mapping):
+    list_stats, table_stats, stream_stats = new_join_stats(), new_join_stats(), new_join_stats()
+    enrich_sales_data(parse_transactions(sales_lines), product_mapping, stats=list_stats)
+    enrich_sales_data(parse_transactions_table(sales_lines), product_mapping, stats=table_stats)
+    for _ in iter_enrich_sales_data(parse_transactions(sales_lines), product_mapping, stats=stream_stats):
+        pass
+    assert list_stats == table_stats == stream_stats
+    assert 0 < list_stats["matched_rows"] < list_stats["rows"]
+
+
+def not_enriched_lines(report_file):
+    lines = open(report_file, encoding="utf-8").read().split("\n")
+    start = lines.index("Products Not Enriched:") + 1
+    end = lines.index("", start)
+    return [line.strip() for line in lines[start:end]]
+
+
+def test_report_lists_one_line_per_unmatched_row(tmp_path, sales_file, sales_lines, product_mapping):
+    from utils.report_generator import generate_sales_report
+    from utils.stream_pipeline import stream_sales_analysis
+    from utils.validate_filter import validate_and_filter
+
+    valid, _ = validate_and_filter(parse_transactions(sales_lines))
+    enriched = enrich_sales_data(valid, product_mapping)
+    unmatched = [txn["ProductID"] for txn in enriched if not txn["API_Match"]]
+
+    default_report = str(tmp_path / "default.txt")
+    generate_sales_report(valid, enriched, default_report)
+    assert not_enriched_lines(default_report) == unmatched
+
+    analysis, _ = stream_sales_analysis(sales_file, product_mapping=product_mapping)
+    stream_report = str(tmp_path / "stream.txt")
+    generate_sales_report(None, None, stream_report, analysis=analysis)
+    assert sorted(not_enriched_lines(stream_report)) == sorted(unmatched)
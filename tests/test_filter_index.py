@@ -0,0 +1,84 @@
+import pytest
+
+from utils.filter_index import FilterIndex
+from utils.parse_transactions import parse_transactions, parse_transactions_table
+from utils.scenarios import run_scenarios, run_indexed_scenarios
+from utils.dedup import new_id_set, deduplicate
+from utils.validate_filter import validate_and_filter, iter_validate_and_filter
+
+FILTERS = [
+    (None, None, None),
+    ("North", None, None),
+    ("South", 1000.0, None),
+    (None, None, 5000.0),
+    ("East", 2000.0, 20000.0),
+    ("West", 999999.0, None),
+    ("Nowhere", None, None),
+]
+
+SCENARIOS = [
+    {"name": f"s{i}", "region": region, "min_amount": min_amount, "max_amount": max_amount}
+    for i, (region, min_amount, max_amount) in enumerate(FILTERS)
+]
+
+
+@pytest.fixture(params=["records", "table"])
+def transactions(request, sales_lines):
+    if request.param == "table":
+        return parse_transactions_table(sales_lines)
+    return parse_transactions(sales_lines)
+
+
+def as_records(rows):
+    return [dict(txn) for txn in rows]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_select_matches_validate_and_filter(transactions, filters):
+    index = FilterIndex(transactions)
+    rows, summary = index.select(*filters)
+    expected, invalid_count = validate_and_filter(transactions, *filters)
+
+    assert as_records(rows) == as_records(expected)
+    assert type(rows) is type(expected)
+    assert summary["invalid"] == invalid_count
+
+    expected_summary = {}
+    for _ in iter_validate_and_filter(transactions, *filters, summary=expected_summary):
+        pass
+    assert summary == expected_summary
+
+
+def test_count_region(transactions):
+    index = FilterIndex(transactions)
+    valid, _ = validate_and_filter(transactions)
+    assert index.count_region() == len(valid)
+    for region in index.regions:
+        assert index.count_region(region) == len(validate_and_filter(transactions, region)[0])
+    assert index.count_region("Nowhere") == 0
+
+
+def test_amount_range(transactions):
+    index = FilterIndex(transactions)
+    amounts = [txn["Quantity"] * txn["UnitPrice"] for txn in validate_and_filter(transactions)[0]]
+    assert index.amount_range == (min(amounts), max(amounts))
+    assert FilterIndex([]).amount_range is None
+
+
+@pytest.mark.parametrize("dedup", [None, "exact"])
+def test_indexed_scenarios_match_run_scenarios(sales_file, sales_lines, product_mapping, dedup):
+    expected = run_scenarios(sales_file, SCENARIOS, product_mapping=product_mapping, dedup=dedup)
+
+    transactions, duplicates = parse_transactions_table(sales_lines), None
+    if dedup:
+        seen = new_id_set(dedup)
+        transactions, duplicates = deduplicate(transactions, seen)
+        seen.close()
+    results = run_indexed_scenarios(
+        transactions, SCENARIOS, product_mapping=product_mapping, duplicates=duplicates
+    )
+
+    assert [scenario for scenario, _, _ in results] == SCENARIOS
+    for (_, analysis, summary), (_, expected_analysis, expected_summary) in zip(results, expected):
+        assert summary == expected_summary
+        assert analysis == expected_analysis
@@ -1,16 +1,197 @@
-import requests
+import os
 import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from operator import methodcaller
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.transaction_table import TransactionTable, EncodedColumn, EnrichedRows
+from utils.enriched_writer import ENRICHED_HEADER, format_enriched_row, save_enriched_data
+from utils.instrumentation import instrumented
 
 # ============================================================
 # Task 3.1: Fetch Product Details
 # ============================================================
 
-BASE_URL = "https://dummyjson.com/products"
+BASE_URL = os.environ.get("SALES_API_URL", "https://dummyjson.com/products")
+REQUEST_TIMEOUT = 10  # seconds, per request
+PAGE_SIZE = 50
+MAX_CONCURRENT_REQUESTS = 8
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5  # seconds, doubled after each retry
+
+
+def clean_products(products):
+    """
+    Keeps only the product fields used by the application.
+    """
+    return [
+        {
+            "id": p["id"],
+            "title": p["title"],
+            "category": p["category"],
+            "brand": p.get("brand", ""),
+            "price": p["price"],
+            "rating": p["rating"],
+        }
+        for p in products
+    ]
+
+
+def create_session(pool_size=MAX_CONCURRENT_REQUESTS, retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+    """
+    Creates a pooled HTTP session with bounded retries and exponential backoff.
+
+    Parameters:
+        pool_size (int): connections kept open to the API host
+        retries (int): retries per request on connection errors and 429/5xx responses
+        backoff (float): backoff factor in seconds (0.5 -> 0.5s, 1s, 2s, ...)
 
-def fetch_all_products():
+    Returns:
+        requests.Session
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _fetch_page(session, base_url, skip, limit, timeout, headers=None):
+    response = session.get(
+        base_url, params={"limit": limit, "skip": skip}, headers=headers, timeout=timeout
+    )
+    if response.status_code == 304:
+        return response, None
+    response.raise_for_status()
+    return response, response.json()
+
+
+def _conditional_headers(validators):
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+@instrumented(rows_out=lambda result: len(result["products"] or ()))
+def fetch_catalog(
+    pages=None,
+    timeout=REQUEST_TIMEOUT,
+    page_size=PAGE_SIZE,
+    max_workers=MAX_CONCURRENT_REQUESTS,
+    base_url=None,
+    session=None,
+):
+    """
+    Fetches the whole product catalog page by page, optionally revalidating a cached copy.
+
+    Parameters:
+        pages (list): page validators of a cached copy, from a previous result (optional);
+                      each page is requested with its own If-None-Match / If-Modified-Since
+        timeout (float): timeout in seconds for each request
+        page_size (int): products requested per page (limit)
+        max_workers (int): maximum number of page requests in flight
+        base_url (str): products endpoint (default: BASE_URL, or $SALES_API_URL)
+        session (requests.Session): pooled session to reuse (default: create_session())
+
+    Returns:
+        dict in format:
+        {
+            'not_modified': False,      # True if every page answered 304, products is then None
+            'products': [...],          # cleaned product dictionaries, in catalog order
+            'pages': [                  # validators of each page, stored with the copy
+                {'skip': 0, 'limit': 50, 'etag': '"abc"', 'last_modified': 'Tue, ...'},
+                ...
+            ]
+        }
+
+    Requirements:
+    - Read 'total' from the first page, then request the remaining skip offsets
+      concurrently over one connection pool
+    - Revalidate every page of a cached copy: the copy is current only if no page
+      changed; otherwise the unchanged pages are fetched again and merged with the
+      changed ones
+
+    Raises:
+        requests.RequestException on connection errors, timeouts and HTTP errors
+        that persist after retries
+    """
+
+    base_url = base_url or BASE_URL
+    cached = {(page["skip"], page["limit"]): page for page in pages or ()}
+
+    own_session = session is None
+    if own_session:
+        session = create_session(pool_size=max_workers)
+
+    def fetch(skip, limit, conditional=True):
+        headers = _conditional_headers(cached.get((skip, limit))) if conditional else None
+        response, page = _fetch_page(session, base_url, skip, limit, timeout, headers)
+        return skip, limit, response, page
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = [fetch(0, page_size)]
+            first_page = results[0][3]
+            if first_page is None:
+                # The first page carries 'total', so the cached copy has the same pages
+                rest = [(page["skip"], page["limit"]) for page in pages[1:]]
+            else:
+                products = first_page.get("products", [])
+                total = first_page.get("total", len(products))
+                # The server may cap the page size, so step by what it actually returned
+                step = len(products) or page_size
+                rest = [(skip, step) for skip in range(step, total, step)]
+            results.extend(executor.map(lambda args: fetch(*args), rest))
+
+            unchanged = [i for i, (*_, page) in enumerate(results) if page is None]
+            if len(unchanged) == len(results):
+                return {"not_modified": True, "products": None, "pages": pages}
+            # Some page changed: the 304 pages have no body, so fetch them again
+            refetched = executor.map(lambda i: fetch(*results[i][:2], conditional=False), unchanged)
+            for i, result in zip(unchanged, refetched):
+                results[i] = result
+    finally:
+        if own_session:
+            session.close()
+
+    return {
+        "not_modified": False,
+        "products": clean_products([product for *_, page in results for product in page.get("products", [])]),
+        "pages": [
+            {
+                "skip": skip,
+                "limit": limit,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            for skip, limit, response, _ in results
+        ],
+    }
+
+
+def fetch_all_products(timeout=REQUEST_TIMEOUT, page_size=PAGE_SIZE, max_workers=MAX_CONCURRENT_REQUESTS):
     """
     Fetches all products from DummyJSON API.
 
+    Parameters:
+        timeout (float): timeout in seconds for each request (default=10)
+        page_size (int): products requested per page (default=50)
+        max_workers (int): maximum number of page requests in flight (default=8)
+
     Returns:
         list of product dictionaries in format:
         [
@@ -26,32 +207,14 @@ def fetch_all_products():
         ]
 
     Requirements:
-    - Fetch all available products (use limit=120 to be able to map with product ID)
+    - Fetch all available products by paging through the catalog with skip/limit
     - Handle connection errors with try-except
     - Return empty list if API fails
     - Print status message (success/failure)
-    - Increased limit from 100 to 120 to ensure product ID match
     """
     try:
-        response = requests.get(f"{BASE_URL}?limit=120")
-        response.raise_for_status()
-        data = response.json()
-        products = data.get("products", [])
-        print(f"Successfully fetched {len(products)} products.")
-
-        # Extract only required fields
-        cleaned_products = [
-            {
-                "id": p["id"],
-                "title": p["title"],
-                "category": p["category"],
-                "brand": p.get("brand", ""),
-                "price": p["price"],
-                "rating": p["rating"],
-            }
-            for p in products
-        ]
-
+        cleaned_products = fetch_catalog(timeout=timeout, page_size=page_size, max_workers=max_workers)["products"]
+        print(f"Successfully fetched {len(cleaned_products)} products.")
         print(f"Successfully cleaned {len(cleaned_products)} products.")
         return cleaned_products
 
@@ -92,105 +255,195 @@ def create_product_mapping(api_products):
 # Task 3.2: Enrich Sales Data
 # ============================================================
 
-def enrich_sales_data(transactions, product_mapping):
+API_FIELDS = ["API_Category", "API_Brand", "API_Rating", "API_Match"]
+
+
+def match_product(product_id, product_mapping):
     """
-    Enriches transaction data with API product information.
+    Looks up the API fields for one ProductID.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        product_id (str): ProductID such as 'P101'
         product_mapping (dict): dictionary from create_product_mapping()
 
     Returns:
-        list of enriched transaction dictionaries
+        tuple: (API_Category, API_Brand, API_Rating, API_Match)
+    """
 
-    Enrichment Logic:
-    - Extract numeric ID from ProductID (P101 → 101, P5 → 5)
-    - If ID exists in product_mapping, add API fields
-    - If ID doesn't exist, set API_Match to False and other fields to None
-    - Handle all errors gracefully
-    - Save enriched data to 'data/enriched_sales_data.txt'
+    try:
+        # Extract numeric ID from ProductID (e.g., P101 -> 101)
+        match = re.search(r"\d+", product_id)
+        product_id_num = int(match.group()) if match else None
+
+        if product_id_num and product_id_num in product_mapping:
+            api_info = product_mapping[product_id_num]
+            return (api_info.get("category"), api_info.get("brand"), api_info.get("rating"), True)
+
+    except Exception:
+        # Graceful error handling
+        pass
+
+    return (None, None, None, False)
+
+
+def new_join_stats():
+    """
+    Creates empty enrichment join statistics.
+
+    Returns:
+        dict in format:
+        {
+            'rows': 0,                  # rows enriched
+            'matched_rows': 0,          # rows with API_Match True
+            'distinct_products': 0,     # distinct ProductIDs looked up
+            'matched_products': 0,      # distinct ProductIDs found in the catalog
+            'unmatched_products': []    # distinct ProductIDs not found, first-seen order
+        }
     """
+    return {
+        "rows": 0,
+        "matched_rows": 0,
+        "distinct_products": 0,
+        "matched_products": 0,
+        "unmatched_products": [],
+    }
 
-    enriched_transactions = []
 
-    for txn in transactions:
-        enriched_txn = txn.copy()
-
-        try:
-            # Extract numeric ID from ProductID (e.g., P101 -> 101)
-            match = re.search(r"\d+", txn["ProductID"])
-            product_id_num = int(match.group()) if match else None
-
-            if product_id_num and product_id_num in product_mapping:
-                api_info = product_mapping[product_id_num]
-                enriched_txn["API_Category"] = api_info.get("category")
-                enriched_txn["API_Brand"] = api_info.get("brand")
-                enriched_txn["API_Rating"] = api_info.get("rating")
-                enriched_txn["API_Match"] = True
-            else:
-                enriched_txn["API_Category"] = None
-                enriched_txn["API_Brand"] = None
-                enriched_txn["API_Rating"] = None
-                enriched_txn["API_Match"] = False
+def _add_join_key(stats, product_id, fields):
+    stats["distinct_products"] += 1
+    if fields["API_Match"]:
+        stats["matched_products"] += 1
+    else:
+        stats["unmatched_products"].append(product_id)
 
-        except Exception:
-            # Graceful error handling
-            enriched_txn["API_Category"] = None
-            enriched_txn["API_Brand"] = None
-            enriched_txn["API_Rating"] = None
-            enriched_txn["API_Match"] = False
 
-        enriched_transactions.append(enriched_txn)
+def iter_enrich_sales_data(transactions, product_mapping, stats=None):
+    """
+    Lazily enriches transactions with API product information (hash join on ProductID).
 
-    # Save enriched data to file
-    save_enriched_data(enriched_transactions)
+    Meant for rows the caller owns, such as freshly parsed streaming rows: each
+    row gets the API fields added in place instead of being copied.
 
-    return enriched_transactions
+    Parameters:
+        transactions (iterable): transaction dictionaries, updated in place
+        product_mapping (dict): dictionary from create_product_mapping()
+        stats (dict): join statistics from new_join_stats(), updated in place (optional)
 
+    Yields:
+        the same transaction dictionaries with the API fields added
 
-def save_enriched_data(enriched_transactions, filename="data/enriched_sales_data.txt"):
+    Requirements:
+    - Resolve each distinct ProductID against the catalog once
+    - Add the shared fields with one update per row, without regex or copies
     """
-    Saves enriched transactions back to file.
 
-    Expected File Format:
-    TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region|API_Category|API_Brand|API_Rating|API_Match
+    if stats is None:
+        stats = new_join_stats()
+    index = {}
+
+    for txn in transactions:
+        product_id = txn.get("ProductID")
+        fields = index.get(product_id)
+        if fields is None:
+            fields = index[product_id] = dict(zip(API_FIELDS, match_product(product_id, product_mapping)))
+            _add_join_key(stats, product_id, fields)
+
+        stats["rows"] += 1
+        if fields["API_Match"]:
+            stats["matched_rows"] += 1
+        txn.update(fields)
+        yield txn
+
+
+@instrumented()
+def enrich_sales_table(table, product_mapping, stats=None):
+    """
+    Enriches a TransactionTable with the API_* columns.
+
+    Parameters:
+        table (TransactionTable): parsed transactions, left unchanged
+        product_mapping (dict): dictionary from create_product_mapping()
+        stats (dict): join statistics from new_join_stats(), updated in place (optional)
+
+    Returns:
+        TransactionTable: a new table sharing the columns of table, plus
+        API_Category, API_Brand, API_Rating and API_Match columns
 
     Requirements:
-    - Create output file with all original + new fields
-    - Use pipe delimiter
-    - Handle None values appropriately
+    - Same matching rules as iter_enrich_sales_data()
+    - Add columns instead of copying rows, and never modify table: other
+      steps may be reading it concurrently
+    - Look up each distinct ProductID once
     """
 
-    header = [
-        "TransactionID", "Date", "ProductID", "ProductName",
-        "Quantity", "UnitPrice", "CustomerID", "Region",
-        "API_Category", "API_Brand", "API_Rating", "API_Match"
-    ]
+    if stats is None:
+        stats = new_join_stats()
+
+    product_column = table.columns["ProductID"]
+    rows_per_code = [0] * len(product_column.values)
+    for code in product_column.codes:
+        rows_per_code[code] += 1
+
+    matches = []
+    for code, product_id in enumerate(product_column.values):
+        match = match_product(product_id, product_mapping)
+        matches.append(match)
+        if rows_per_code[code]:
+            _add_join_key(stats, product_id, dict(zip(API_FIELDS, match)))
+            stats["rows"] += rows_per_code[code]
+            if match[-1]:
+                stats["matched_rows"] += rows_per_code[code]
+
+    enriched = TransactionTable(dict(table.columns))
+    for position, name in enumerate(API_FIELDS):
+        column = EncodedColumn()
+        # API code for each ProductID code, then one array lookup per row
+        code_map = [column.encode(match[position]) for match in matches]
+        column.codes.extend(code_map[code] for code in product_column.codes)
+        enriched.add_column(name, column)
+
+    return enriched
+
+
+@instrumented()
+def enrich_sales_data(transactions, product_mapping, stats=None):
+    """
+    Enriches transaction data with API product information.
 
-    try:
-        with open(filename, "w", encoding="utf-8") as f:
-            # Write header
-            f.write("|".join(header) + "\n")
-
-            # Write each transaction
-            for txn in enriched_transactions:
-                row = [
-                    str(txn.get("TransactionID", "")),
-                    str(txn.get("Date", "")),
-                    str(txn.get("ProductID", "")),
-                    str(txn.get("ProductName", "")),
-                    str(txn.get("Quantity", "")),
-                    str(txn.get("UnitPrice", "")),
-                    str(txn.get("CustomerID", "")),
-                    str(txn.get("Region", "")),
-                    str(txn.get("API_Category", "")) if txn.get("API_Category") is not None else "",
-                    str(txn.get("API_Brand", "")) if txn.get("API_Brand") is not None else "",
-                    str(txn.get("API_Rating", "")) if txn.get("API_Rating") is not None else "",
-                    str(txn.get("API_Match", "")),
-                ]
-                f.write("|".join(row) + "\n")
-
-        print(f"Enriched data successfully saved to {filename}")
+    Parameters:
+        transactions (list): list of transaction dictionaries or a TransactionTable
+        product_mapping (dict): dictionary from create_product_mapping()
+        stats (dict): join statistics from new_join_stats(), updated in place (optional)
 
-    except Exception as e:
-        print(f"Failed to save enriched data: {e}")
\ No newline at end of file
+    Returns:
+        list-like sequence of enriched transaction dictionaries: an EnrichedRows
+        view that supports len(), indexing, slicing and == with a list of
+        dictionaries, but is read-only (list(...) copies it into a real list);
+        for a TransactionTable, a new table with the API_* columns added
+
+    Enrichment Logic:
+    - Extract numeric ID from ProductID (P101 → 101, P5 → 5)
+    - If ID exists in product_mapping, add API fields
+    - If ID doesn't exist, set API_Match to False and other fields to None
+    - Handle all errors gracefully
+    - Do not write anything: saving is a separate step (save_enriched_data())
+    - Look up each distinct ProductID once and copy no rows: the rows are only
+      counted per ProductID, and the API fields are attached when rows are read
+    """
+
+    if isinstance(transactions, TransactionTable):
+        return enrich_sales_table(transactions, product_mapping, stats)
+
+    if stats is None:
+        stats = new_join_stats()
+
+    fields = {}
+    for product_id, rows in Counter(map(methodcaller("get", "ProductID"), transactions)).items():
+        match = match_product(product_id, product_mapping)
+        fields[product_id] = dict(zip(API_FIELDS, match))
+        _add_join_key(stats, product_id, fields[product_id])
+        stats["rows"] += rows
+        if match[-1]:
+            stats["matched_rows"] += rows
+
+    return EnrichedRows(transactions, fields)
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+
+from utils.api_handler import fetch_catalog, create_product_mapping, BASE_URL, REQUEST_TIMEOUT
+from utils.instrumentation import instrumented
+
+CACHE_FILE = "data/.cache/product_catalog.json"
+CACHE_TTL = 24 * 60 * 60            # serve without revalidation for 1 day
+STALE_TTL = 7 * 24 * 60 * 60        # serve stale while revalidating for up to 7 days
+REVALIDATION_GRACE = 5.0            # seconds a background revalidation may delay exit
+
+# Per-process counters: hit, miss, stale, revalidated (304), refreshed (200), offline, error
+CACHE_STATS = {
+    "hit": 0, "miss": 0, "stale": 0, "revalidated": 0, "refreshed": 0, "offline": 0, "error": 0
+}
+
+_revalidation_thread = None
+
+
+def _valid_page(page):
+    return (
+        isinstance(page, dict)
+        and isinstance(page.get("skip"), int)
+        and isinstance(page.get("limit"), int)
+        and all(isinstance(page.get(key), (str, type(None))) for key in ("etag", "last_modified"))
+    )
+
+
+def _read_cache(cache_file):
+    """
+    Reads the cache entry; a missing, unreadable or malformed file counts as no entry.
+    """
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        # JSON object keys are strings; product IDs are ints
+        mapping = {int(pid): info for pid, info in entry["mapping"].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+    if (
+        not isinstance(entry.get("fetched_at"), (int, float))
+        or not isinstance(entry.get("source"), (str, type(None)))
+        or not isinstance(entry.get("pages", []), list)
+        or not all(_valid_page(page) for page in entry.get("pages", []))
+        or not all(isinstance(info, dict) for info in mapping.values())
+    ):
+        return None
+    entry["mapping"] = mapping
+    return entry
+
+
+def _write_cache(cache_file, entry):
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    tmp_file = f"{cache_file}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_file, cache_file)
+
+
+def _refresh(cache_file, entry, timeout, base_url):
+    """
+    Fetches the catalog from base_url (conditionally if entry is given) and updates the cache.
+
+    Returns:
+        dict: the new cache entry, or None if the request failed
+    """
+    try:
+        result = fetch_catalog(
+            pages=entry.get("pages") if entry else None,
+            timeout=timeout,
+            base_url=base_url,
+        )
+    except Exception as e:
+        CACHE_STATS["error"] += 1
+        print(f"Failed to fetch products: {e}")
+        return None
+
+    if result["not_modified"]:
+        CACHE_STATS["revalidated"] += 1
+        new_entry = dict(entry, fetched_at=time.time())
+    else:
+        CACHE_STATS["refreshed"] += 1
+        new_entry = {
+            "source": base_url,
+            "fetched_at": time.time(),
+            "pages": result["pages"],
+            "product_count": len(result["products"]),
+            "mapping": create_product_mapping(result["products"]),
+        }
+
+    try:
+        _write_cache(cache_file, new_entry)
+    except OSError as e:
+        print(f"Failed to write catalog cache: {e}")
+    return new_entry
+
+
+@instrumented(rows_out=len)
+def load_product_mapping(
+    cache_file=CACHE_FILE,
+    ttl=CACHE_TTL,
+    stale_ttl=STALE_TTL,
+    offline=False,
+    force_refresh=False,
+    timeout=REQUEST_TIMEOUT,
+    base_url=None,
+):
+    """
+    Returns the product mapping from the local catalog cache, fetching only when needed.
+
+    Parameters:
+        cache_file (str): path of the JSON cache file
+        ttl (float): age in seconds below which the cache is served as-is
+        stale_ttl (float): age in seconds below which a stale cache is served while
+                           it is revalidated in the background
+        offline (bool): never touch the network, serve whatever is cached
+        force_refresh (bool): revalidate synchronously even if the cache is fresh
+        timeout (float): request timeout in seconds
+        base_url (str): products endpoint (default: BASE_URL, or $SALES_API_URL);
+                        a cache filled from another endpoint counts as a miss
+
+    Returns:
+        dict: mapping in the format of create_product_mapping() (empty if unavailable)
+
+    Requirements:
+    - Cache the output of create_product_mapping() with the ETag / Last-Modified
+      of every catalog page and the endpoint it came from
+    - Revalidate with conditional requests (If-None-Match / If-Modified-Since),
+      one per page, so a change on any page is picked up
+    - Stale-while-revalidate between ttl and stale_ttl
+    - Fall back to a stale copy if the API is unreachable
+    - Count hits, misses and stale serves in CACHE_STATS
+    """
+
+    global _revalidation_thread
+
+    base_url = base_url or BASE_URL
+    entry = _read_cache(cache_file)
+    if entry is not None and entry.get("source") != base_url:
+        # Another endpoint's catalog is neither served nor revalidated
+        entry = None
+    age = time.time() - entry["fetched_at"] if entry else None
+
+    if offline:
+        CACHE_STATS["offline"] += 1
+        if entry is None:
+            print("Offline mode: no cached product catalog available.")
+            return {}
+        return entry["mapping"]
+
+    if entry is not None and not force_refresh:
+        if age < ttl:
+            CACHE_STATS["hit"] += 1
+            return entry["mapping"]
+        if age < stale_ttl:
+            CACHE_STATS["stale"] += 1
+            if _revalidation_thread is None or not _revalidation_thread.is_alive():
+                # A daemon thread, so a slow endpoint cannot hold up exit (see wait_for_revalidation())
+                _revalidation_thread = threading.Thread(
+                    target=_refresh, args=(cache_file, entry, timeout, base_url), name="catalog-revalidate",
+                    daemon=True,
+                )
+                _revalidation_thread.start()
+            return entry["mapping"]
+
+    CACHE_STATS["miss"] += 1
+    new_entry = _refresh(cache_file, entry, timeout, base_url)
+    if new_entry is not None:
+        return new_entry["mapping"]
+    if entry is not None:
+        # API unreachable: a stale catalog beats 0% enrichment
+        CACHE_STATS["stale"] += 1
+        return entry["mapping"]
+    return {}
+
+
+def wait_for_revalidation(timeout=None):
+    """
+    Waits for a background revalidation started by load_product_mapping() to finish
+    (at most timeout seconds; a revalidation still running at exit is abandoned).
+    """
+    if _revalidation_thread is not None:
+        _revalidation_thread.join(timeout)
+
+
+def format_cache_stats():
+    """
+    Returns CACHE_STATS as a one-line summary, e.g. 'hit=1 miss=0 stale=0 ...'.
+    """
+    return " ".join(f"{key}={value}" for key, value in CACHE_STATS.items())
@@ -0,0 +1,281 @@
+import copy
+import hashlib
+import json
+import os
+
+from utils.file_handler import SAMPLE_SIZE, detect_encoding, iter_range_lines
+from utils.stream_pipeline import aggregate_lines, FILTER_COUNTS
+from utils.dedup import (
+    new_id_set,
+    id_set_from_dict,
+    default_store_path,
+    LayeredIdSet,
+    DEFAULT_CAPACITY,
+)
+from utils.sales_aggregator import (
+    new_accumulators,
+    accumulator_mode,
+    merge_accumulators,
+    accumulators_to_dict,
+    accumulators_from_dict,
+    finalize_analysis,
+    new_enrichment_summary,
+    merge_enrichment,
+    finalize_enrichment,
+)
+from utils.instrumentation import instrumented
+
+CHECKPOINT_VERSION = 5
+HEAD_BYTES = 64 * 1024
+ANCHOR_BYTES = 4 * 1024
+BACKSCAN_BYTES = 64 * 1024
+
+
+def default_checkpoint_path(filename):
+    """
+    Returns the checkpoint path used for a sales file (stored next to it).
+    """
+    return f"{filename}.checkpoint.json"
+
+
+def _hash_bytes(f, start, length):
+    f.seek(start)
+    return hashlib.sha256(f.read(length)).hexdigest()
+
+
+def _data_bounds(f, size):
+    """
+    Returns (data_start, complete_end): the offset after the header line and the
+    offset just past the last newline (bytes after it form an unfinished line).
+    """
+    f.seek(0)
+    f.readline()
+    data_start = f.tell()
+
+    complete_end = size
+    position = size
+    while position > data_start:
+        step = min(BACKSCAN_BYTES, position - data_start)
+        f.seek(position - step)
+        block = f.read(step)
+        index = block.rfind(b"\n")
+        if index != -1:
+            complete_end = position - step + index + 1
+            break
+        position -= step
+    else:
+        complete_end = data_start
+
+    return data_start, complete_end
+
+
+def load_checkpoint(checkpoint_file):
+    """
+    Loads a checkpoint file.
+
+    Returns:
+        dict: checkpoint contents, or None if missing or unreadable
+    """
+    try:
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable checkpoint '{checkpoint_file}': {e}")
+        return None
+
+
+def save_checkpoint(checkpoint_file, checkpoint):
+    """
+    Writes a checkpoint atomically (temporary file + rename).
+    """
+    tmp_file = f"{checkpoint_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def _checkpoint_is_valid(checkpoint, f, filename, size, filters, enriched, counting_mode, dedup):
+    """
+    Returns (valid, reason) for reusing a checkpoint on the current file.
+    """
+    if checkpoint is None:
+        return False, "no checkpoint"
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        return False, "checkpoint version changed"
+    if checkpoint["source"] != os.path.abspath(filename):
+        return False, "different source file"
+    if checkpoint["filters"] != list(filters):
+        return False, "filters changed"
+    if (checkpoint["enrichment"] is not None) != enriched:
+        return False, "enrichment setting changed"
+    if accumulator_mode(checkpoint["accumulators"]) != counting_mode:
+        return False, "counting mode changed"
+    if (checkpoint["dedup"] or {}).get("mode") != dedup:
+        return False, "deduplication setting changed"
+    if size < checkpoint["offset"]:
+        return False, "file truncated"
+    if _hash_bytes(f, 0, checkpoint["head_size"]) != checkpoint["head_hash"]:
+        return False, "file head rewritten"
+    anchor_start = checkpoint["offset"] - checkpoint["anchor_size"]
+    if _hash_bytes(f, anchor_start, checkpoint["anchor_size"]) != checkpoint["anchor_hash"]:
+        return False, "file rewritten before the last processed offset"
+    return True, "checkpoint matches"
+
+
+@instrumented(rows_out=lambda result: result[1]["final_count"])
+def incremental_sales_analysis(
+    filename,
+    checkpoint_file=None,
+    region=None,
+    min_amount=None,
+    max_amount=None,
+    product_mapping=None,
+    top_n=5,
+    low_threshold=10,
+    distinct_error=None,
+    heavy_hitter_capacity=None,
+    dedup=None,
+    dedup_capacity=DEFAULT_CAPACITY,
+):
+    """
+    Analyzes an append-only sales file, processing only lines added since the last run.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        checkpoint_file (str): checkpoint path (default: next to filename)
+        region, min_amount, max_amount: optional filters (see validate_and_filter())
+        product_mapping (dict): mapping from create_product_mapping() (optional)
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+        distinct_error (float): estimate daily unique customers with HyperLogLog
+                                sketches of this relative error (optional)
+        heavy_hitter_capacity (int): track products and customers with Space-Saving
+                                     sketches of this capacity (optional)
+        dedup (str): drop repeated TransactionIDs, 'exact' or 'bloom' (optional);
+                     the ID set is checkpointed, so lines re-delivered in a later
+                     append are still recognized; its IDs live in a store next to
+                     filename (see default_store_path()) that each run only appends to
+        dedup_capacity (int): IDs the bloom filter is sized for
+
+    Returns:
+        tuple: (analysis, filter_summary, run_info)
+        - analysis, filter_summary: as returned by stream_sales_analysis()
+        - run_info: {'mode': 'full' | 'incremental', 'reason': str,
+                     'bytes_processed': int, 'offset': int}
+
+    Requirements:
+    - Checkpoint the last processed byte offset, a fingerprint of the file head and
+      of the bytes just before the offset, and the mergeable accumulator state
+    - Rebuild from scratch when the file was truncated or rewritten, or when the
+      filters, enrichment setting, counting mode or dedup mode differ from the
+      checkpoint (or the dedup store is gone)
+    - Only complete lines are checkpointed; an unfinished last line is analyzed
+      for this run but re-read next time
+    """
+
+    checkpoint_file = checkpoint_file or default_checkpoint_path(filename)
+    filters = (region, min_amount, max_amount)
+    enriched = product_mapping is not None
+    checkpoint = load_checkpoint(checkpoint_file)
+
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as f:
+        data_start, complete_end = _data_bounds(f, size)
+        valid, reason = _checkpoint_is_valid(
+            checkpoint, f, filename, size, filters, enriched, (distinct_error, heavy_hitter_capacity), dedup
+        )
+        seen = None
+        if valid and dedup:
+            try:
+                seen = id_set_from_dict(checkpoint["dedup"])
+            except ValueError as e:
+                valid, reason = False, str(e)
+
+        if valid:
+            mode = "incremental"
+            start = checkpoint["offset"]
+            encoding = checkpoint["encoding"]
+            acc = accumulators_from_dict(checkpoint["accumulators"])
+            filter_summary = checkpoint["filter_summary"]
+            enrichment = checkpoint["enrichment"]
+        else:
+            mode = "full"
+            start = data_start
+            f.seek(0)
+            encoding = detect_encoding(f.read(SAMPLE_SIZE))
+            acc = new_accumulators(distinct_error, heavy_hitter_capacity)
+            filter_summary = dict.fromkeys(FILTER_COUNTS, 0)
+            enrichment = new_enrichment_summary() if enriched else None
+            if dedup:
+                seen = new_id_set(dedup, default_store_path(filename, dedup), dedup_capacity)
+                filter_summary["duplicates"] = 0
+
+        # Complete lines appended since the checkpoint
+        if complete_end > start:
+            aggregate_lines(
+                iter_range_lines(filename, start, complete_end, encoding), acc, *filters,
+                filter_summary=filter_summary,
+                product_mapping=product_mapping,
+                enrichment=enrichment,
+                seen=seen,
+            )
+
+        if seen is not None:
+            # The IDs are committed before the checkpoint that refers to them is written
+            seen.commit()
+        offset = max(complete_end, start)
+        head_size = min(HEAD_BYTES, offset)
+        anchor_size = min(ANCHOR_BYTES, offset)
+        new_checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "source": os.path.abspath(filename),
+            "offset": offset,
+            "encoding": encoding,
+            "head_size": head_size,
+            "head_hash": _hash_bytes(f, 0, head_size),
+            "anchor_size": anchor_size,
+            "anchor_hash": _hash_bytes(f, offset - anchor_size, anchor_size),
+            "filters": list(filters),
+            "filter_summary": filter_summary,
+            "enrichment": enrichment,
+            "accumulators": accumulators_to_dict(acc),
+            "dedup": seen.to_dict() if seen is not None else None,
+        }
+    save_checkpoint(checkpoint_file, new_checkpoint)
+
+    # An unfinished last line counts for this run only
+    if size > offset:
+        tail_acc = new_accumulators(distinct_error, heavy_hitter_capacity)
+        tail_summary = dict.fromkeys(filter_summary, 0)
+        tail_enrichment = new_enrichment_summary() if enriched else None
+        aggregate_lines(
+            iter_range_lines(filename, offset, size, encoding), tail_acc, *filters,
+            filter_summary=tail_summary,
+            product_mapping=product_mapping,
+            enrichment=tail_enrichment,
+            # The tail's IDs are checked but not recorded: its line is re-read next run
+            seen=LayeredIdSet(seen) if seen is not None else None,
+        )
+        acc = merge_accumulators(copy.deepcopy(acc), tail_acc)
+        filter_summary = {key: filter_summary[key] + tail_summary[key] for key in filter_summary}
+        if enriched:
+            enrichment = merge_enrichment(copy.deepcopy(enrichment), tail_enrichment)
+
+    if seen is not None:
+        seen.close()
+
+    analysis = finalize_analysis(acc, top_n=top_n, low_threshold=low_threshold)
+    if enriched:
+        analysis["enrichment"] = finalize_enrichment(enrichment)
+    if seen is not None:
+        analysis["duplicates"] = filter_summary["duplicates"]
+
+    run_info = {
+        "mode": mode,
+        "reason": reason,
+        "bytes_processed": size - start,
+        "offset": offset,
+    }
+    return analysis, filter_summary, run_info
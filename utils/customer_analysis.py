@@ -1,3 +1,54 @@
+from collections.abc import Mapping
+
+from utils.top_k import top_customers
+from utils.product_bitsets import ProductBits, ProductAffinity
+from utils.instrumentation import instrumented
+
+
+class CustomerStats(Mapping):
+    """
+    Read-only mapping returned by customer_analysis(), sorted by total_spent descending.
+
+    Only totals and a product bitset are kept per customer; a customer's
+    statistics dictionary, with its sorted products_bought list, is built the
+    first time that customer is accessed.
+    """
+
+    def __init__(self, totals, bitsets, product_bits):
+        self._totals = totals
+        self._bitsets = bitsets
+        self.product_bits = product_bits
+        self._built = {}
+
+    def __getitem__(self, cust_id):
+        stats = self._built.get(cust_id)
+        if stats is None:
+            total_spent, purchase_count = self._totals[cust_id]
+            stats = self._built[cust_id] = {
+                "total_spent": total_spent,
+                "purchase_count": purchase_count,
+                "products_bought": self.product_bits.decode(self._bitsets[cust_id]),
+                "avg_order_value": round(total_spent / purchase_count, 2),
+            }
+        return stats
+
+    def __iter__(self):
+        return iter(self._totals)
+
+    def __len__(self):
+        return len(self._totals)
+
+    def __repr__(self):
+        return f"CustomerStats({dict(self)!r})"
+
+    def affinity(self):
+        """
+        Returns a ProductAffinity over the same product bitsets (co-purchase queries).
+        """
+        return ProductAffinity(self.product_bits, self._bitsets)
+
+
+@instrumented()
 def customer_analysis(transactions):
     """
     Analyzes customer purchase patterns.
@@ -6,7 +57,7 @@ def customer_analysis(transactions):
         transactions (list): list of transaction dictionaries
 
     Returns:
-        dict: customer statistics in format:
+        CustomerStats: read-only mapping of customer statistics in format:
         {
             'C001': {
                 'total_spent': 95000.0,
@@ -23,37 +74,66 @@ def customer_analysis(transactions):
     - Calculate average order value
     - List unique products bought
     - Sort by total_spent descending
+    - Keep products_bought as a bitset over product positions and build each
+      customer's dictionary only when it is accessed
     """
 
-    customer_stats = {}
+    product_bits = ProductBits()
+    totals = {}
+    bitsets = {}
 
     # Aggregate by CustomerID
     for txn in transactions:
         cust_id = txn["CustomerID"]
         amount = txn["Quantity"] * txn["UnitPrice"]
-        product = txn["ProductName"]
+        mask = product_bits.mask(txn["ProductName"])
 
-        if cust_id not in customer_stats:
-            customer_stats[cust_id] = {
-                "total_spent": 0.0,
-                "purchase_count": 0,
-                "products_bought": set(),
-            }
+        stats = totals.get(cust_id)
+        if stats is None:
+            stats = totals[cust_id] = [0.0, 0]
+            bitsets[cust_id] = mask
+        else:
+            bitsets[cust_id] |= mask
+        stats[0] += amount
+        stats[1] += 1
+
+    # Sort by total_spent descending
+    sorted_totals = dict(sorted(totals.items(), key=lambda x: x[1][0], reverse=True))
 
-        customer_stats[cust_id]["total_spent"] += amount
-        customer_stats[cust_id]["purchase_count"] += 1
-        customer_stats[cust_id]["products_bought"].add(product)
+    return CustomerStats(sorted_totals, bitsets, product_bits)
 
-    # Finalize stats
-    for cust_id, stats in customer_stats.items():
-        stats["avg_order_value"] = round(
-            stats["total_spent"] / stats["purchase_count"], 2
-        )
-        stats["products_bought"] = sorted(list(stats["products_bought"]))
 
-    # Sort by total_spent descending
-    sorted_stats = dict(
-        sorted(customer_stats.items(), key=lambda x: x[1]["total_spent"], reverse=True)
-    )
+def top_spending_customers(transactions, n=5):
+    """
+    Finds the top n customers by total spent, straight from transactions.
+
+    Parameters:
+        transactions (list): list of transaction dictionaries or a TransactionTable
+        n (int): number of top customers to return (default=5)
+
+    Returns:
+        dict: the first n entries of customer_analysis(), in the same format
+
+    Requirements:
+    - One pass: totals, purchase counts and a product bitset per customer
+    - Select the winners with top_k.top_customers() (a heap, O(customers log n)),
+      which builds the detailed statistics for the customers returned only
+    """
+
+    product_bits = ProductBits()
+    totals = {}
+
+    # Aggregate by CustomerID
+    for txn in transactions:
+        cust_id = txn["CustomerID"]
+        amount = txn["Quantity"] * txn["UnitPrice"]
+        mask = product_bits.mask(txn["ProductName"])
+
+        stats = totals.get(cust_id)
+        if stats is None:
+            stats = totals[cust_id] = {"total_spent": 0.0, "purchase_count": 0, "products_bought": 0}
+        stats["total_spent"] += amount
+        stats["purchase_count"] += 1
+        stats["products_bought"] |= mask
 
-    return sorted_stats
\ No newline at end of file
+    return top_customers(totals, n, product_bits)
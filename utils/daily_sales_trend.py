@@ -1,9 +1,20 @@
-def daily_sales_trend(transactions):
+from utils.hyperloglog import DEFAULT_ERROR, HyperLogLog, merge_sketches
+from utils.rollup_cube import RollupCube
+from utils.transaction_table import encoded_columns, group_totals
+from utils.instrumentation import instrumented
+
+
+@instrumented()
+def daily_sales_trend(transactions, approximate=False, error=DEFAULT_ERROR):
     """
     Analyzes sales trends by date.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        transactions (list): list of transaction dictionaries, or a RollupCube
+        approximate (bool): count unique customers with a HyperLogLog sketch per day
+                            instead of a set (default=False); a RollupCube counts
+                            them the way it was built and ignores this
+        error (float): standard relative error of the approximate counts (default=0.02)
 
     Returns:
         dict: daily statistics in format:
@@ -20,10 +31,28 @@ def daily_sales_trend(transactions):
     - Group by date
     - Calculate daily revenue
     - Count daily transactions
-    - Count unique customers per day
+    - Count unique customers per day (estimated in fixed memory per day if approximate)
     - Sort chronologically
     """
 
+    if isinstance(transactions, RollupCube):
+        # Daily totals and customer counts from the cube in O(cells)
+        unique_customers = transactions.unique_customers("Date")
+        return {
+            date: {
+                "revenue": totals["revenue"],
+                "transaction_count": totals["transaction_count"],
+                "unique_customers": unique_customers[date],
+            }
+            for date, totals in sorted(transactions.rollup("Date").items(), key=lambda x: x[0])
+        }
+
+    columns = encoded_columns(transactions, "Date", "CustomerID")
+    if columns is not None:
+        return _table_daily_sales_trend(transactions, *columns, approximate, error)
+
+    new_distinct = (lambda: HyperLogLog.from_error(error)) if approximate else set
+
     daily_stats = {}
 
     # Aggregate by Date
@@ -36,18 +65,97 @@ def daily_sales_trend(transactions):
             daily_stats[date] = {
                 "revenue": 0.0,
                 "transaction_count": 0,
-                "unique_customers": set(),
+                "unique_customers": new_distinct(),
             }
 
         daily_stats[date]["revenue"] += amount
         daily_stats[date]["transaction_count"] += 1
         daily_stats[date]["unique_customers"].add(cust_id)
 
-    # Finalize stats: convert sets to counts
+    # Finalize stats: convert sets (or sketches) to counts
     for date, stats in daily_stats.items():
         stats["unique_customers"] = len(stats["unique_customers"])
 
     # Sort chronologically by date
     sorted_stats = dict(sorted(daily_stats.items(), key=lambda x: x[0]))
 
-    return sorted_stats
\ No newline at end of file
+    return sorted_stats
+
+
+def _table_daily_sales_trend(table, date_column, customer_column, approximate, error):
+    """
+    daily_sales_trend() of a TransactionTable, grouped on Date and CustomerID codes.
+    """
+
+    size = len(date_column.values)
+    revenues = [0.0] * size
+    counts = [0] * size
+    customers = [None] * size
+    order = []
+    # Sketches hash the customer strings; exact sets keep the integer codes
+    customer_values = customer_column.values if approximate else None
+
+    for date, cust, qty, price in zip(
+        date_column.codes, customer_column.codes, table.columns["Quantity"], table.columns["UnitPrice"]
+    ):
+        if not counts[date]:
+            order.append(date)
+            customers[date] = HyperLogLog.from_error(error) if approximate else set()
+        revenues[date] += qty * price
+        counts[date] += 1
+        customers[date].add(cust if customer_values is None else customer_values[cust])
+
+    daily_stats = {}
+    for date in order:
+        daily_stats[date_column.values[date]] = {
+            "revenue": revenues[date],
+            "transaction_count": counts[date],
+            "unique_customers": len(customers[date]),
+        }
+
+    return dict(sorted(daily_stats.items(), key=lambda x: x[0]))
+
+
+def customer_sketches(transactions, key="Date", error=DEFAULT_ERROR):
+    """
+    Builds one distinct-customer sketch per value of a transaction field.
+
+    Parameters:
+        transactions (iterable): transaction dictionaries
+        key (str): field to group by, e.g. 'Date' or 'Region' (default='Date')
+        error (float): standard relative error of each sketch (default=0.02)
+
+    Returns:
+        dict: {value: HyperLogLog} sorted by value
+    """
+
+    sketches = {}
+    for txn in transactions:
+        group = txn[key]
+        sketch = sketches.get(group)
+        if sketch is None:
+            sketch = sketches[group] = HyperLogLog.from_error(error)
+        sketch.add(txn["CustomerID"])
+
+    return dict(sorted(sketches.items(), key=lambda x: x[0]))
+
+
+def distinct_customers(sketches, start=None, end=None):
+    """
+    Estimates the distinct customers across several groups by merging their sketches.
+
+    Parameters:
+        sketches (dict): {value: HyperLogLog} from customer_sketches()
+        start (str): first value to include, e.g. '2024-12-01' (optional)
+        end (str): last value to include, inclusive (optional)
+
+    Returns:
+        int: estimated number of distinct customers in the selected groups
+    """
+
+    selected = (
+        sketch for value, sketch in sketches.items()
+        if (start is None or value >= start) and (end is None or value <= end)
+    )
+    merged = merge_sketches(selected)
+    return merged.count() if merged is not None else 0
@@ -0,0 +1,688 @@
+import base64
+import math
+import os
+import sqlite3
+from array import array
+from hashlib import blake2b
+
+from utils.transaction_table import TransactionTable
+from utils.validate_filter import is_valid_transaction
+from utils.instrumentation import instrumented
+
+DEDUP_MODES = ["exact", "bloom"]
+DEFAULT_CAPACITY = 10_000_000
+DEFAULT_ERROR_RATE = 0.01
+# IDs buffered in memory before they are written to an ID store
+STORE_BATCH = 50_000
+STORE_SUFFIXES = {"exact": ".seen.log", "bloom": ".seen.sqlite"}
+# Files sqlite keeps next to a bloom store while it is open
+SQLITE_SIDE_FILES = ["-journal", "-wal", "-shm"]
+
+
+def default_store_path(filename, mode="bloom"):
+    """
+    Returns the on-disk ID store of a dedup mode for a sales file (stored next to it).
+    """
+    return f"{filename}{STORE_SUFFIXES[mode]}"
+
+
+def encode_transaction_id(txn_id):
+    """
+    Compact exact key of a TransactionID, used to save in-memory sets: IDs of up to
+    8 UTF-8 bytes (e.g. 'T0001234') become one int, longer IDs stay strings.
+    Distinct IDs always get distinct keys.
+    """
+    data = txn_id.encode("utf-8")
+    if len(data) <= 8:
+        # A marker bit above the bytes keeps e.g. '\x00A' and 'A' apart
+        return int.from_bytes(data, "big") | 1 << (8 * len(data))
+    return txn_id
+
+
+def decode_transaction_id(key):
+    if isinstance(key, int):
+        length = (key.bit_length() - 1) // 8
+        return (key ^ 1 << (8 * length)).to_bytes(length, "big").decode("utf-8")
+    return key
+
+
+# Fibonacci hashing multiplier: spreads consecutive keys over PackedKeySet slots
+_FIBONACCI = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class PackedKeySet:
+    """
+    Open-addressing hash set of unsigned 64-bit ints packed in one array('Q').
+
+    Each slot holds a key itself (0 marks an empty slot, so the key 0 is kept in a
+    flag); lookups probe linearly from a Fibonacci hash of the key. The table
+    doubles when it is 2/3 full, so a key takes 12-24 bytes instead of the
+    60-70 bytes of an int in a Python set.
+
+    Attributes:
+        slots (array): the hash table, a power of two long
+        count (int): keys held in slots (the key 0 excluded)
+        has_zero (bool): whether the key 0 was added
+    """
+
+    __slots__ = ("slots", "count", "has_zero", "_shift", "_mask")
+
+    def __init__(self, bits=10):
+        self.slots = array("Q", bytes(8 << bits))
+        self.count = 0
+        self.has_zero = False
+        self._shift = 64 - bits
+        self._mask = (1 << bits) - 1
+
+    def _find(self, key):
+        """
+        Returns the slot holding key, or the empty slot where it belongs.
+        """
+        slots, mask = self.slots, self._mask
+        i = ((key * _FIBONACCI) & _MASK64) >> self._shift
+        while True:
+            value = slots[i]
+            if value == key or not value:
+                return i
+            i = (i + 1) & mask
+
+    def add(self, key):
+        """
+        Adds key; returns False if it was already present.
+        """
+        if not key:
+            if self.has_zero:
+                return False
+            self.has_zero = True
+            return True
+        i = self._find(key)
+        if self.slots[i]:
+            return False
+        self.slots[i] = key
+        self.count += 1
+        if 3 * self.count > 2 * len(self.slots):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self.slots
+        bits = 64 - self._shift + 1
+        self.slots = array("Q", bytes(8 << bits))
+        self._shift = 64 - bits
+        self._mask = (1 << bits) - 1
+        slots, find = self.slots, self._find
+        for key in old:
+            if key:
+                slots[find(key)] = key
+
+    def __contains__(self, key):
+        if not key:
+            return self.has_zero
+        return self.slots[self._find(key)] == key
+
+    def __len__(self):
+        return self.count + self.has_zero
+
+    def __iter__(self):
+        if self.has_zero:
+            yield 0
+        yield from filter(None, self.slots)
+
+
+class ExactIdSet:
+    """
+    Exact set of TransactionIDs in packed hash tables.
+
+    IDs of up to 8 UTF-8 bytes (e.g. 'T0001234') are stored as 64-bit ints in
+    one PackedKeySet per byte length, about 12-24 bytes per ID (1.2-2.4 GB per
+    100M IDs; bloom mode bounds memory instead). Longer IDs go to a Python set.
+
+    With a store, every new ID is also appended (one per line, after a generation
+    header) to a log file, so saving the set with to_dict() only records the log
+    length instead of rewriting every ID: a refresh costs the new IDs, not the
+    history. Restoring reads the log back up to the saved length and drops
+    anything a failed run appended after it.
+
+    Attributes:
+        tables (dict): UTF-8 length -> PackedKeySet of the IDs of that length,
+                       as big-endian ints
+        long_ids (set): IDs longer than 8 bytes
+        store (str): append-only ID log, or None for an in-memory set
+    """
+
+    mode = "exact"
+
+    def __init__(self, ids=(), store=None, generation=None, size=0):
+        self.tables = {}
+        self.long_ids = set()
+        for txn_id in ids:
+            self._insert(txn_id)
+        self.store = store
+        self._pending = []
+        self._file = None
+        if store is None:
+            return
+
+        if generation is None:
+            # A new set starts from an empty log
+            self.generation = os.urandom(8).hex()
+            self._file = open(store, "wb")
+            self._file.write(f"# {self.generation}\n".encode("ascii"))
+        else:
+            self.generation = generation
+            self._file = open(store, "r+b")
+            self._file.seek(size)
+            self._file.truncate()
+        self._file.flush()
+
+    @classmethod
+    def load(cls, store, generation, size):
+        """
+        Reopens the log of a saved set, keeping its first size bytes.
+
+        Raises:
+            ValueError if the log is missing, was recreated or is shorter than size
+        """
+        if not os.path.exists(store):
+            raise ValueError("dedup store missing")
+        with open(store, "rb") as f:
+            header = f.readline()
+            if header != f"# {generation}\n".encode("ascii"):
+                raise ValueError("dedup store replaced")
+            body = f.read(size - len(header))
+        if len(header) + len(body) < size:
+            raise ValueError("dedup store truncated")
+        ids = body.decode("utf-8").split("\n")[:-1]
+        return cls(ids, store, generation, size)
+
+    def _flush(self):
+        if self._pending:
+            self._file.write(("\n".join(self._pending) + "\n").encode("utf-8"))
+            self._pending.clear()
+
+    def _insert(self, txn_id):
+        data = txn_id.encode("utf-8")
+        if len(data) > 8:
+            if txn_id in self.long_ids:
+                return False
+            self.long_ids.add(txn_id)
+            return True
+        table = self.tables.get(len(data))
+        if table is None:
+            table = self.tables[len(data)] = PackedKeySet()
+        return table.add(int.from_bytes(data, "big"))
+
+    def add(self, txn_id):
+        """
+        Records txn_id; returns False if it was already seen (a duplicate).
+        """
+        if not self._insert(txn_id):
+            return False
+        if self._file is not None:
+            pending = self._pending
+            pending.append(txn_id)
+            if len(pending) >= STORE_BATCH:
+                self._flush()
+        return True
+
+    def __contains__(self, txn_id):
+        data = txn_id.encode("utf-8")
+        if len(data) > 8:
+            return txn_id in self.long_ids
+        table = self.tables.get(len(data))
+        return table is not None and int.from_bytes(data, "big") in table
+
+    def __len__(self):
+        return sum(map(len, self.tables.values())) + len(self.long_ids)
+
+    def iter_ids(self):
+        for length, table in self.tables.items():
+            for key in table:
+                yield key.to_bytes(length, "big").decode("utf-8")
+        yield from self.long_ids
+
+    def commit(self):
+        """
+        Writes the buffered IDs to the log and syncs it to disk.
+        """
+        if self._file is not None:
+            self._flush()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable form, restored with from_dict(); with a store
+        only the log's length is saved (the log is committed first).
+        """
+        if self.store is None:
+            return {"mode": self.mode, "ids": [encode_transaction_id(txn_id) for txn_id in self.iter_ids()]}
+        self.commit()
+        return {
+            "mode": self.mode,
+            "store": self.store,
+            "generation": self.generation,
+            "count": len(self),
+            "size": self._file.tell(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restores a saved set.
+
+        Raises:
+            ValueError if the store is missing, was recreated or lost saved IDs
+        """
+        if data.get("store") is None:
+            return cls(map(decode_transaction_id, data["ids"]))
+        return cls.load(data["store"], data["generation"], data["size"])
+
+
+# Single-word masks with two bits set, indexed by two 6-bit bit positions
+_BIT_PAIRS = [(1 << (i & 63)) | (1 << (i >> 6)) for i in range(4096)]
+MAX_HASHES = 10
+
+
+class BloomFilter:
+    """
+    Blocked Bloom filter: no false negatives, false positives at about the
+    error rate it was sized for.
+
+    All bits of a value fall in one 64-bit word, so checking or adding a value
+    is one blake2b digest, one mask and one word read (and write). The mask is
+    assembled two bits at a time from _BIT_PAIRS.
+
+    Attributes:
+        size (int): number of bits (a multiple of 64)
+        hashes (int): bits set per value (at most MAX_HASHES)
+        bits (bytearray): the bit array
+    """
+
+    __slots__ = ("size", "hashes", "bits", "_words", "_word_count", "_pair_shifts", "_single_shift")
+
+    def __init__(self, size, hashes, bits=None):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray(size // 8)
+        self._words = memoryview(self.bits).cast("Q")
+        self._word_count = len(self._words)
+        self._pair_shifts = [12 * i for i in range(hashes // 2)]
+        self._single_shift = 12 * (hashes // 2) if hashes % 2 else None
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=DEFAULT_ERROR_RATE):
+        """
+        Creates a filter for capacity values at the given false positive rate.
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError(f"Error rate must be between 0 and 1, got {error_rate}")
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2 / 64) * 64
+        hashes = min(MAX_HASHES, max(1, round(size / capacity * math.log(2))))
+        return cls(size, hashes)
+
+    def _locate(self, data):
+        """
+        Returns (word index, mask) of a value.
+        """
+        x = int.from_bytes(blake2b(data, digest_size=16).digest(), "little")
+        mask = 0 if self._single_shift is None else 1 << ((x >> self._single_shift) & 63)
+        for shift in self._pair_shifts:
+            mask |= _BIT_PAIRS[(x >> shift) & 4095]
+        return (x >> 64) % self._word_count, mask
+
+    def add(self, data):
+        """
+        Adds bytes; returns True if they were possibly added before.
+        """
+        index, mask = self._locate(data)
+        word = self._words[index]
+        if word & mask == mask:
+            return True
+        self._words[index] = word | mask
+        return False
+
+    def __contains__(self, data):
+        index, mask = self._locate(data)
+        return self._words[index] & mask == mask
+
+    def __ior__(self, other):
+        if (other.size, other.hashes) != (self.size, self.hashes):
+            raise ValueError("Cannot merge Bloom filters of different sizes")
+        merged = int.from_bytes(self.bits, "little") | int.from_bytes(other.bits, "little")
+        self.bits[:] = merged.to_bytes(len(self.bits), "little")
+        return self
+
+    def to_dict(self):
+        return {
+            "size": self.size,
+            "hashes": self.hashes,
+            "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["size"], data["hashes"], bytearray(base64.b64decode(data["bits"])))
+
+
+class BloomIdSet:
+    """
+    Bounded-memory set of TransactionIDs.
+
+    A Bloom filter in memory answers "never seen" for almost every new ID; every
+    ID is also appended to an on-disk sqlite store, which is only queried for the
+    IDs the filter reports as possibly seen, so duplicates are still exact.
+    Memory is the filter plus at most STORE_BATCH buffered IDs.
+
+    Store writes are not committed until commit(); to_dict() commits first and
+    records how many commits the store has had, so a saved set never refers to
+    uncommitted IDs, and a store that was committed past the saved set (a run
+    that failed before saving its checkpoint) is rejected when reopened.
+
+    Attributes:
+        store (str): sqlite file holding every ID seen
+        bloom (BloomFilter): membership filter
+        count (int): distinct IDs seen
+        commits (int): commits of new IDs made to the store
+        suspected (int): IDs the filter reported as possibly seen
+        false_positives (int): suspected IDs the store showed to be new
+    """
+
+    mode = "bloom"
+
+    def __init__(self, store, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE, bloom=None,
+                 count=0, generation=None, commits=0):
+        if bloom is None:
+            # A new set starts from an empty store
+            for path in (store, *(store + suffix for suffix in SQLITE_SIDE_FILES)):
+                if os.path.exists(path):
+                    os.remove(path)
+            bloom = BloomFilter.for_capacity(capacity, error_rate)
+        elif not os.path.exists(store):
+            raise ValueError("dedup store missing")
+        self.store = store
+        self.bloom = bloom
+        self.count = count
+        self.commits = commits
+        self.suspected = 0
+        self.false_positives = 0
+        self._pending = set()
+        self._dirty = False
+        self._conn = sqlite3.connect(store)
+        # Write-ahead log: a crash loses at most the last commit, never the store
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+
+        if generation is None:
+            # Identifies this store, so a saved set never resumes on a store
+            # that was recreated in the meantime
+            self.generation = os.urandom(8).hex()
+            self._conn.execute("CREATE TABLE seen (id TEXT PRIMARY KEY) WITHOUT ROWID")
+            self._conn.execute("CREATE TABLE meta (generation TEXT, commits INTEGER)")
+            self._conn.execute("INSERT INTO meta (generation, commits) VALUES (?, 0)", (self.generation,))
+            self._conn.commit()
+        else:
+            self.generation = generation
+            try:
+                row = self._conn.execute("SELECT generation, commits FROM meta").fetchone()
+            except sqlite3.DatabaseError:
+                row = None
+            if row is None or row[0] != generation:
+                self._conn.close()
+                raise ValueError("dedup store replaced")
+            if row[1] != commits:
+                self._conn.close()
+                raise ValueError("dedup store changed since it was saved")
+
+    def _stored(self, txn_id):
+        return self._conn.execute("SELECT 1 FROM seen WHERE id = ?", (txn_id,)).fetchone() is not None
+
+    def _flush(self):
+        if self._pending:
+            # Sorted batches go into the primary key B-tree in order, which is much faster
+            self._conn.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", ((i,) for i in sorted(self._pending)))
+            self._pending.clear()
+
+    def add(self, txn_id):
+        """
+        Records txn_id; returns False if it was already seen (a duplicate).
+        """
+        # BloomFilter.add() inlined: this runs once per row
+        words = self.bloom._words
+        index, mask = self.bloom._locate(txn_id.encode("utf-8"))
+        word = words[index]
+        if word & mask == mask:
+            self.suspected += 1
+            if txn_id in self._pending or self._stored(txn_id):
+                return False
+            self.false_positives += 1
+        else:
+            words[index] = word | mask
+
+        pending = self._pending
+        pending.add(txn_id)
+        self.count += 1
+        self._dirty = True
+        if len(pending) >= STORE_BATCH:
+            self._flush()
+        return True
+
+    def __contains__(self, txn_id):
+        if txn_id.encode("utf-8") not in self.bloom:
+            return False
+        return txn_id in self._pending or self._stored(txn_id)
+
+    def __len__(self):
+        return self.count
+
+    def iter_ids(self):
+        self._flush()
+        return (row[0] for row in self._conn.execute("SELECT id FROM seen"))
+
+    def commit(self):
+        """
+        Commits the new IDs to the store (and counts the commit, if there were any).
+        """
+        self._flush()
+        if self._dirty:
+            self._conn.execute("UPDATE meta SET commits = commits + 1")
+            self.commits += 1
+            self._dirty = False
+        self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self.commit()
+            self._conn.close()
+            self._conn = None
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable form, restored with from_dict(); the IDs
+        themselves stay in the store (which is committed first).
+        """
+        self.commit()
+        return {
+            "mode": self.mode,
+            "store": self.store,
+            "generation": self.generation,
+            "count": self.count,
+            "commits": self.commits,
+            "bloom": self.bloom.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reopens a saved set.
+
+        Raises:
+            ValueError if the store is missing, was recreated or was committed to
+            since the set was saved
+        """
+        return cls(
+            data["store"],
+            bloom=BloomFilter.from_dict(data["bloom"]),
+            count=data["count"],
+            generation=data["generation"],
+            commits=data["commits"],
+        )
+
+
+class LayeredIdSet:
+    """
+    Looks IDs up in a base set but records new ones only locally, leaving the
+    base unchanged (e.g. for rows that must not be checkpointed).
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.local = set()
+
+    def add(self, txn_id):
+        if txn_id in self.local or txn_id in self.base:
+            return False
+        self.local.add(txn_id)
+        return True
+
+
+class IdSetUnion:
+    """
+    Membership over several ID sets of one mode, e.g. the shards before a shard.
+
+    Exact sets are merged into one ExactIdSet; bloom sets into one filter, so only
+    IDs it reports as possibly seen are looked up in the stores.
+    """
+
+    def __init__(self):
+        self.exact = ExactIdSet()
+        self.bloom = None
+        self.id_sets = []
+
+    def add(self, id_set):
+        """
+        Adds every ID of an ExactIdSet or BloomIdSet (bloom filters must have the same size).
+        """
+        if isinstance(id_set, ExactIdSet):
+            for txn_id in id_set.iter_ids():
+                self.exact.add(txn_id)
+            return
+        if self.bloom is None:
+            self.bloom = BloomFilter(id_set.bloom.size, id_set.bloom.hashes)
+        self.bloom |= id_set.bloom
+        self.id_sets.append(id_set)
+
+    def __contains__(self, txn_id):
+        if txn_id in self.exact:
+            return True
+        if self.bloom is None or txn_id.encode("utf-8") not in self.bloom:
+            return False
+        return any(txn_id in id_set for id_set in self.id_sets)
+
+
+def new_id_set(mode, store=None, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+    """
+    Creates an empty ID set for a dedup mode.
+
+    Parameters:
+        mode (str): 'exact' (in-memory packed hash set of IDs) or 'bloom' (Bloom filter
+                    plus an on-disk store for exact confirmation)
+        store (str): ID store, replaced if it exists (see default_store_path()):
+                     the sqlite file bloom mode needs, or an optional append-only
+                     log for exact mode sets that are saved with to_dict()
+        capacity (int): IDs the bloom filter is sized for (default=10,000,000)
+        error_rate (float): bloom false positive rate at capacity (default=0.01)
+    """
+    if mode == "exact":
+        return ExactIdSet(store=store)
+    if mode == "bloom":
+        if not store:
+            raise ValueError("Bloom mode deduplication needs a store file")
+        return BloomIdSet(store, capacity, error_rate)
+    raise ValueError(f"Unknown dedup mode: {mode}")
+
+
+def id_set_from_dict(data):
+    """
+    Restores an ID set saved with to_dict().
+
+    Raises:
+        ValueError if the store of a set is missing or was recreated
+    """
+    if data["mode"] == "exact":
+        return ExactIdSet.from_dict(data)
+    if data["mode"] == "bloom":
+        return BloomIdSet.from_dict(data)
+    raise ValueError(f"Unknown dedup mode: {data['mode']}")
+
+
+def iter_deduplicate(transactions, seen, summary=None):
+    """
+    Lazily drops valid transactions whose TransactionID was already seen.
+
+    Only rows that pass is_valid_transaction() are recorded, so an invalid row
+    never makes a later valid row with the same TransactionID a duplicate.
+
+    Parameters:
+        transactions (iterable): transaction dictionaries
+        seen: ID set from new_id_set() (or LayeredIdSet), updated in place
+        summary (dict): dictionary whose 'duplicates' count is updated (optional)
+
+    Yields:
+        the first valid transaction of every TransactionID, in input order;
+        invalid rows pass through (validation rejects them)
+    """
+
+    if summary is None:
+        summary = {}
+    summary.setdefault("duplicates", 0)
+
+    add = seen.add
+    for txn in transactions:
+        if is_valid_transaction(txn) and not add(txn["TransactionID"]):
+            summary["duplicates"] += 1
+            continue
+        yield txn
+
+
+@instrumented()
+def deduplicate(transactions, seen):
+    """
+    Removes valid transactions whose TransactionID was already seen (see iter_deduplicate()).
+
+    Parameters:
+        transactions (list): list of transaction dictionaries or a TransactionTable
+        seen: ID set from new_id_set(), updated in place
+
+    Returns:
+        tuple: (unique_transactions, duplicate_count)
+        unique_transactions is a TransactionTable when a table is passed in
+
+    Requirements:
+    - Keep the first valid occurrence of every TransactionID, in input order
+    - Tables are only copied when duplicates were found
+    """
+
+    summary = {}
+    if isinstance(transactions, TransactionTable):
+        add = seen.add
+        row_ids = []
+        for row_id, txn in enumerate(transactions):
+            if is_valid_transaction(txn) and not add(txn["TransactionID"]):
+                continue
+            row_ids.append(row_id)
+        duplicates = len(transactions) - len(row_ids)
+        if duplicates:
+            transactions = transactions.take(row_ids)
+        return transactions, duplicates
+
+    unique = list(iter_deduplicate(transactions, seen, summary))
+    return unique, summary["duplicates"]
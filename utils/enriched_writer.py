@@ -0,0 +1,420 @@
+import gzip
+import queue
+import shutil
+import threading
+from operator import itemgetter
+
+from utils.transaction_table import EncodedColumn, TransactionTable, EnrichedRows
+from utils.instrumentation import instrumented
+
+ENRICHED_HEADER = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region",
+    "API_Category", "API_Brand", "API_Rating", "API_Match"
+]
+# Written as empty fields when None; every other None is written as "None"
+OPTIONAL_FIELDS = ["API_Category", "API_Brand", "API_Rating"]
+ENRICHED_FORMATS = ["text", "gzip", "columnar"]
+ENRICHED_FILES = {
+    "text": "data/enriched_sales_data.txt",
+    "gzip": "data/enriched_sales_data.txt.gz",
+    "columnar": "data/enriched_sales_data.bin",
+}
+ENRICHED_VERSION = 1
+WRITE_BATCH_ROWS = 10_000
+QUEUED_BATCHES = 4
+
+_row_fields = itemgetter(*ENRICHED_HEADER)
+_transaction_fields = itemgetter(*ENRICHED_HEADER[:8])
+_api_fields = itemgetter(*ENRICHED_HEADER[8:])
+
+
+def guess_enriched_format(filename):
+    """
+    Guesses the output format from a file name: .gz is gzip, .bin is columnar,
+    anything else is pipe-delimited text.
+    """
+    if filename.endswith(".gz"):
+        return "gzip"
+    if filename.endswith(".bin"):
+        return "columnar"
+    return "text"
+
+
+def format_enriched_row(txn):
+    """
+    Formats one enriched transaction as a pipe-delimited line (without newline).
+
+    Parameters:
+        txn (dict): enriched transaction dictionary
+
+    Returns:
+        str: line in ENRICHED_HEADER column order, None values written as empty fields
+    """
+
+    row = [
+        str(txn.get("TransactionID", "")),
+        str(txn.get("Date", "")),
+        str(txn.get("ProductID", "")),
+        str(txn.get("ProductName", "")),
+        str(txn.get("Quantity", "")),
+        str(txn.get("UnitPrice", "")),
+        str(txn.get("CustomerID", "")),
+        str(txn.get("Region", "")),
+        str(txn.get("API_Category", "")) if txn.get("API_Category") is not None else "",
+        str(txn.get("API_Brand", "")) if txn.get("API_Brand") is not None else "",
+        str(txn.get("API_Rating", "")) if txn.get("API_Rating") is not None else "",
+        str(txn.get("API_Match", "")),
+    ]
+    return "|".join(row)
+
+
+def format_enriched_rows(rows):
+    """
+    Formats a batch of enriched transactions as one block of text (newline-terminated).
+
+    Produces exactly the lines of format_enriched_row(); rows with every field
+    present take a fast path with one itemgetter call and one f-string per row.
+    """
+
+    # Prices and ratings repeat across rows: convert each distinct float once per batch
+    prices, ratings = {}, {}
+
+    def price_text(value):
+        text = prices.get(value)
+        if text is None:
+            text = prices[value] = str(value)
+        return text
+
+    def rating_text(value):
+        text = ratings.get(value)
+        if text is None:
+            text = ratings[value] = "" if value is None else str(value)
+        return text
+
+    try:
+        lines = [
+            f"{tid}|{date}|{pid}|{name}|{qty}|{price_text(price)}|{cust}|{region}|"
+            f"{'' if category is None else category}|{'' if brand is None else brand}|"
+            f"{rating_text(rating)}|{match}"
+            for tid, date, pid, name, qty, price, cust, region, category, brand, rating, match
+            in map(_row_fields, rows)
+        ]
+    except KeyError:
+        lines = [format_enriched_row(txn) for txn in rows]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def format_enriched_view(rows, start=0, end=None):
+    """
+    Formats rows start:end of an EnrichedRows view as one block of text.
+
+    The API fields of each ProductID are formatted once, so every line is the
+    transaction's own fields followed by the shared text of its product.
+    """
+    suffixes = {}
+    for product_id, fields in rows.fields.items():
+        category, brand, rating, match = _api_fields(fields)
+        suffixes[product_id] = (
+            f"{'' if category is None else category}|{'' if brand is None else brand}|"
+            f"{'' if rating is None else rating}|{match}"
+        )
+    transactions = rows.transactions[start:end]
+
+    prices = {}
+
+    def price_text(value):
+        text = prices.get(value)
+        if text is None:
+            text = prices[value] = str(value)
+        return text
+
+    try:
+        lines = [
+            f"{tid}|{date}|{pid}|{name}|{qty}|{price_text(price)}|{cust}|{region}|{suffixes[pid]}"
+            for tid, date, pid, name, qty, price, cust, region in map(_transaction_fields, transactions)
+        ]
+    except KeyError:
+        lines = [format_enriched_row(txn) for txn in EnrichedRows(transactions, rows.fields)]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _column_strings(name, column, start, end):
+    """
+    Rows start:end of one table column as strings, formatted like format_enriched_row().
+    """
+    if isinstance(column, EncodedColumn):
+        if name in OPTIONAL_FIELDS:
+            strings = ["" if value is None else str(value) for value in column.values]
+        else:
+            strings = [str(value) for value in column.values]
+        return [strings[code] for code in column.codes[start:end]]
+    return list(map(str, column[start:end]))
+
+
+def format_enriched_table(table, start=0, end=None):
+    """
+    Formats rows start:end of an enriched TransactionTable as one block of text.
+
+    Each distinct value of an encoded column is converted to a string once, then
+    the lines are assembled column by column.
+    """
+    end = len(table) if end is None else min(end, len(table))
+    if start >= end:
+        return ""
+    columns = [_column_strings(name, table.columns[name], start, end) for name in ENRICHED_HEADER]
+    return "\n".join(map("|".join, zip(*columns))) + "\n"
+
+
+def _new_enriched_table():
+    table = TransactionTable()
+    for name in ENRICHED_HEADER[8:]:
+        table.columns[name] = EncodedColumn()
+    return table
+
+
+class EnrichedWriter:
+    """
+    Buffered writer for enriched rows in text, gzip or columnar format.
+
+    Rows are collected into batches of batch_rows and each batch is formatted and
+    written with a single call. With background=True, formatting, compression and
+    I/O run in a writer thread fed through a bounded queue, so the producer only
+    pays for handing over a batch. The columnar format keeps the rows in compact
+    columns and writes them with write_table_file() on close(), so its memory
+    grows with the rows written (stream_sales_analysis() does not accept it).
+
+    Usage:
+        with EnrichedWriter("data/enriched_sales_data.txt.gz", background=True) as writer:
+            for txn in enriched_rows:
+                writer.write(txn)
+
+    Attributes:
+        filename (str): output path
+        fmt (str): one of ENRICHED_FORMATS
+        rows_written (int): rows accepted so far
+    """
+
+    def __init__(self, filename, fmt=None, background=False, batch_rows=WRITE_BATCH_ROWS, header=True):
+        fmt = fmt or guess_enriched_format(filename)
+        if fmt not in ENRICHED_FORMATS:
+            raise ValueError(f"Unknown enriched format: {fmt}")
+        self.filename = filename
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self._batch = []
+        self._error = None
+        self._thread = None
+        self._queue = None
+        self._adopted = False
+
+        if fmt == "columnar":
+            self._file = None
+            self._table = _new_enriched_table()
+            return
+
+        self._table = None
+        if fmt == "gzip":
+            # Level 6 keeps compression from dominating the write stage
+            self._file = gzip.open(filename, "wt", encoding="utf-8", compresslevel=6)
+        else:
+            self._file = open(filename, "w", encoding="utf-8", buffering=1024 * 1024)
+        if header:
+            self._file.write("|".join(ENRICHED_HEADER) + "\n")
+        if background:
+            self._queue = queue.Queue(maxsize=QUEUED_BATCHES)
+            self._thread = threading.Thread(target=self._drain, name="enriched-writer", daemon=True)
+            self._thread.start()
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                try:
+                    self._file.write(self._format(item))
+                except Exception as e:
+                    self._error = e
+
+    @staticmethod
+    def _format(item):
+        if isinstance(item, tuple):
+            rows, start, end = item
+            if isinstance(rows, EnrichedRows):
+                return format_enriched_view(rows, start, end)
+            return format_enriched_table(rows, start, end)
+        return format_enriched_rows(item)
+
+    def _submit(self, item):
+        if self._error is not None:
+            raise self._error
+        if self._queue is not None:
+            self._queue.put(item)
+        else:
+            self._file.write(self._format(item))
+
+    def write(self, txn):
+        """
+        Buffers one enriched transaction dictionary.
+        """
+        self.rows_written += 1
+        if self._table is not None:
+            self._append_columnar(txn)
+            return
+        self._batch.append(txn)
+        if len(self._batch) >= self.batch_rows:
+            self._submit(self._batch)
+            self._batch = []
+
+    def write_rows(self, rows):
+        """
+        Writes many rows: a list/iterable of dictionaries, an EnrichedRows view or an
+        enriched TransactionTable.
+        """
+        if isinstance(rows, EnrichedRows):
+            if self._table is None:
+                self.flush()
+                for start in range(0, len(rows), self.batch_rows):
+                    self._submit((rows, start, start + self.batch_rows))
+                self.rows_written += len(rows)
+                return
+            if len(self._table) == 0 and len(rows):
+                # Built column by column rather than appended row by row
+                self._table = rows.to_table()
+                self.rows_written += len(rows)
+                return
+        if not isinstance(rows, TransactionTable):
+            for txn in rows:
+                self.write(txn)
+            return
+
+        self.flush()
+        if self._table is not None:
+            if len(self._table) == 0:
+                # Nothing buffered yet: keep the table itself instead of copying it
+                self._table = rows
+                self._adopted = True
+            else:
+                for txn in rows:
+                    self._append_columnar(txn)
+        else:
+            for start in range(0, len(rows), self.batch_rows):
+                self._submit((rows, start, start + self.batch_rows))
+        self.rows_written += len(rows)
+
+    def _append_columnar(self, txn):
+        if self._adopted:
+            # Never append to a caller's table: copy it before adding more rows
+            adopted, self._table, self._adopted = self._table, _new_enriched_table(), False
+            for row in adopted:
+                self._append_columnar(row)
+        columns = self._table.columns
+        for name in ENRICHED_HEADER:
+            columns[name].append(txn[name])
+
+    def flush(self):
+        """
+        Hands the buffered rows over to be written.
+        """
+        if self._batch:
+            self._submit(self._batch)
+            self._batch = []
+
+    def close(self):
+        """
+        Writes everything still buffered and closes the file.
+
+        Raises:
+            the first error raised by the background writer, if any
+        """
+        try:
+            if self._table is not None:
+                # Imported here: the parse cache pulls in the parsing modules
+                from utils.parse_cache import write_table_file
+
+                write_table_file(self.filename, self._table, {"enriched_version": ENRICHED_VERSION})
+                return
+            self.flush()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+@instrumented(rows_out=None)
+def save_enriched_data(enriched_transactions, filename=ENRICHED_FILES["text"], fmt=None, background=False):
+    """
+    Saves enriched transactions back to file.
+
+    Parameters:
+        enriched_transactions: list of enriched dictionaries, an EnrichedRows view
+                               or an enriched TransactionTable
+        filename (str): output path
+        fmt (str): 'text', 'gzip' or 'columnar' (default: from the file extension,
+                   see guess_enriched_format())
+        background (bool): format and write in a background thread
+
+    Expected File Format (text, also inside gzip):
+    TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region|API_Category|API_Brand|API_Rating|API_Match
+
+    Requirements:
+    - Create output file with all original + new fields
+    - Use pipe delimiter
+    - Handle None values appropriately
+    - Write in large batches instead of one call per row
+    """
+
+    try:
+        with EnrichedWriter(filename, fmt, background=background) as writer:
+            writer.write_rows(enriched_transactions)
+
+        print(f"Enriched data successfully saved to {filename}")
+
+    except Exception as e:
+        print(f"Failed to save enriched data: {e}")
+
+
+def read_enriched_columnar(filename):
+    """
+    Reads an enriched file written in the columnar format back as a TransactionTable.
+    """
+    from utils.parse_cache import read_table_file
+
+    table, header = read_table_file(filename)
+    if "enriched_version" not in header:
+        raise ValueError(f"'{filename}' is not an enriched columnar file")
+    return table
+
+
+def concat_enriched_parts(filename, parts, fmt=None):
+    """
+    Joins headerless part files written by EnrichedWriter(header=False) into one file.
+
+    Text parts are concatenated after the header; gzip parts are concatenated as
+    members of one multi-member gzip file. The columnar format cannot be split
+    into parts.
+    """
+    fmt = fmt or guess_enriched_format(filename)
+    if fmt == "columnar":
+        raise ValueError("The columnar enriched format cannot be written in parts")
+    header = ("|".join(ENRICHED_HEADER) + "\n").encode("utf-8")
+    with open(filename, "wb") as out:
+        out.write(gzip.compress(header) if fmt == "gzip" else header)
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
@@ -1,3 +1,214 @@
+import codecs
+import time
+
+from utils.instrumentation import instrumented
+
+ENCODINGS_TO_TRY = ["utf-8", "latin-1", "cp1252"]
+CHUNK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+
+
+def detect_encoding(sample):
+    """
+    Picks the first encoding in ENCODINGS_TO_TRY that decodes a byte sample.
+
+    Parameters:
+        sample (bytes): bounded prefix of the file (may end mid-character)
+
+    Returns:
+        str: encoding name
+    """
+
+    for enc in ENCODINGS_TO_TRY:
+        decoder = codecs.getincrementaldecoder(enc)()
+        try:
+            decoder.decode(sample, final=False)
+            return enc
+        except UnicodeDecodeError:
+            # Try next encoding
+            continue
+
+    return "latin-1"
+
+
+def _next_encoding(encoding):
+    """
+    Returns the encoding to fall back to after encoding fails, or None.
+    """
+    if encoding in ENCODINGS_TO_TRY:
+        index = ENCODINGS_TO_TRY.index(encoding)
+        if index + 1 < len(ENCODINGS_TO_TRY):
+            return ENCODINGS_TO_TRY[index + 1]
+    return None
+
+
+def iter_decoded_chunks(f, encoding, stats, first_chunk=b"", limit=None):
+    """
+    Decodes a binary file incrementally, switching encoding mid-stream on failure.
+
+    Parameters:
+        f (file): file opened in binary mode
+        encoding (str): encoding to start with
+        stats (dict): updated with 'encoding', 'fallback_offset' and 'bytes_read'
+        first_chunk (bytes): bytes already read from f (e.g. the detection sample)
+        limit (int): maximum number of bytes to read from f (optional)
+
+    Yields:
+        decoded text chunks
+
+    Requirements:
+    - Read every byte exactly once
+    - On a decode error, keep the text decoded so far and continue from the failing
+      byte with the next encoding instead of rereading from the start
+    - Replace undecodable bytes if no encoding is left
+    """
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    stats["encoding"] = encoding
+    stats.setdefault("fallback_offset", None)
+    stats.setdefault("bytes_read", 0)
+    remaining = limit
+
+    chunk = first_chunk
+    while True:
+        if not chunk:
+            if remaining is not None and remaining <= 0:
+                break
+            size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+            chunk = f.read(size)
+            if not chunk:
+                break
+        if remaining is not None:
+            remaining -= len(chunk)
+        stats["bytes_read"] += len(chunk)
+
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            # Bytes still buffered in the old decoder belong in front of this chunk
+            data = decoder.getstate()[0] + chunk
+            good = data[:e.start].decode(encoding)
+
+            encoding = _next_encoding(encoding)
+            if encoding is None:
+                decoder = codecs.getincrementaldecoder("latin-1")(errors="replace")
+                stats["encoding"] = "latin-1"
+            else:
+                decoder = codecs.getincrementaldecoder(encoding)()
+                stats["encoding"] = encoding
+            if stats["fallback_offset"] is None:
+                stats["fallback_offset"] = stats["bytes_read"] - len(data) + e.start
+
+            text = good + decoder.decode(data[e.start:])
+
+        if text:
+            yield text
+        chunk = b""
+
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_sales_data(filename, stats=None):
+    """
+    Lazily reads sales data from file handling encoding issues.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        stats (dict): updated with encoding, bytes_read, elapsed and bytes_per_sec (optional)
+
+    Yields:
+        raw transaction lines (strings), excluding header and empty lines.
+
+    Requirements:
+    - Read the file once as bytes and pick the encoding from a bounded prefix sample
+    - Handle FileNotFoundError with appropriate error message
+    - Skip the header row
+    - Remove empty lines
+    - Report the encoding chosen and the read throughput
+    """
+
+    if stats is None:
+        stats = {}
+
+    try:
+        f = open(filename, "rb")
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    start = time.perf_counter()
+    with f:
+        sample = f.read(SAMPLE_SIZE)
+        encoding = detect_encoding(sample)
+
+        header_skipped = False
+        pending = ""
+        for text in iter_decoded_chunks(f, encoding, stats, first_chunk=sample):
+            lines = (pending + text).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                if not header_skipped:
+                    # Skip header (first line)
+                    header_skipped = True
+                    continue
+                line = line.strip()
+                if line != "":
+                    yield line
+
+        if header_skipped:
+            pending = pending.strip()
+            if pending != "":
+                yield pending
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["bytes_per_sec"] = stats["bytes_read"] / stats["elapsed"] if stats["elapsed"] else 0.0
+
+    fallback = ""
+    if stats["fallback_offset"] is not None:
+        fallback = f", fell back at byte {stats['fallback_offset']}"
+    print(
+        f"Read {stats['bytes_read']:,} bytes as {stats['encoding']}{fallback} "
+        f"({stats['bytes_per_sec'] / (1024 * 1024):,.1f} MB/s)"
+    )
+
+
+def iter_range_lines(filename, start, end, encoding, stats=None):
+    """
+    Lazily reads the lines stored in bytes [start, end) of a sales file.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        start (int): byte offset of the first line (must be at a line start)
+        end (int): byte offset just past the last line (must be at a line start or EOF)
+        encoding (str): encoding to start with, e.g. from detect_encoding()
+        stats (dict): updated like iter_decoded_chunks() (optional)
+
+    Yields:
+        stripped, non-empty lines (the header is not skipped)
+    """
+
+    if stats is None:
+        stats = {}
+
+    with open(filename, "rb") as f:
+        f.seek(start)
+        pending = ""
+        for text in iter_decoded_chunks(f, encoding, stats, limit=end - start):
+            lines = (pending + text).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if line != "":
+                    yield line
+
+        pending = pending.strip()
+        if pending != "":
+            yield pending
+
+
+@instrumented()
 def read_sales_data(filename):
     """
     Reads sales data from file handling encoding issues.
@@ -13,25 +224,4 @@ def read_sales_data(filename):
     - Remove empty lines
     """
 
-    encodings_to_try = ["utf-8", "latin-1", "cp1252"]
-
-    for enc in encodings_to_try:
-        try:
-            with open(filename, "r", encoding=enc) as f:
-                lines = f.readlines()
-            break  # Successfully read file, exit loop
-        except FileNotFoundError:
-            print(f"Error: File '{filename}' not found.")
-            return []
-        except UnicodeDecodeError:
-            # Try next encoding
-            continue
-    else:
-        # If all encodings fail, fallback with replacement characters
-        with open(filename, "r", encoding="latin-1", errors="replace") as f:
-            lines = f.readlines()
-
-    # Remove header (first line) and strip empty lines
-    data_lines = [line.strip() for line in lines[1:] if line.strip() != ""]
-
-    return data_lines
\ No newline at end of file
+    return list(iter_sales_data(filename))
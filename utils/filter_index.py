@@ -0,0 +1,138 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from utils.transaction_table import TransactionTable
+from utils.validate_filter import is_valid_transaction
+
+
+class FilterIndex:
+    """
+    Validated rows indexed for repeated region and amount-range filtering.
+
+    Built once in a single validation pass (Quantity * UnitPrice computed once per
+    row); every query afterwards is answered from the indexes without revalidating.
+
+    Attributes:
+        total_input (int): rows seen
+        invalid_count (int): rows rejected by is_valid_transaction()
+        row_ids (array): source index of each valid row, in input order
+        amounts (array): amount of each valid row (same positions as row_ids)
+        region_rows (dict): region -> positions of its valid rows, ascending
+        amount_index (dict): region (None for all rows) -> (sorted amounts, positions)
+    """
+
+    def __init__(self, transactions):
+        self.source = transactions
+        self.total_input = 0
+        self.invalid_count = 0
+        self.row_ids = array("q")
+        self.amounts = array("d")
+        self.region_rows = {}
+
+        for row_id, txn in enumerate(transactions):
+            self.total_input += 1
+            if not is_valid_transaction(txn):
+                self.invalid_count += 1
+                continue
+            position = len(self.row_ids)
+            self.row_ids.append(row_id)
+            self.amounts.append(txn["Quantity"] * txn["UnitPrice"])
+            positions = self.region_rows.get(txn["Region"])
+            if positions is None:
+                positions = self.region_rows[txn["Region"]] = array("q")
+            positions.append(position)
+
+        self.amount_index = {None: self._sort_by_amount(range(len(self.row_ids)))}
+        for region, positions in self.region_rows.items():
+            self.amount_index[region] = self._sort_by_amount(positions)
+
+    def _sort_by_amount(self, positions):
+        amounts = self.amounts
+        order = sorted(positions, key=amounts.__getitem__)
+        return array("d", (amounts[p] for p in order)), array("q", order)
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @property
+    def regions(self):
+        """
+        Sorted regions of the valid rows (empty regions excluded).
+        """
+        return sorted(region for region in self.region_rows if region)
+
+    @property
+    def amount_range(self):
+        """
+        (min, max) amount of the valid rows, or None if there are none.
+        """
+        sorted_amounts = self.amount_index[None][0]
+        return (sorted_amounts[0], sorted_amounts[-1]) if sorted_amounts else None
+
+    def count_region(self, region=None):
+        """
+        Number of valid rows in region (all valid rows if region is empty).
+        """
+        if not region:
+            return len(self.row_ids)
+        return len(self.region_rows.get(region, ()))
+
+    def query(self, region=None, min_amount=None, max_amount=None):
+        """
+        Returns the positions of the valid rows matching the filters, in input order.
+
+        Parameters:
+            region (str): keep only this region (optional, empty means all)
+            min_amount (float): minimum amount, inclusive (optional)
+            max_amount (float): maximum amount, inclusive (optional)
+
+        Requirements:
+        - Bisect the amount-sorted positions of the region (or of all rows):
+          O(log n + k log k) for k matches
+        """
+
+        key = region or None
+        if key is not None and key not in self.amount_index:
+            return []
+
+        if min_amount is None and max_amount is None:
+            if key is None:
+                return list(range(len(self.row_ids)))
+            return list(self.region_rows[key])
+
+        sorted_amounts, positions = self.amount_index[key]
+        lo = 0 if min_amount is None else bisect_left(sorted_amounts, min_amount)
+        hi = len(sorted_amounts) if max_amount is None else bisect_right(sorted_amounts, max_amount)
+        return sorted(positions[lo:hi])
+
+    def take(self, positions):
+        """
+        Returns the source rows at positions: a list of the original transaction
+        dictionaries, or a TransactionTable when the index was built from a table.
+        """
+        row_ids = self.row_ids
+        if isinstance(self.source, TransactionTable):
+            return self.source.take([row_ids[p] for p in positions])
+        source = self.source
+        return [source[row_ids[p]] for p in positions]
+
+    def select(self, region=None, min_amount=None, max_amount=None):
+        """
+        Filters the valid rows.
+
+        Returns:
+            tuple: (transactions, filter_summary)
+            - transactions: see take()
+            - filter_summary: counts in the format of iter_validate_and_filter()
+        """
+
+        positions = self.query(region, min_amount, max_amount)
+        in_region = self.count_region(region)
+        summary = {
+            "total_input": self.total_input,
+            "invalid": self.invalid_count,
+            "filtered_by_region": len(self.row_ids) - in_region,
+            "filtered_by_amount": in_region - len(positions),
+            "final_count": len(positions),
+        }
+        return self.take(positions), summary
@@ -0,0 +1,144 @@
+import base64
+import hashlib
+import math
+
+DEFAULT_ERROR = 0.02
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+# 2 ** -rank for every possible register value (at most 64 - MIN_PRECISION + 1)
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(66)]
+
+
+def _hash64(value):
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def precision_for_error(error):
+    """
+    Returns the smallest precision whose standard error (1.04 / sqrt(2 ** p)) is <= error.
+    """
+    if not 0 < error < 1:
+        raise ValueError(f"Relative error must be between 0 and 1, got {error}")
+    precision = math.ceil(math.log2((1.04 / error) ** 2))
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch in fixed memory (2 ** precision bytes).
+
+    Behaves like the set it replaces where the analysis code needs it:
+    add() a value, len() for the (estimated) distinct count, and |= to merge
+    another sketch of the same precision.
+
+    Attributes:
+        precision (int): number of index bits; 2 ** precision registers
+        registers (bytearray): highest rank seen per register
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision=None, registers=None):
+        if precision is None:
+            precision = precision_for_error(DEFAULT_ERROR)
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"Precision must be between {MIN_PRECISION} and {MAX_PRECISION}, got {precision}")
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    @classmethod
+    def from_error(cls, error=DEFAULT_ERROR):
+        """
+        Creates a sketch whose standard relative error is at most error.
+        """
+        return cls(precision_for_error(error))
+
+    @property
+    def relative_error(self):
+        """
+        Standard relative error of count() (1.04 / sqrt(number of registers)).
+        """
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value):
+        """
+        Adds one value (hashed as its string form).
+        """
+        h = _hash64(value)
+        suffix_bits = 64 - self.precision
+        index = h >> suffix_bits
+        rank = suffix_bits - (h & ((1 << suffix_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one (union of the counted values).
+
+        Returns:
+            HyperLogLog: self, updated in place
+        """
+        if other.precision != self.precision:
+            raise ValueError(
+                f"Cannot merge sketches of precision {self.precision} and {other.precision}"
+            )
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def __ior__(self, other):
+        return self.merge(other)
+
+    def copy(self):
+        return HyperLogLog(self.precision, bytearray(self.registers))
+
+    def count(self):
+        """
+        Returns the estimated number of distinct values added.
+        """
+        m = len(self.registers)
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+
+        estimate = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction: linear counting over the empty registers
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable form, restored with from_dict().
+        """
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(bytes(self.registers)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["precision"], bytearray(base64.b64decode(data["registers"])))
+
+    def __repr__(self):
+        return f"HyperLogLog(precision={self.precision}, count~{self.count()})"
+
+
+def merge_sketches(sketches):
+    """
+    Returns a new sketch counting the union of the given sketches (None if empty).
+    """
+    merged = None
+    for sketch in sketches:
+        merged = sketch.copy() if merged is None else merged.merge(sketch)
+    return merged
@@ -0,0 +1,335 @@
+import cProfile
+import functools
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_DIR = "output/profiles"
+LINE_PROTOCOL_MEASUREMENT = "sales_pipeline"
+SUMMARY_COLUMNS = ["wall s", "cpu s", "rows in", "rows out", "rows/s", "peak MiB"]
+
+# Active recorder; None means instrumentation is off and stages cost one global lookup
+_active = None
+
+
+class Instrumentation:
+    """
+    Records wall time, CPU time, row counts and memory of nested pipeline stages.
+
+    Stages are opened with stage() (or the instrumented() decorator) and may nest;
+    each thread keeps its own stack, so stages running in worker threads are
+    recorded as top-level stages of that thread.
+
+    Attributes:
+        records (list): one dictionary per stage, in start order:
+            {'id', 'name', 'depth', 'parent', 'parent_id', 'thread', 'started_at', 'wall_seconds', 'cpu_seconds',
+             'rows_in', 'rows_out', 'rows_per_sec', 'peak_bytes', 'status', 'error',
+             'profile'}
+        trace_memory (bool): record the tracemalloc peak of every stage
+        profile (set or True): stage names to run under cProfile (True for all)
+        profile_dir (str): directory for the per-stage .prof files
+        failed_stage (dict): record of the innermost stage that raised, or None
+    """
+
+    def __init__(self, trace_memory=False, profile=None, profile_dir=PROFILE_DIR):
+        self.records = []
+        self.trace_memory = trace_memory
+        self.profile = profile if profile is True else set(profile or ())
+        self.profile_dir = profile_dir
+        self.failed_stage = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+        self._started_tracemalloc = False
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _wants_profile(self, name):
+        return self.profile is True or name in self.profile
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Measures the enclosed block as stage name.
+
+        Yields the stage record; the block may set 'rows_in' and 'rows_out' on it.
+
+        Requirements:
+        - Peak memory is the tracemalloc peak above the stage's starting usage and
+          includes nested stages (tracemalloc is process-wide, so stages running
+          concurrently in other threads share it)
+        - Only one stage is profiled at a time; nested profiled stages are folded
+          into the outer profile
+        """
+
+        stack = self._stack()
+        parent = stack[-1]["record"] if stack else None
+        record = {
+            "id": None,
+            "name": name,
+            "depth": len(stack),
+            "parent": parent["name"] if parent else None,
+            "parent_id": parent["id"] if parent else None,
+            "thread": threading.current_thread().name,
+            "started_at": time.time(),
+            "wall_seconds": None,
+            "cpu_seconds": None,
+            "rows_in": rows_in,
+            "rows_out": None,
+            "rows_per_sec": None,
+            "peak_bytes": None,
+            "status": "ok",
+            "error": None,
+            "profile": None,
+        }
+        with self._lock:
+            record["id"] = len(self.records)
+            self.records.append(record)
+
+        frame = {"record": record, "memory_start": 0, "memory_peak": 0}
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["memory_peak"] = max(stack[-1]["memory_peak"], peak)
+            tracemalloc.reset_peak()
+            frame["memory_start"] = frame["memory_peak"] = current
+        stack.append(frame)
+
+        profiler = None
+        if self._wants_profile(name):
+            with self._lock:
+                if not self._profiling:
+                    self._profiling = True
+                    profiler = cProfile.Profile()
+        if profiler is not None:
+            profiler.enable()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+            with self._lock:
+                if self.failed_stage is None:
+                    self.failed_stage = record
+            raise
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.process_time() - cpu_start
+            if profiler is not None:
+                profiler.disable()
+                record["profile"] = self._dump_profile(profiler, name)
+                with self._lock:
+                    self._profiling = False
+
+            stack.pop()
+            if self.trace_memory and tracemalloc.is_tracing():
+                frame["memory_peak"] = max(frame["memory_peak"], tracemalloc.get_traced_memory()[1])
+                record["peak_bytes"] = frame["memory_peak"] - frame["memory_start"]
+                if stack:
+                    stack[-1]["memory_peak"] = max(stack[-1]["memory_peak"], frame["memory_peak"])
+
+            rows = record["rows_in"] if record["rows_in"] is not None else record["rows_out"]
+            if rows and record["wall_seconds"]:
+                record["rows_per_sec"] = rows / record["wall_seconds"]
+
+    def _dump_profile(self, profiler, name):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "stage"
+        path = os.path.join(self.profile_dir, f"{slug}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    def format_summary(self):
+        """
+        Returns the records as an indented text table (nested stages under their
+        parent, even when stages of several threads overlapped).
+        """
+
+        def number(value, fmt):
+            return "-" if value is None else format(value, fmt)
+
+        children = {}
+        for r in self.records:
+            children.setdefault(r["parent_id"], []).append(r)
+        ordered = []
+        pending = list(reversed(children.get(None, [])))
+        while pending:
+            r = pending.pop()
+            ordered.append(r)
+            pending.extend(reversed(children.get(r["id"], [])))
+
+        names = ["  " * r["depth"] + r["name"] + (" (failed)" if r["status"] == "error" else "")
+                 for r in ordered]
+        width = max([len("Stage")] + [len(name) for name in names])
+        lines = [f"{'Stage':<{width}}  " + "  ".join(f"{column:>10}" for column in SUMMARY_COLUMNS)]
+        lines.append("-" * len(lines[0]))
+        for name, r in zip(names, ordered):
+            peak = None if r["peak_bytes"] is None else r["peak_bytes"] / (1024 * 1024)
+            values = [
+                number(r["wall_seconds"], ".4f"),
+                number(r["cpu_seconds"], ".4f"),
+                number(r["rows_in"], ","),
+                number(r["rows_out"], ","),
+                number(r["rows_per_sec"], ",.0f"),
+                number(peak, ",.1f"),
+            ]
+            lines.append(f"{name:<{width}}  " + "  ".join(f"{value:>10}" for value in values))
+        return "\n".join(lines)
+
+    def to_json(self):
+        return json.dumps({"stages": self.records}, indent=2)
+
+    def to_line_protocol(self, measurement=LINE_PROTOCOL_MEASUREMENT):
+        """
+        Returns the records in InfluxDB line protocol, one line per stage:
+
+            sales_pipeline,stage=parse_transactions,status=ok,depth=1 wall_seconds=0.12,rows_in=80i 1700000000000000000
+        """
+
+        def tag(value):
+            return re.sub(r"([,= ])", r"\\\1", str(value))
+
+        lines = []
+        for r in self.records:
+            fields = []
+            for key in ("wall_seconds", "cpu_seconds", "rows_per_sec"):
+                if r[key] is not None:
+                    fields.append(f"{key}={r[key]!r}")
+            for key in ("rows_in", "rows_out", "peak_bytes"):
+                if r[key] is not None:
+                    fields.append(f"{key}={int(r[key])}i")
+            if not fields:
+                continue
+            tags = f"stage={tag(r['name'])},status={r['status']},depth={r['depth']}"
+            lines.append(f"{measurement},{tags} {','.join(fields)} {int(r['started_at'] * 1e9)}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, fmt=None):
+        """
+        Writes the records to path as "json" or "line" protocol (default: json for
+        .json files, line protocol otherwise).
+        """
+        if fmt is None:
+            fmt = "json" if path.endswith(".json") else "line"
+        if fmt not in ("json", "line"):
+            raise ValueError(f"Unknown metrics format: {fmt}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json() if fmt == "json" else self.to_line_protocol())
+
+
+def start_instrumentation(trace_memory=False, profile=None, profile_dir=PROFILE_DIR):
+    """
+    Creates the process-wide recorder that stage() and instrumented() report into.
+
+    Parameters:
+        trace_memory (bool): record tracemalloc peaks (slows allocation-heavy stages)
+        profile (iterable or True): stage names to run under cProfile, True for all
+        profile_dir (str): directory for the .prof files (one per profiled stage)
+
+    Returns:
+        Instrumentation: the active recorder
+    """
+    global _active
+    stop_instrumentation()
+    _active = Instrumentation(trace_memory, profile, profile_dir).start()
+    return _active
+
+
+def stop_instrumentation():
+    """
+    Detaches the active recorder and returns it (None if there was none).
+    """
+    global _active
+    recorder, _active = _active, None
+    if recorder is not None:
+        recorder.stop()
+    return recorder
+
+
+def get_instrumentation():
+    return _active
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Measures the enclosed block as a stage of the active recorder.
+
+    Yields a record dictionary the block may set 'rows_in' / 'rows_out' on; when
+    instrumentation is off the record is a throwaway dictionary.
+    """
+    recorder = _active
+    if recorder is None:
+        yield {"rows_in": rows_in, "rows_out": None}
+        return
+    with recorder.stage(name, rows_in) as record:
+        yield record
+
+
+def count_rows(value):
+    """
+    Row count of a pipeline value: len() of lists and tables, of the first item of
+    a tuple result such as (valid, invalid_count); None for anything else.
+    """
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (str, bytes, dict)) or not hasattr(value, "__len__"):
+        return None
+    return len(value)
+
+
+def instrumented(name=None, rows_in=None, rows_out=count_rows):
+    """
+    Decorator that runs a function as a stage of the active recorder.
+
+    Parameters:
+        name (str): stage name (default: the function name)
+        rows_in (callable): (args, kwargs) -> input row count (default: count_rows
+                            of the first positional argument)
+        rows_out (callable): result -> output row count (default: count_rows)
+    """
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _active
+            if recorder is None:
+                return func(*args, **kwargs)
+            if rows_in is not None:
+                count_in = rows_in(args, kwargs)
+            else:
+                count_in = count_rows(args[0]) if args else None
+            with recorder.stage(stage_name, count_in) as record:
+                result = func(*args, **kwargs)
+                if rows_out is not None:
+                    record["rows_out"] = rows_out(result)
+                return result
+
+        return wrapper
+
+    return decorator
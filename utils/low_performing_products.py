@@ -1,9 +1,15 @@
+from utils.rollup_cube import RollupCube
+from utils.transaction_table import encoded_columns, group_totals
+from utils.instrumentation import instrumented
+
+
+@instrumented()
 def low_performing_products(transactions, threshold=10):
     """
     Identifies products with low sales.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        transactions (list): list of transaction dictionaries, or a RollupCube
         threshold (int): minimum quantity threshold (default=10)
 
     Returns:
@@ -19,19 +25,29 @@ def low_performing_products(transactions, threshold=10):
     - Sort by TotalQuantity ascending
     """
 
-    product_stats = {}
-
-    # Aggregate by ProductName
-    for txn in transactions:
-        product = txn["ProductName"]
-        qty = txn["Quantity"]
-        revenue = txn["Quantity"] * txn["UnitPrice"]
-
-        if product not in product_stats:
-            product_stats[product] = {"quantity": 0, "revenue": 0.0}
-
-        product_stats[product]["quantity"] += qty
-        product_stats[product]["revenue"] += revenue
+    if isinstance(transactions, RollupCube):
+        # Per-product totals straight from the cube
+        product_stats = transactions.rollup("ProductName")
+    elif encoded_columns(transactions, "ProductName"):
+        # Group a TransactionTable on its ProductName codes
+        product_stats = {
+            product: {"quantity": qty, "revenue": revenue}
+            for product, (qty, revenue, _) in group_totals(transactions, "ProductName").items()
+        }
+    else:
+        product_stats = {}
+
+        # Aggregate by ProductName
+        for txn in transactions:
+            product = txn["ProductName"]
+            qty = txn["Quantity"]
+            revenue = txn["Quantity"] * txn["UnitPrice"]
+
+            if product not in product_stats:
+                product_stats[product] = {"quantity": 0, "revenue": 0.0}
+
+            product_stats[product]["quantity"] += qty
+            product_stats[product]["revenue"] += revenue
 
     # Filter products below threshold
     low_products = [
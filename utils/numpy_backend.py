@@ -0,0 +1,322 @@
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for backend="numpy"
+    np = None
+
+from utils.transaction_table import TransactionTable
+
+GROUP_FIELDS = ["Region", "ProductName", "CustomerID", "Date"]
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The numpy analysis backend requires numpy (pip install numpy)")
+
+
+def _factorize(codes):
+    """
+    Renumbers integer codes so groups are numbered in order of first appearance.
+
+    Returns:
+        tuple: (group_ids, labels) where labels[g] is the original code of group g
+    """
+    uniques, first_index, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    order = np.argsort(first_index, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse.ravel()], uniques[order]
+
+
+def prepare_columns(transactions):
+    """
+    Converts transactions into NumPy arrays with factorized group keys.
+
+    Parameters:
+        transactions (list): transaction dictionaries or a TransactionTable
+
+    Returns:
+        dict in format:
+        {
+            'quantity': int64 array, 'unit_price': float64 array, 'amount': float64 array,
+            'Region': (group_ids, labels), 'ProductName': (...), 'CustomerID': (...), 'Date': (...)
+        }
+        Group ids follow first-appearance order, matching the insertion order of the
+        dictionaries built by the pure-Python analysis functions.
+    """
+
+    _require_numpy()
+    prepared = {}
+
+    if isinstance(transactions, TransactionTable):
+        columns = transactions.columns
+        quantity = np.frombuffer(columns["Quantity"], dtype=np.int64)
+        unit_price = np.frombuffer(columns["UnitPrice"], dtype=np.float64)
+        for field in GROUP_FIELDS:
+            column = columns[field]
+            codes = np.frombuffer(column.codes, dtype=np.intc)
+            group_ids, label_codes = _factorize(codes)
+            prepared[field] = (group_ids, [column.values[code] for code in label_codes])
+    else:
+        lookups = {field: {} for field in GROUP_FIELDS}
+        codes = {field: [] for field in GROUP_FIELDS}
+        quantities = []
+        prices = []
+        for txn in transactions:
+            quantities.append(txn["Quantity"])
+            prices.append(txn["UnitPrice"])
+            for field in GROUP_FIELDS:
+                lookup = lookups[field]
+                value = txn[field]
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                codes[field].append(code)
+        quantity = np.array(quantities, dtype=np.int64)
+        unit_price = np.array(prices, dtype=np.float64)
+        for field in GROUP_FIELDS:
+            prepared[field] = (np.array(codes[field], dtype=np.intp), list(lookups[field]))
+
+    prepared["quantity"] = quantity
+    prepared["unit_price"] = unit_price
+    prepared["amount"] = quantity * unit_price
+    return prepared
+
+
+def _group_sums(group_ids, size, amount):
+    # bincount adds weights in row order, like the += loops of the Python backend
+    return np.bincount(group_ids, weights=amount, minlength=size)
+
+
+def _group_counts(group_ids, size):
+    return np.bincount(group_ids, minlength=size)
+
+
+def _group_int_sums(group_ids, size, values):
+    totals = np.zeros(size, dtype=np.int64)
+    np.add.at(totals, group_ids, values)
+    return totals
+
+
+def _top_n_desc(values, n):
+    """
+    Indices of the n largest values, ties in index order (like a stable sort).
+
+    Uses argpartition to find the cut-off value, then sorts only the candidates.
+    """
+    size = len(values)
+    if n <= 0 or size == 0:
+        return np.empty(0, dtype=np.intp)
+    if n < size:
+        cutoff = np.partition(values, size - n)[size - n]
+        candidates = np.flatnonzero(values >= cutoff)
+    else:
+        candidates = np.arange(size)
+    order = np.argsort(-values[candidates], kind="stable")
+    return candidates[order][:n]
+
+
+def _total(amount):
+    # cumsum adds sequentially, matching sum() over the rows
+    return float(np.cumsum(amount)[-1]) if len(amount) else 0
+
+
+def calculate_total_revenue(transactions, prepared=None):
+    """
+    Vectorized calculate_total_revenue().
+    """
+    prepared = prepared or prepare_columns(transactions)
+    return _total(prepared["amount"])
+
+
+def region_wise_sales(transactions, prepared=None):
+    """
+    Vectorized region_wise_sales().
+    """
+    prepared = prepared or prepare_columns(transactions)
+    group_ids, labels = prepared["Region"]
+    totals = _group_sums(group_ids, len(labels), prepared["amount"])
+    counts = _group_counts(group_ids, len(labels))
+    total_sales = _total(prepared["amount"])
+
+    region_stats = {}
+    for g in np.argsort(-totals, kind="stable"):
+        region_stats[labels[g]] = {
+            "total_sales": float(totals[g]),
+            "transaction_count": int(counts[g]),
+            "percentage": round((float(totals[g]) / total_sales) * 100, 2),
+        }
+    return region_stats
+
+
+def _product_totals(prepared):
+    group_ids, labels = prepared["ProductName"]
+    quantities = _group_int_sums(group_ids, len(labels), prepared["quantity"])
+    revenues = _group_sums(group_ids, len(labels), prepared["amount"])
+    return labels, quantities, revenues
+
+
+def top_selling_products(transactions, n=5, by="quantity", prepared=None):
+    """
+    Vectorized top_selling_products().
+    """
+    prepared = prepared or prepare_columns(transactions)
+    labels, quantities, revenues = _product_totals(prepared)
+    if by not in ("quantity", "revenue"):
+        raise ValueError(f"Unknown product metric: {by}")
+    values = quantities if by == "quantity" else revenues
+    return [
+        (labels[g], int(quantities[g]), float(revenues[g]))
+        for g in _top_n_desc(values, n)
+    ]
+
+
+def low_performing_products(transactions, threshold=10, prepared=None):
+    """
+    Vectorized low_performing_products().
+    """
+    prepared = prepared or prepare_columns(transactions)
+    labels, quantities, revenues = _product_totals(prepared)
+    low = np.flatnonzero(quantities < threshold)
+    low = low[np.argsort(quantities[low], kind="stable")]
+    return [(labels[g], int(quantities[g]), float(revenues[g])) for g in low]
+
+
+def customer_analysis(transactions, prepared=None):
+    """
+    Vectorized customer_analysis().
+    """
+    prepared = prepared or prepare_columns(transactions)
+    cust_ids, cust_labels = prepared["CustomerID"]
+    prod_ids, prod_labels = prepared["ProductName"]
+    size = len(cust_labels)
+    spent = _group_sums(cust_ids, size, prepared["amount"])
+    counts = _group_counts(cust_ids, size)
+
+    # Unique (customer, product) pairs, grouped by customer
+    products = [[] for _ in range(size)]
+    stride = max(len(prod_labels), 1)
+    pairs = np.unique(cust_ids.astype(np.int64) * stride + prod_ids)
+    for cust, prod in zip((pairs // stride).tolist(), (pairs % stride).tolist()):
+        products[cust].append(prod_labels[prod])
+
+    customer_stats = {}
+    for g in np.argsort(-spent, kind="stable"):
+        total_spent = float(spent[g])
+        purchase_count = int(counts[g])
+        customer_stats[cust_labels[g]] = {
+            "total_spent": total_spent,
+            "purchase_count": purchase_count,
+            "products_bought": sorted(products[g]),
+            "avg_order_value": round(total_spent / purchase_count, 2),
+        }
+    return customer_stats
+
+
+def top_spending_customers(transactions, n=5, prepared=None):
+    """
+    Vectorized top_spending_customers(): products are only collected for the winners.
+    """
+    prepared = prepared or prepare_columns(transactions)
+    cust_ids, cust_labels = prepared["CustomerID"]
+    prod_ids, prod_labels = prepared["ProductName"]
+    size = len(cust_labels)
+    spent = _group_sums(cust_ids, size, prepared["amount"])
+    counts = _group_counts(cust_ids, size)
+    winners = _top_n_desc(spent, n)
+
+    rows = np.isin(cust_ids, winners)
+    products = {int(g): [] for g in winners}
+    stride = max(len(prod_labels), 1)
+    pairs = np.unique(cust_ids[rows].astype(np.int64) * stride + prod_ids[rows])
+    for cust, prod in zip((pairs // stride).tolist(), (pairs % stride).tolist()):
+        products[cust].append(prod_labels[prod])
+
+    customer_stats = {}
+    for g in winners.tolist():
+        total_spent = float(spent[g])
+        purchase_count = int(counts[g])
+        customer_stats[cust_labels[g]] = {
+            "total_spent": total_spent,
+            "purchase_count": purchase_count,
+            "products_bought": sorted(products[g]),
+            "avg_order_value": round(total_spent / purchase_count, 2),
+        }
+    return customer_stats
+
+
+def _daily_totals(prepared):
+    group_ids, labels = prepared["Date"]
+    revenues = _group_sums(group_ids, len(labels), prepared["amount"])
+    counts = _group_counts(group_ids, len(labels))
+    return group_ids, labels, revenues, counts
+
+
+def daily_sales_trend(transactions, prepared=None):
+    """
+    Vectorized daily_sales_trend().
+    """
+    prepared = prepared or prepare_columns(transactions)
+    date_ids, labels, revenues, counts = _daily_totals(prepared)
+    cust_ids, cust_labels = prepared["CustomerID"]
+
+    stride = max(len(cust_labels), 1)
+    pairs = np.unique(date_ids.astype(np.int64) * stride + cust_ids)
+    unique_customers = np.bincount(pairs // stride, minlength=len(labels))
+
+    return {
+        labels[g]: {
+            "revenue": float(revenues[g]),
+            "transaction_count": int(counts[g]),
+            "unique_customers": int(unique_customers[g]),
+        }
+        for g in sorted(range(len(labels)), key=lambda g: labels[g])
+    }
+
+
+def find_peak_sales_day(transactions, prepared=None):
+    """
+    Vectorized find_peak_sales_day().
+    """
+    prepared = prepared or prepare_columns(transactions)
+    _, labels, revenues, counts = _daily_totals(prepared)
+    if not labels:
+        raise ValueError("max() arg is an empty sequence")
+    # argmax returns the first maximum, like max() over first-seen dates
+    g = int(np.argmax(revenues))
+    return (labels[g], float(revenues[g]), int(counts[g]))
+
+
+def analyze_sales(transactions, top_n=5, low_threshold=10):
+    """
+    Vectorized equivalent of sales_aggregator.analyze_sales().
+
+    Parameters:
+        transactions (list): transaction dictionaries or a TransactionTable
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+
+    Returns:
+        dict: the same analysis results as sales_aggregator.finalize_analysis()
+
+    Requirements:
+    - Compute amounts as one array product
+    - Group on factorized keys with bincount / np.add.at
+    - Return exactly the structures of the pure-Python functions
+    """
+
+    prepared = prepare_columns(transactions)
+    daily_stats = daily_sales_trend(None, prepared=prepared)
+    dates = list(daily_stats)
+
+    return {
+        "total_revenue": _total(prepared["amount"]),
+        "transaction_count": len(prepared["amount"]),
+        "date_range": (dates[0], dates[-1]) if dates else None,
+        "region_stats": region_wise_sales(None, prepared=prepared),
+        "top_products": top_selling_products(None, n=top_n, prepared=prepared),
+        "top_customers": top_spending_customers(None, n=top_n, prepared=prepared),
+        "customer_count": len(prepared["CustomerID"][1]),
+        "daily_stats": daily_stats,
+        "peak_day": find_peak_sales_day(None, prepared=prepared) if dates else None,
+        "low_products": low_performing_products(None, threshold=low_threshold, prepared=prepared),
+    }
@@ -0,0 +1,254 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_handler import SAMPLE_SIZE, detect_encoding, iter_range_lines
+from utils.parse_transactions import iter_parse_transactions
+from utils.stream_pipeline import aggregate_lines, count_lines, FILTER_COUNTS
+from utils.sales_aggregator import (
+    new_accumulators,
+    merge_accumulators,
+    finalize_analysis,
+    new_enrichment_summary,
+    merge_enrichment,
+)
+from utils.enriched_writer import EnrichedWriter, guess_enriched_format, concat_enriched_parts
+from utils.instrumentation import instrumented
+
+
+def default_workers():
+    """
+    Returns the default worker count (one per CPU).
+    """
+    return os.cpu_count() or 1
+
+
+def compute_byte_ranges(filename, workers):
+    """
+    Splits the data lines of a sales file into newline-aligned byte ranges.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        workers (int): number of ranges wanted
+
+    Returns:
+        tuple: (encoding, ranges)
+        - encoding: detected from a bounded prefix sample
+        - ranges: list of (start, end) byte offsets in file order; the header line is
+          excluded and every boundary sits just after a newline
+    """
+
+    size = os.path.getsize(filename)
+
+    with open(filename, "rb") as f:
+        sample = f.read(SAMPLE_SIZE)
+        encoding = detect_encoding(sample)
+
+        # Data starts after the header line
+        f.seek(0)
+        f.readline()
+        data_start = f.tell()
+
+        step = max((size - data_start) // max(workers, 1), 1)
+        boundaries = [data_start]
+        for i in range(1, workers):
+            target = data_start + i * step
+            if target <= boundaries[-1]:
+                continue
+            # Move the boundary forward to the start of the next line
+            f.seek(target - 1)
+            f.readline()
+            aligned = f.tell()
+            if aligned >= size:
+                break
+            if aligned > boundaries[-1]:
+                boundaries.append(aligned)
+
+    boundaries.append(size)
+    ranges = [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+    return encoding, [r for r in ranges if r[1] > r[0]]
+
+
+def _map_in_order(func, tasks, workers):
+    """
+    Runs func over tasks in a process pool, yielding results in task order.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        yield from map(func, tasks)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        # executor.map yields in task order, whatever the completion order
+        yield from executor.map(func, tasks)
+
+
+def _parse_range(task):
+    """
+    Worker: parses one byte range into transaction dictionaries.
+    """
+    filename, start, end, encoding = task
+    stats = {}
+    lines = count_lines(iter_range_lines(filename, start, end, encoding), stats)
+    records = list(iter_parse_transactions(lines))
+    return records, stats["lines"]
+
+
+def _aggregate_range(task):
+    """
+    Worker: validates, filters, optionally enriches and aggregates one byte range.
+    """
+    filename, start, end, encoding, filters, product_mapping, enriched_part, counting_mode = task
+    enriched_part, part_format = enriched_part or (None, None)
+    distinct_error, heavy_hitter_capacity = counting_mode
+    region, min_amount, max_amount = filters
+
+    filter_summary = {}
+    acc = new_accumulators(distinct_error, heavy_hitter_capacity)
+    enrichment = new_enrichment_summary() if product_mapping is not None else None
+    out = EnrichedWriter(enriched_part, part_format, header=False) if enriched_part else None
+
+    try:
+        aggregate_lines(
+            iter_range_lines(filename, start, end, encoding), acc, region, min_amount, max_amount,
+            filter_summary=filter_summary,
+            product_mapping=product_mapping,
+            enrichment=enrichment,
+            out=out,
+        )
+    finally:
+        if out is not None:
+            out.close()
+
+    return acc, filter_summary, enrichment
+
+
+@instrumented()
+def parallel_parse_transactions(filename, workers=None):
+    """
+    Parses a sales file in parallel by sharding it into newline-aligned byte ranges.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        workers (int): number of worker processes (default: one per CPU)
+
+    Returns:
+        tuple: (transactions, lines_read)
+        - transactions: the same list parse_transactions(read_sales_data(filename)) returns
+        - lines_read: number of non-empty data lines read
+
+    Requirements:
+    - Parse each range in a process pool
+    - Concatenate results in file order so the output is deterministic
+    """
+
+    workers = workers or default_workers()
+    try:
+        encoding, ranges = compute_byte_ranges(filename, workers)
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return [], 0
+
+    tasks = [(filename, start, end, encoding) for start, end in ranges]
+    transactions = []
+    lines_read = 0
+
+    for records, count in _map_in_order(_parse_range, tasks, workers):
+        transactions.extend(records)
+        lines_read += count
+
+    print(f"Parsed {len(ranges)} byte ranges with {min(workers, max(len(ranges), 1))} workers ({encoding})")
+    return transactions, lines_read
+
+
+@instrumented(rows_out=lambda result: result[1]["final_count"])
+def parallel_sales_analysis(
+    filename,
+    region=None,
+    min_amount=None,
+    max_amount=None,
+    product_mapping=None,
+    enriched_file=None,
+    enriched_format=None,
+    workers=None,
+    top_n=5,
+    low_threshold=10,
+    distinct_error=None,
+    heavy_hitter_capacity=None,
+    dedup=None,
+    dedup_capacity=None,
+):
+    """
+    Parallel counterpart of stream_sales_analysis(): each worker returns partial aggregates.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        region, min_amount, max_amount: optional filters (see validate_and_filter())
+        product_mapping (dict): mapping from create_product_mapping() (optional)
+        enriched_file (str): path to write enriched rows to (optional, needs product_mapping)
+        enriched_format (str): 'text' or 'gzip' (default: from enriched_file); the
+                               columnar format cannot be written in parts
+        workers (int): number of worker processes (default: one per CPU)
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+        distinct_error (float): estimate daily unique customers with HyperLogLog
+                                sketches of this relative error (optional)
+        heavy_hitter_capacity (int): track products and customers with Space-Saving
+                                     sketches of this capacity (optional)
+        dedup, dedup_capacity: not supported; byte ranges cannot see each other's
+                               TransactionIDs, so deduplication needs a single process
+
+    Returns:
+        tuple: (analysis, filter_summary) like stream_sales_analysis()
+
+    Requirements:
+    - Merge partial accumulators in file order so results do not depend on
+      which worker finishes first
+    - Write enriched rows in file order by concatenating per-range part files
+    """
+
+    if dedup:
+        raise ValueError("Deduplication needs a single process (drop --workers)")
+    workers = workers or default_workers()
+    encoding, ranges = compute_byte_ranges(filename, workers)
+
+    part_dir = None
+    if enriched_file and product_mapping is not None:
+        enriched_format = enriched_format or guess_enriched_format(enriched_file)
+        if enriched_format == "columnar":
+            raise ValueError("The columnar enriched format needs a single process (drop --workers)")
+        part_dir = tempfile.mkdtemp(prefix="enriched_parts_")
+    tasks = [
+        (
+            filename, start, end, encoding,
+            (region, min_amount, max_amount),
+            product_mapping,
+            (os.path.join(part_dir, f"part_{i:05d}"), enriched_format) if part_dir else None,
+            (distinct_error, heavy_hitter_capacity),
+        )
+        for i, (start, end) in enumerate(ranges)
+    ]
+
+    acc = new_accumulators(distinct_error, heavy_hitter_capacity)
+    filter_summary = dict.fromkeys(FILTER_COUNTS, 0)
+    enrichment = new_enrichment_summary() if product_mapping is not None else None
+
+    try:
+        for part_acc, part_summary, part_enrichment in _map_in_order(_aggregate_range, tasks, workers):
+            merge_accumulators(acc, part_acc)
+            for key in FILTER_COUNTS:
+                filter_summary[key] += part_summary[key]
+            if enrichment is not None:
+                merge_enrichment(enrichment, part_enrichment)
+
+        if part_dir:
+            concat_enriched_parts(enriched_file, [task[6][0] for task in tasks], enriched_format)
+    finally:
+        if part_dir:
+            shutil.rmtree(part_dir, ignore_errors=True)
+
+    analysis = finalize_analysis(acc, top_n=top_n, low_threshold=low_threshold)
+    if enrichment is not None:
+        analysis["enrichment"] = enrichment
+
+    return analysis, filter_summary
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from utils.file_handler import CHUNK_SIZE, iter_sales_data
+from utils.parse_transactions import parse_transactions_table
+from utils.parallel_ingest import parallel_parse_transactions
+from utils.stream_pipeline import count_lines
+from utils.transaction_table import EncodedColumn, TransactionTable
+from utils.instrumentation import instrumented
+
+PARSE_CACHE_VERSION = 1
+MAGIC = b"SALESPC\x00"
+ALIGNMENT = 8
+
+
+def default_parse_cache_path(filename):
+    """
+    Returns the parse cache path used for a sales file (stored next to it).
+    """
+    return f"{filename}.parsed.bin"
+
+
+def file_fingerprint(filename):
+    """
+    Identifies the current contents of a sales file.
+
+    Returns:
+        dict: {'source', 'size', 'mtime_ns', 'content_hash'}
+    """
+    stat = os.stat(filename)
+    digest = hashlib.blake2b(digest_size=32)
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return {
+        "source": os.path.abspath(filename),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "content_hash": digest.hexdigest(),
+    }
+
+
+def _padding(offset):
+    return -offset % ALIGNMENT
+
+
+def write_table_file(path, table, header):
+    """
+    Writes a TransactionTable as a binary columnar file (temporary file + rename).
+
+    Layout: MAGIC, an 8-byte header length, a JSON header (the given header dict
+    plus row count, column descriptors and the lookup tables of encoded columns),
+    then one 8-byte aligned block per column holding its raw array bytes.
+    """
+
+    blocks = []
+    descriptors = []
+    offset = 0
+    for name, column in table.columns.items():
+        if isinstance(column, EncodedColumn):
+            data = column.codes.tobytes()
+            descriptor = {"name": name, "kind": "encoded", "typecode": column.codes.typecode,
+                          "values": column.values}
+        elif isinstance(column, array):
+            data = column.tobytes()
+            descriptor = {"name": name, "kind": "array", "typecode": column.typecode}
+        else:
+            # Plain string column (TransactionID): newline-joined UTF-8
+            data = "\n".join(column).encode("utf-8")
+            descriptor = {"name": name, "kind": "strings"}
+        descriptor.update(offset=offset, nbytes=len(data))
+        descriptors.append(descriptor)
+        blocks.append(data)
+        offset += len(data) + _padding(len(data))
+
+    header = json.dumps({
+        **header,
+        "byteorder": sys.byteorder,
+        "itemsizes": {typecode: array(typecode).itemsize for typecode in "iqd"},
+        "rows": len(table),
+        "columns": descriptors,
+    }).encode("utf-8")
+
+    data_start = len(MAGIC) + 8 + len(header)
+    data_start += _padding(data_start)
+
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\x00" * (data_start - f.tell()))
+        for data in blocks:
+            f.write(data)
+            f.write(b"\x00" * _padding(len(data)))
+    os.replace(tmp_file, path)
+
+
+def save_parse_cache(cache_file, table, fingerprint, lines_read):
+    """
+    Writes the parsed table of a sales file with write_table_file(), keyed on its fingerprint.
+    """
+    write_table_file(cache_file, table, {
+        "version": PARSE_CACHE_VERSION,
+        "fingerprint": fingerprint,
+        "lines_read": lines_read,
+    })
+
+
+def _read_header(mm):
+    if mm[:len(MAGIC)] != MAGIC:
+        return None, None
+    (header_size,) = struct.unpack_from("<Q", mm, len(MAGIC))
+    header_start = len(MAGIC) + 8
+    header = json.loads(mm[header_start:header_start + header_size].decode("utf-8"))
+    data_start = header_start + header_size
+    return header, data_start + _padding(data_start)
+
+
+def _cache_is_valid(header, fingerprint):
+    """
+    Returns (valid, reason) for reusing a parse cache on the current file.
+    """
+    if header is None or "fingerprint" not in header:
+        return False, "not a parse cache"
+    if header.get("version") != PARSE_CACHE_VERSION:
+        return False, "cache version changed"
+    if header["byteorder"] != sys.byteorder or any(
+        array(typecode).itemsize != size for typecode, size in header["itemsizes"].items()
+    ):
+        return False, "written on a different platform"
+    cached = header["fingerprint"]
+    for key, reason in [
+        ("source", "different source file"),
+        ("size", "file size changed"),
+        ("mtime_ns", "file modified"),
+        ("content_hash", "file content changed"),
+    ]:
+        if cached[key] != fingerprint[key]:
+            return False, reason
+    return True, "cache matches"
+
+
+def load_parse_cache(cache_file, fingerprint):
+    """
+    Loads a parse cache written by save_parse_cache() if it matches a fingerprint.
+
+    The file is memory-mapped and every column is filled straight from its byte
+    block, so no text is decoded, split or converted.
+
+    Returns:
+        tuple: (table, lines_read, reason) - table is None if the cache is missing,
+        unreadable or stale
+    """
+
+    try:
+        f = open(cache_file, "rb")
+    except FileNotFoundError:
+        return None, 0, "no cache"
+
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            return None, 0, f"unreadable cache ({e})"
+
+        with mm, memoryview(mm) as view:
+            try:
+                header, data_start = _read_header(mm)
+            except (struct.error, ValueError) as e:
+                return None, 0, f"unreadable cache ({e})"
+            valid, reason = _cache_is_valid(header, fingerprint)
+            if not valid:
+                return None, 0, reason
+            table = _table_from_view(view, header, data_start)
+
+    return table, header["lines_read"], reason
+
+
+def _table_from_view(view, header, data_start):
+    """
+    Rebuilds the TransactionTable described by header from the mapped file.
+    """
+    columns = {}
+    for descriptor in header["columns"]:
+        start = data_start + descriptor["offset"]
+        with view[start:start + descriptor["nbytes"]] as block:
+            if descriptor["kind"] == "strings":
+                text = str(block, "utf-8")
+                column = text.split("\n") if header["rows"] else []
+            else:
+                data = array(descriptor["typecode"])
+                data.frombytes(block)
+                if descriptor["kind"] == "encoded":
+                    values = descriptor["values"]
+                    column = EncodedColumn(values, {v: i for i, v in enumerate(values)}, data)
+                else:
+                    column = data
+        columns[descriptor["name"]] = column
+    return TransactionTable(columns)
+
+
+def read_table_file(path):
+    """
+    Reads a file written by write_table_file().
+
+    Returns:
+        tuple: (table, header)
+
+    Raises:
+        ValueError if path is not a columnar table file or was written on a
+        platform with a different byte order or item sizes
+    """
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        header, data_start = _read_header(mm)
+        if header is None:
+            raise ValueError(f"'{path}' is not a columnar table file")
+        if header["byteorder"] != sys.byteorder or any(
+            array(typecode).itemsize != size for typecode, size in header["itemsizes"].items()
+        ):
+            raise ValueError(f"'{path}' was written on a different platform")
+        return _table_from_view(view, header, data_start), header
+
+
+@instrumented()
+def cached_parse_transactions(filename, cache_file=None, workers=1):
+    """
+    Returns the parsed transactions of a sales file, reusing a binary parse cache.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        cache_file (str): parse cache path (default: next to filename)
+        workers (int): worker processes used to parse on a cache miss
+
+    Returns:
+        tuple: (table, lines_read, status)
+        - table: TransactionTable with the rows parse_transactions() would return
+        - lines_read: number of non-empty data lines in the file
+        - status: 'hit' or 'miss (<reason>)'
+
+    Requirements:
+    - Key the cache on the path, size, mtime and a content hash of the file
+    - Rebuild and rewrite the cache whenever any of them changed
+    - Do not write a cache if the file changed while it was being parsed
+    """
+
+    cache_file = cache_file or default_parse_cache_path(filename)
+    try:
+        fingerprint = file_fingerprint(filename)
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return TransactionTable(), 0, "miss (no source file)"
+
+    table, lines_read, reason = load_parse_cache(cache_file, fingerprint)
+    if table is not None:
+        return table, lines_read, "hit"
+
+    if workers > 1:
+        records, lines_read = parallel_parse_transactions(filename, workers=workers)
+        table = TransactionTable.from_records(records)
+    else:
+        stats = {}
+        table = parse_transactions_table(count_lines(iter_sales_data(filename), stats))
+        lines_read = stats["lines"]
+
+    stat = os.stat(filename)
+    if (stat.st_size, stat.st_mtime_ns) == (fingerprint["size"], fingerprint["mtime_ns"]):
+        save_parse_cache(cache_file, table, fingerprint, lines_read)
+    return table, lines_read, f"miss ({reason})"
@@ -1,22 +1,25 @@
-def parse_transactions(raw_lines):
+import sys
+
+from utils.transaction_table import TransactionTable
+from utils.instrumentation import instrumented
+
+
+def iter_parse_transactions(raw_lines):
     """
-    Parses raw lines into clean list of dictionaries.
+    Lazily parses raw lines into transaction dictionaries.
 
-    Returns:
-        list of dictionaries with keys:
-        ['TransactionID', 'Date', 'ProductID', 'ProductName',
-         'Quantity', 'UnitPrice', 'CustomerID', 'Region']
+    Parameters:
+        raw_lines (iterable): raw transaction lines, e.g. from iter_sales_data()
 
-    Requirements:
-    - Split by pipe delimiter '|'
-    - Handle commas within ProductName (remove or replace)
-    - Remove commas from numeric fields and convert to proper types
-    - Convert Quantity to int
-    - Convert UnitPrice to float
-    - Skip rows with incorrect number of fields
+    Yields:
+        dictionaries with the same keys as parse_transactions()
+
+    Dates, product IDs and names, customer IDs and regions repeat across rows, so
+    they are interned: every row shares one string object per distinct value
+    (less memory, and the string hash is computed once for all group-bys).
     """
 
-    transactions = []
+    intern = sys.intern
 
     for line in raw_lines:
         parts = line.split("|")
@@ -28,7 +31,7 @@ def parse_transactions(raw_lines):
         txn_id, date, product_id, product_name, qty_str, price_str, customer_id, region = parts
 
         # Clean ProductName: remove commas
-        product_name = product_name.replace(",", " ").strip()
+        product_name = intern(product_name.replace(",", " ").strip())
 
         # Clean numeric fields: remove commas, convert to proper types
         try:
@@ -39,17 +42,54 @@ def parse_transactions(raw_lines):
             continue
 
         # Build transaction dictionary
-        transaction = {
+        yield {
             "TransactionID": txn_id.strip(),
-            "Date": date.strip(),
-            "ProductID": product_id.strip(),
+            "Date": intern(date.strip()),
+            "ProductID": intern(product_id.strip()),
             "ProductName": product_name,
             "Quantity": quantity,
             "UnitPrice": unit_price,
-            "CustomerID": customer_id.strip(),
-            "Region": region.strip(),
+            "CustomerID": intern(customer_id.strip()),
+            "Region": intern(region.strip()),
         }
 
-        transactions.append(transaction)
 
-    return transactions
\ No newline at end of file
+@instrumented()
+def parse_transactions(raw_lines):
+    """
+    Parses raw lines into clean list of dictionaries.
+
+    Returns:
+        list of dictionaries with keys:
+        ['TransactionID', 'Date', 'ProductID', 'ProductName',
+         'Quantity', 'UnitPrice', 'CustomerID', 'Region']
+
+    Requirements:
+    - Split by pipe delimiter '|'
+    - Handle commas within ProductName (remove or replace)
+    - Remove commas from numeric fields and convert to proper types
+    - Convert Quantity to int
+    - Convert UnitPrice to float
+    - Skip rows with incorrect number of fields
+    """
+
+    return list(iter_parse_transactions(raw_lines))
+
+
+@instrumented()
+def parse_transactions_table(raw_lines):
+    """
+    Parses raw lines into a columnar TransactionTable.
+
+    Parameters:
+        raw_lines (iterable): raw transaction lines, e.g. from iter_sales_data()
+
+    Returns:
+        TransactionTable with the same rows parse_transactions() would return
+
+    Requirements:
+    - Same parsing and skipping rules as parse_transactions()
+    - Store rows column-wise instead of one dictionary per row
+    """
+
+    return TransactionTable.from_records(iter_parse_transactions(raw_lines))
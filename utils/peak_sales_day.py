@@ -1,9 +1,15 @@
+from utils.rollup_cube import RollupCube
+from utils.transaction_table import encoded_columns, group_totals
+from utils.instrumentation import instrumented
+
+
+@instrumented(rows_out=None)
 def find_peak_sales_day(transactions):
     """
     Identifies the date with highest revenue.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        transactions (list): list of transaction dictionaries, or a RollupCube
 
     Returns:
         tuple: (date, revenue, transaction_count)
@@ -12,18 +18,28 @@ def find_peak_sales_day(transactions):
         ('2024-12-15', 185000.0, 12)
     """
 
-    daily_stats = {}
-
-    # Aggregate by Date
-    for txn in transactions:
-        date = txn["Date"]
-        amount = txn["Quantity"] * txn["UnitPrice"]
-
-        if date not in daily_stats:
-            daily_stats[date] = {"revenue": 0.0, "transaction_count": 0}
-
-        daily_stats[date]["revenue"] += amount
-        daily_stats[date]["transaction_count"] += 1
+    if isinstance(transactions, RollupCube):
+        # Daily totals straight from the cube, dates in first-seen order
+        daily_stats = transactions.rollup("Date")
+    elif encoded_columns(transactions, "Date"):
+        # Group a TransactionTable on its Date codes
+        daily_stats = {
+            date: {"revenue": revenue, "transaction_count": count}
+            for date, (_, revenue, count) in group_totals(transactions, "Date").items()
+        }
+    else:
+        daily_stats = {}
+
+        # Aggregate by Date
+        for txn in transactions:
+            date = txn["Date"]
+            amount = txn["Quantity"] * txn["UnitPrice"]
+
+            if date not in daily_stats:
+                daily_stats[date] = {"revenue": 0.0, "transaction_count": 0}
+
+            daily_stats[date]["revenue"] += amount
+            daily_stats[date]["transaction_count"] += 1
 
     # Find peak sales day
     peak_date, peak_data = max(daily_stats.items(), key=lambda x: x[1]["revenue"])
@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CATEGORIES = ["smartphones", "laptops", "mobile-accessories", "tablets", "audio", "monitors"]
+BRANDS = ["Apple", "Samsung", "TechGear", "GadgetMaster", "Logitech", "Dell", ""]
+
+
+def generate_products(count, seed=42):
+    """
+    Generates DummyJSON-style product dictionaries with ids 1..count.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "id": product_id,
+            "title": f"Product {product_id}",
+            "category": rng.choice(CATEGORIES),
+            "brand": rng.choice(BRANDS),
+            "price": round(rng.uniform(5, 2000), 2),
+            "rating": round(rng.uniform(2.5, 5.0), 2),
+        }
+        for product_id in range(1, count + 1)
+    ]
+
+
+class ProductAPIStub(ThreadingHTTPServer):
+    """
+    Local stand-in for the DummyJSON /products endpoint.
+
+    Supports limit/skip paging (limit=0 returns everything), a per-page ETag
+    (a hash of the page) with If-None-Match -> 304, an optional per-request
+    latency and injected 503 failures every n-th request, so paging,
+    concurrency, retries and revalidation can be exercised offline. Products
+    may be edited in place between requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), product_count=194, latency=0.0,
+                 fail_every=0, max_limit=0, seed=42):
+        super().__init__(address, _ProductAPIHandler)
+        self.products = generate_products(product_count, seed)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.max_limit = max_limit
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/products"
+
+
+class _ProductAPIHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.request_count += 1
+            request_number = server.request_count
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+
+            url = urlparse(self.path)
+            if url.path.rstrip("/") != "/products":
+                self._send_json(404, {"message": "Not found"})
+                return
+            if server.fail_every and request_number % server.fail_every == 0:
+                self._send_json(503, {"message": "Injected failure"})
+                return
+
+            query = parse_qs(url.query)
+            skip = int(query.get("skip", ["0"])[0])
+            limit = int(query.get("limit", ["30"])[0])
+            if limit == 0:
+                limit = len(server.products)
+            if server.max_limit:
+                limit = min(limit, server.max_limit)
+
+            page = server.products[skip:skip + limit]
+            payload = {
+                "products": page,
+                "total": len(server.products),
+                "skip": skip,
+                "limit": len(page),
+            }
+            etag = '"' + hashlib.sha256(json.dumps(payload).encode()).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self._send_json(200, payload, etag)
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+
+    def _send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_product_api_stub(**kwargs):
+    """
+    Starts a ProductAPIStub on a background thread.
+
+    Parameters:
+        **kwargs: ProductAPIStub options (product_count, latency, fail_every, max_limit, seed)
+
+    Returns:
+        ProductAPIStub: running server; use server.url as base_url and server.shutdown() to stop
+    """
+    server = ProductAPIStub(**kwargs)
+    threading.Thread(target=server.serve_forever, name="product-api-stub", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the DummyJSON products API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--products", type=int, default=194)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay per request")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every n-th request with 503")
+    args = parser.parse_args()
+
+    stub = ProductAPIStub(("127.0.0.1", args.port), product_count=args.products,
+                          latency=args.latency, fail_every=args.fail_every)
+    print(f"Serving {args.products} products at {stub.url} (export SALES_API_URL={stub.url})")
+    stub.serve_forever()
@@ -0,0 +1,216 @@
+from utils.top_k import top_k
+
+
+def iter_bits(bits):
+    """
+    Yields the positions of the set bits of a non-negative int, lowest first.
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def bits_from_positions(positions, size):
+    """
+    Builds an int with the given bit positions set (all below size) in one step.
+    """
+    bitmap = bytearray((size + 7) // 8)
+    for position in positions:
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+class ProductBits:
+    """
+    Gives each product name a bit position so a set of products is one int.
+
+    A customer's products_bought is then a single small int (a few machine words
+    for hundreds of products) instead of a set of strings, unions are |, and the
+    names are only decoded when a customer's products are shown.
+
+    Attributes:
+        names (list): product name of each bit position
+        index (dict): product name -> bit position
+    """
+
+    __slots__ = ("names", "index", "_masks")
+
+    def __init__(self, names=()):
+        self.names = []
+        self.index = {}
+        self._masks = []
+        for name in names:
+            self.mask(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def mask(self, name):
+        """
+        Returns the single-bit int of a product, giving it the next position if new.
+        """
+        position = self.index.get(name)
+        if position is None:
+            position = self.index[name] = len(self.names)
+            self.names.append(name)
+            self._masks.append(1 << position)
+        return self._masks[position]
+
+    def encode(self, names):
+        """
+        Returns the bitset of several product names.
+        """
+        bits = 0
+        for name in names:
+            bits |= self.mask(name)
+        return bits
+
+    def decode(self, bits):
+        """
+        Returns the product names of a bitset, sorted like sorted(set_of_names).
+        """
+        names = self.names
+        return sorted(names[position] for position in iter_bits(bits))
+
+    def remapper(self, other):
+        """
+        Returns a function converting bitsets of another ProductBits into this one's
+        positions (adding any products this one has not seen).
+        """
+        masks = [self.mask(name) for name in other.names]
+        if all(mask == 1 << position for position, mask in enumerate(masks)):
+            # Same positions for every shared product: bitsets carry over unchanged
+            return lambda bits: bits
+
+        def remap(bits):
+            converted = 0
+            for position in iter_bits(bits):
+                converted |= masks[position]
+            return converted
+
+        return remap
+
+
+class ProductAffinity:
+    """
+    Co-purchase queries over per-customer product bitsets.
+
+    Answers "customers who bought X also bought Y" and product-pair counts with
+    bitset intersections: each product gets a bitset over customers (built once,
+    on the first query, by transposing the per-customer product bitsets) and the
+    customers two products share is the popcount of their AND.
+
+    Usage:
+        affinity = ProductAffinity.from_transactions(valid_txns)
+        affinity.also_bought("Laptop", n=3)     # [('Mouse', 4, 0.8), ...]
+        affinity.pair_counts(min_customers=2)   # {('Laptop', 'Mouse'): 4, ...}
+
+    Attributes:
+        product_bits (ProductBits): bit positions of the products
+        customers (list): customer IDs, indexed by customer position
+        bitsets (list): product bitset of each customer, same positions
+    """
+
+    def __init__(self, product_bits, customer_products):
+        self.product_bits = product_bits
+        self.customers = list(customer_products)
+        self.bitsets = list(customer_products.values())
+        self._buyers = None
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """
+        Builds the per-customer product bitsets of transaction dictionaries (or a table).
+        """
+        product_bits = ProductBits()
+        customer_products = {}
+        for txn in transactions:
+            cust_id = txn["CustomerID"]
+            customer_products[cust_id] = customer_products.get(cust_id, 0) | product_bits.mask(txn["ProductName"])
+        return cls(product_bits, customer_products)
+
+    def _product_buyers(self):
+        """
+        Bitset over customer positions of every product, indexed by product position.
+        """
+        if self._buyers is None:
+            positions = [[] for _ in range(len(self.product_bits))]
+            for customer, bits in enumerate(self.bitsets):
+                for product in iter_bits(bits):
+                    positions[product].append(customer)
+            size = len(self.customers)
+            self._buyers = [bits_from_positions(buyers, size) for buyers in positions]
+        return self._buyers
+
+    def _position(self, product):
+        position = self.product_bits.index.get(product)
+        if position is None:
+            raise KeyError(f"Unknown product: {product}")
+        return position
+
+    def customers_who_bought(self, product):
+        """
+        Returns the IDs of the customers who bought product, in first-seen order.
+        """
+        buyers = self._product_buyers()[self._position(product)]
+        return [self.customers[customer] for customer in iter_bits(buyers)]
+
+    def customer_count(self, product):
+        return self._product_buyers()[self._position(product)].bit_count()
+
+    def also_bought(self, product, n=5):
+        """
+        Customers who bought product also bought...
+
+        Parameters:
+            product (str): product name
+            n (int): number of products to return (default=5)
+
+        Returns:
+            list of tuples in format:
+            [
+                (ProductName, CustomersWhoBoughtBoth, Confidence),
+                ...
+            ]
+            sorted by the shared customer count descending, ties by name; confidence
+            is the share of product's customers who also bought the other product
+        """
+
+        buyers = self._product_buyers()
+        position = self._position(product)
+        wanted = buyers[position]
+        total = wanted.bit_count()
+
+        candidates = []
+        for other, other_buyers in enumerate(buyers):
+            if other == position:
+                continue
+            both = (wanted & other_buyers).bit_count()
+            if both:
+                candidates.append((self.product_bits.names[other], both, round(both / total, 4)))
+        candidates.sort(key=lambda x: x[0])
+        return top_k(candidates, n, key=lambda x: x[1])
+
+    def pair_counts(self, min_customers=1):
+        """
+        Counts the customers who bought each pair of products.
+
+        Parameters:
+            min_customers (int): leave out pairs with fewer customers (default=1)
+
+        Returns:
+            dict: {(ProductA, ProductB): customers} with ProductA < ProductB,
+            sorted by count descending, ties by pair
+        """
+
+        buyers = self._product_buyers()
+        names = self.product_bits.names
+        counts = {}
+        for a in range(len(buyers)):
+            bought_a = buyers[a]
+            for b in range(a + 1, len(buyers)):
+                both = (bought_a & buyers[b]).bit_count()
+                if both >= min_customers:
+                    counts[tuple(sorted((names[a], names[b])))] = both
+        return dict(sorted(counts.items(), key=lambda x: (-x[1], x[0])))
@@ -1,9 +1,15 @@
+from utils.rollup_cube import RollupCube
+from utils.transaction_table import encoded_columns, group_totals
+from utils.instrumentation import instrumented
+
+
+@instrumented()
 def region_wise_sales(transactions):
     """
     Analyzes sales by region.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        transactions (list): list of transaction dictionaries, or a RollupCube
 
     Returns:
         dict: region statistics in format:
@@ -21,22 +27,38 @@ def region_wise_sales(transactions):
     - Count transactions per region
     - Calculate percentage of total sales
     - Sort by total_sales in descending order
+    - Read a RollupCube's per-region totals in O(cells) instead of scanning rows
+    - Group a TransactionTable on integer region codes instead of strings
     """
 
     region_stats = {}
     total_sales = 0.0
 
-    # Aggregate by region
-    for txn in transactions:
-        region = txn["Region"]
-        amount = txn["Quantity"] * txn["UnitPrice"]
+    if isinstance(transactions, RollupCube):
+        # Roll the cube up to regions
+        for region, totals in transactions.rollup("Region").items():
+            region_stats[region] = {
+                "total_sales": totals["revenue"],
+                "transaction_count": totals["transaction_count"],
+            }
+            total_sales += totals["revenue"]
+    elif encoded_columns(transactions, "Region"):
+        # Group a TransactionTable on its Region codes
+        for region, (_, revenue, count) in group_totals(transactions, "Region").items():
+            region_stats[region] = {"total_sales": revenue, "transaction_count": count}
+            total_sales += revenue
+    else:
+        # Aggregate by region
+        for txn in transactions:
+            region = txn["Region"]
+            amount = txn["Quantity"] * txn["UnitPrice"]
 
-        if region not in region_stats:
-            region_stats[region] = {"total_sales": 0.0, "transaction_count": 0}
+            if region not in region_stats:
+                region_stats[region] = {"total_sales": 0.0, "transaction_count": 0}
 
-        region_stats[region]["total_sales"] += amount
-        region_stats[region]["transaction_count"] += 1
-        total_sales += amount
+            region_stats[region]["total_sales"] += amount
+            region_stats[region]["transaction_count"] += 1
+            total_sales += amount
 
     # Calculate percentages
     for region, stats in region_stats.items():
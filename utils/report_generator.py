@@ -1,17 +1,24 @@
 import os
 from datetime import datetime
-from utils.total_revenue import calculate_total_revenue
-from utils.region_wise_sales import region_wise_sales
-from utils.top_selling_products import top_selling_products
-from utils.customer_analysis import customer_analysis
-from utils.daily_sales_trend import daily_sales_trend
-from utils.peak_sales_day import find_peak_sales_day
-from utils.low_performing_products import low_performing_products
-
-def generate_sales_report(transactions, enriched_transactions, output_file="output/sales_report.txt"):
+from utils.sales_aggregator import analyze_sales, summarize_enrichment
+from utils.instrumentation import instrumented
+
+@instrumented(rows_out=None)
+def generate_sales_report(transactions, enriched_transactions, output_file="output/sales_report.txt", analysis=None):
     """
     Generates a comprehensive formatted text report.
 
+    Parameters:
+        transactions (list): list of validated transaction dictionaries
+        enriched_transactions (list): list of enriched transaction dictionaries
+        output_file (str): path of the report file
+        analysis (dict): precomputed results from analyze_sales() (optional);
+                         computed from transactions in one pass when omitted.
+                         An 'enrichment' entry (see summarize_enrichment()) replaces
+                         enriched_transactions, so both lists may be None, and a
+                         'duplicates' entry (rows dropped by deduplicate()) is
+                         shown in the overall summary
+
     Report Includes (in order):
     1. HEADER
     2. OVERALL SUMMARY
@@ -26,21 +33,25 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
     # Ensure output directory exists at run
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
+    # Single pass over the transactions for every section
+    if analysis is None:
+        analysis = analyze_sales(transactions)
+
     # HEADER
     report_lines = []
     report_lines.append("=" * 43)
     report_lines.append("          SALES ANALYTICS REPORT")
     report_lines.append(f"        Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report_lines.append(f"        Records Processed: {len(transactions)}")
+    report_lines.append(f"        Records Processed: {analysis['transaction_count']}")
     report_lines.append("=" * 43)
     report_lines.append("")
 
     # OVERALL SUMMARY
-    total_revenue = calculate_total_revenue(transactions)
-    total_transactions = len(transactions)
+    total_revenue = analysis["total_revenue"]
+    total_transactions = analysis["transaction_count"]
     avg_order_value = round(total_revenue / total_transactions, 2) if total_transactions else 0
-    dates = sorted(set(txn["Date"] for txn in transactions))
-    date_range = f"{dates[0]} to {dates[-1]}" if dates else "N/A"
+    dates = analysis["date_range"]
+    date_range = f"{dates[0]} to {dates[1]}" if dates else "N/A"
 
     report_lines.append("OVERALL SUMMARY")
     report_lines.append("-" * 44)
@@ -48,10 +59,12 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
     report_lines.append(f"Total Transactions:   {total_transactions}")
     report_lines.append(f"Average Order Value:  ₹{avg_order_value:,.2f}")
     report_lines.append(f"Date Range:           {date_range}")
+    if analysis.get("duplicates") is not None:
+        report_lines.append(f"Duplicates Removed:   {analysis['duplicates']}")
     report_lines.append("")
 
     # REGION-WISE PERFORMANCE
-    region_stats = region_wise_sales(transactions)
+    region_stats = analysis["region_stats"]
     report_lines.append("REGION-WISE PERFORMANCE")
     report_lines.append("-" * 44)
     report_lines.append("Region    Sales         % of Total  Transactions")
@@ -61,29 +74,45 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
         )
     report_lines.append("")
 
-    # TOP 5 PRODUCTS
-    top_products = top_selling_products(transactions, n=5)
+    # TOP 5 PRODUCTS (heavy-hitter sketch estimates carry their error bounds)
+    top_products = analysis["top_products"]
+    heavy_hitter_error = analysis.get("heavy_hitter_error")
     report_lines.append("TOP 5 PRODUCTS")
     report_lines.append("-" * 44)
     report_lines.append("Rank  Product Name       Quantity   Revenue")
     for i, (name, qty, revenue) in enumerate(top_products, start=1):
         report_lines.append(f"{i:<5} {name:<18} {qty:<9} ₹{revenue:,.0f}")
+    if heavy_hitter_error:
+        if heavy_hitter_error["product_quantity"] or heavy_hitter_error["product_revenue"]:
+            report_lines.append(
+                f"(estimated: quantity +{heavy_hitter_error['product_quantity']:,.0f}, "
+                f"revenue +₹{heavy_hitter_error['product_revenue']:,.0f} at most)"
+            )
+        else:
+            report_lines.append("(exact: no product was evicted from the sketch)")
     report_lines.append("")
 
     # TOP 5 CUSTOMERS
-    customer_stats = customer_analysis(transactions)
+    top_customers = analysis["top_customers"]
     report_lines.append("TOP 5 CUSTOMERS")
     report_lines.append("-" * 44)
     report_lines.append("Rank  Customer ID   Total Spent   Orders")
-    for i, (cust_id, stats) in enumerate(customer_stats.items(), start=1):
-        if i > 5: break
+    for i, (cust_id, stats) in enumerate(top_customers.items(), start=1):
         report_lines.append(
             f"{i:<5} {cust_id:<12} ₹{stats['total_spent']:,.0f}   {stats['purchase_count']}"
         )
+    if heavy_hitter_error:
+        if heavy_hitter_error["customer_spent"] or heavy_hitter_error["customer_orders"]:
+            report_lines.append(
+                f"(estimated: spend +₹{heavy_hitter_error['customer_spent']:,.0f}, "
+                f"orders +{heavy_hitter_error['customer_orders']:,.0f} at most)"
+            )
+        else:
+            report_lines.append("(exact: no customer was evicted from the sketch)")
     report_lines.append("")
 
     # DAILY SALES TREND
-    daily_stats = daily_sales_trend(transactions)
+    daily_stats = analysis["daily_stats"]
     report_lines.append("DAILY SALES TREND")
     report_lines.append("-" * 44)
     report_lines.append("Date         Revenue       Transactions   Unique Customers")
@@ -94,8 +123,8 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
     report_lines.append("")
 
     # PRODUCT PERFORMANCE ANALYSIS
-    peak_day = find_peak_sales_day(transactions)
-    low_products = low_performing_products(transactions)
+    peak_day = analysis["peak_day"]
+    low_products = analysis["low_products"]
     avg_per_region = {
         region: round(stats["total_sales"] / stats["transaction_count"], 2)
         for region, stats in region_stats.items()
@@ -103,8 +132,13 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
 
     report_lines.append("PRODUCT PERFORMANCE ANALYSIS")
     report_lines.append("-" * 44)
-    report_lines.append(f"Best Selling Day: {peak_day[0]} (Revenue ₹{peak_day[1]:,.0f}, Transactions {peak_day[2]})")
-    if low_products:
+    if peak_day:
+        report_lines.append(f"Best Selling Day: {peak_day[0]} (Revenue ₹{peak_day[1]:,.0f}, Transactions {peak_day[2]})")
+    else:
+        report_lines.append("Best Selling Day: N/A")
+    if low_products is None:
+        report_lines.append("Low Performing Products: not available in heavy-hitter sketch mode")
+    elif low_products:
         report_lines.append("Low Performing Products:")
         for product, qty, revenue in low_products:
             report_lines.append(f"  {product:<15} Qty: {qty:<3} Revenue: ₹{revenue:,.0f}")
@@ -116,9 +150,16 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
     report_lines.append("")
 
     # API ENRICHMENT SUMMARY
-    enriched_count = sum(1 for txn in enriched_transactions if txn.get("API_Match"))
-    success_rate = round((enriched_count / len(enriched_transactions)) * 100, 2) if enriched_transactions else 0
-    failed_products = [txn["ProductID"] for txn in enriched_transactions if not txn.get("API_Match")]
+    # One line per unmatched row: in row order from the enriched rows, or grouped by
+    # product from the counts of an 'enrichment' summary (streaming modes keep no rows)
+    enrichment = analysis.get("enrichment")
+    if enrichment is None:
+        enrichment = summarize_enrichment(enriched_transactions)
+        failed_products = [txn["ProductID"] for txn in enriched_transactions if not txn.get("API_Match")]
+    else:
+        failed_products = [pid for pid, rows in enrichment["failed_counts"].items() for _ in range(rows)]
+    enriched_count = enrichment["enriched_count"]
+    success_rate = enrichment["success_rate"]
 
     report_lines.append("API ENRICHMENT SUMMARY")
     report_lines.append("-" * 44)
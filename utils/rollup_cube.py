@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+
+from utils.hyperloglog import HyperLogLog
+from utils.instrumentation import instrumented
+
+CUBE_DIMENSIONS = ["Date", "Region", "ProductID", "ProductName"]
+# Distinct customers are kept per (Date, Region), so they survive slicing on those two
+CUSTOMER_DIMENSIONS = ["Date", "Region"]
+CUBE_VERSION = 1
+CUBE_FILE = "output/sales_cube.json"
+
+
+class RollupCube:
+    """
+    Pre-aggregated sales keyed by (Date, Region, ProductID, ProductName).
+
+    Built once from the transactions, after which slice, dice and roll-up
+    queries cost O(cells) instead of O(transactions). Cells keep the order in
+    which their key was first seen, so rolled-up groups come out in the same
+    first-seen order as a scan of the rows would give them.
+
+    Usage:
+        cube = RollupCube.from_transactions(valid_txns)
+        cube.rollup("Region")                        # {'North': {...}, ...}
+        cube.rollup("Date", "Region", Region="North")
+        cube.dice(Date=["2024-12-01", "2024-12-02"]).rollup("ProductName")
+
+    Attributes:
+        cells (dict): (Date, Region, ProductID, ProductName) -> [quantity, revenue, transaction_count]
+        customers (dict): (Date, Region) -> set of CustomerIDs (HyperLogLog if distinct_error),
+                          or None once the cube is diced on a product dimension
+        distinct_error (float): relative error of the customer sketches, None for exact sets
+    """
+
+    def __init__(self, distinct_error=None):
+        self.cells = {}
+        self.customers = {}
+        self.distinct_error = distinct_error
+
+    def __len__(self):
+        return len(self.cells)
+
+    @classmethod
+    def from_transactions(cls, transactions, distinct_error=None):
+        """
+        Builds a cube from transaction dictionaries (or a TransactionTable) in one pass.
+        """
+        cube = cls(distinct_error)
+        cube.update(transactions)
+        return cube
+
+    def _new_customers(self, copy_of=None):
+        customers = HyperLogLog.from_error(self.distinct_error) if self.distinct_error else set()
+        if copy_of is not None:
+            customers |= copy_of
+        return customers
+
+    def add(self, txn):
+        """
+        Adds one transaction to its cell.
+        """
+        date, region = txn["Date"], txn["Region"]
+        key = (date, region, txn["ProductID"], txn["ProductName"])
+        qty = txn["Quantity"]
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = [0, 0.0, 0]
+        cell[0] += qty
+        cell[1] += qty * txn["UnitPrice"]
+        cell[2] += 1
+
+        customers = self.customers.get((date, region))
+        if customers is None:
+            customers = self.customers[(date, region)] = self._new_customers()
+        customers.add(txn["CustomerID"])
+
+    def update(self, transactions):
+        for txn in transactions:
+            self.add(txn)
+
+    def merge(self, other):
+        """
+        Adds the cells and customers of another cube (built with the same distinct_error) in place.
+        """
+        if other.distinct_error != self.distinct_error:
+            raise ValueError("Cannot merge cubes with different distinct-count modes")
+        for key, (qty, revenue, count) in other.cells.items():
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = [qty, revenue, count]
+            else:
+                cell[0] += qty
+                cell[1] += revenue
+                cell[2] += count
+
+        if self.customers is None or other.customers is None:
+            self.customers = None
+            return self
+        for key, customers in other.customers.items():
+            mine = self.customers.get(key)
+            if mine is None:
+                mine = self.customers[key] = self._new_customers()
+            mine |= customers
+        return self
+
+    @staticmethod
+    def _matcher(filters):
+        """
+        Returns predicate(key) for filters {dimension: value or list/tuple/set of values}.
+        """
+        unknown = [name for name in filters if name not in CUBE_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {', '.join(unknown)}")
+        checks = []
+        for name, wanted in filters.items():
+            if not isinstance(wanted, (list, tuple, set, frozenset)):
+                wanted = (wanted,)
+            checks.append((CUBE_DIMENSIONS.index(name), frozenset(wanted)))
+        return lambda key: all(key[position] in wanted for position, wanted in checks)
+
+    def dice(self, **filters):
+        """
+        Returns the sub-cube whose cells match every filter.
+
+        Each filter is a dimension name with one value (a slice) or a list of
+        values (a dice), e.g. dice(Region="North", Date=["2024-12-01", "2024-12-02"]).
+        Filtering on ProductID or ProductName drops the customer sets, which
+        are only kept per (Date, Region).
+        """
+
+        matches = self._matcher(filters)
+        sub = RollupCube(self.distinct_error)
+        sub.cells = {key: list(cell) for key, cell in self.cells.items() if matches(key)}
+        if self.customers is None or any(name not in CUSTOMER_DIMENSIONS for name in filters):
+            sub.customers = None
+        else:
+            sub.customers = {
+                key: self._new_customers(customers) for key, customers in self.customers.items()
+                if matches(key + (None, None))
+            }
+        return sub
+
+    slice = dice
+
+    def rollup(self, *dimensions, **filters):
+        """
+        Totals the cells grouped by some dimensions.
+
+        Parameters:
+            *dimensions (str): dimensions to keep, in key order (none for a grand total)
+            **filters: restrict the cells first, as in dice()
+
+        Returns:
+            dict: groups in first-seen order, keyed by the dimension value (one
+            dimension), a tuple of values (several) or () (none):
+            {
+                'North': {'quantity': 120, 'revenue': 450000.0, 'transaction_count': 15},
+                ...
+            }
+        """
+
+        unknown = [name for name in dimensions if name not in CUBE_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {', '.join(unknown)}")
+        positions = [CUBE_DIMENSIONS.index(name) for name in dimensions]
+        matches = self._matcher(filters) if filters else None
+
+        groups = {}
+        for key, (qty, revenue, count) in self.cells.items():
+            if matches is not None and not matches(key):
+                continue
+            if len(positions) == 1:
+                group_key = key[positions[0]]
+            else:
+                group_key = tuple(key[position] for position in positions)
+            group = groups.get(group_key)
+            if group is None:
+                groups[group_key] = {"quantity": qty, "revenue": revenue, "transaction_count": count}
+            else:
+                group["quantity"] += qty
+                group["revenue"] += revenue
+                group["transaction_count"] += count
+        return groups
+
+    def unique_customers(self, *dimensions):
+        """
+        Distinct customers grouped by Date and/or Region (no dimensions: overall).
+
+        Returns:
+            dict: {group key: count} in first-seen order, keyed like rollup()
+
+        Raises:
+            ValueError if a dimension is not Date or Region, or the cube was diced
+            on a product dimension
+        """
+
+        if any(name not in CUSTOMER_DIMENSIONS for name in dimensions):
+            raise ValueError(f"Distinct customers can only be grouped by {' and '.join(CUSTOMER_DIMENSIONS)}")
+        if self.customers is None:
+            raise ValueError("Distinct customers are not available after dicing on a product dimension")
+        positions = [CUSTOMER_DIMENSIONS.index(name) for name in dimensions]
+
+        groups = {}
+        for key, customers in self.customers.items():
+            if len(positions) == 1:
+                group_key = key[positions[0]]
+            else:
+                group_key = tuple(key[position] for position in positions)
+            group = groups.get(group_key)
+            if group is None:
+                groups[group_key] = group = self._new_customers()
+            group |= customers
+        return {group_key: len(customers) for group_key, customers in groups.items()}
+
+    def to_dict(self):
+        """
+        Converts the cube into JSON-serializable form, restored with from_dict().
+        """
+        customers = None
+        if self.customers is not None:
+            customers = [
+                [date, region, ids.to_dict() if isinstance(ids, HyperLogLog) else sorted(ids)]
+                for (date, region), ids in self.customers.items()
+            ]
+        return {
+            "version": CUBE_VERSION,
+            "dimensions": CUBE_DIMENSIONS,
+            "distinct_error": self.distinct_error,
+            "cells": [list(key) + cell for key, cell in self.cells.items()],
+            "customers": customers,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != CUBE_VERSION:
+            raise ValueError(f"Unsupported cube version: {data.get('version')}")
+        cube = cls(data.get("distinct_error"))
+        cube.cells = {tuple(row[:4]): row[4:] for row in data["cells"]}
+        if data["customers"] is None:
+            cube.customers = None
+        else:
+            cube.customers = {
+                (date, region): HyperLogLog.from_dict(ids) if cube.distinct_error else set(ids)
+                for date, region, ids in data["customers"]
+            }
+        return cube
+
+
+@instrumented(rows_out=len)
+def build_rollup_cube(transactions, distinct_error=None):
+    """
+    Builds the rollup cube of a list of transactions (see RollupCube).
+
+    Parameters:
+        transactions (list): transaction dictionaries or a TransactionTable
+        distinct_error (float): count unique customers with HyperLogLog sketches
+                                of this relative error instead of sets (optional)
+
+    Returns:
+        RollupCube: one cell per distinct (Date, Region, ProductID, ProductName)
+    """
+    return RollupCube.from_transactions(transactions, distinct_error)
+
+
+def save_rollup_cube(cube, filename=CUBE_FILE):
+    """
+    Writes a cube as JSON (temporary file + rename).
+    """
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    tmp_file = f"{filename}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(cube.to_dict(), f)
+    os.replace(tmp_file, filename)
+
+
+def load_rollup_cube(filename=CUBE_FILE):
+    with open(filename, "r", encoding="utf-8") as f:
+        return RollupCube.from_dict(json.load(f))
+
+
+def format_rollup(groups, dimensions):
+    """
+    Formats rollup() groups as a text table sorted by revenue descending.
+    """
+    headers = list(dimensions) + ["Quantity", "Revenue", "Transactions"]
+    rows = []
+    for group_key, totals in sorted(groups.items(), key=lambda x: x[1]["revenue"], reverse=True):
+        values = list(group_key) if isinstance(group_key, tuple) else [group_key]
+        rows.append([str(value) for value in values] + [
+            f"{totals['quantity']:,}", f"₹{totals['revenue']:,.2f}", f"{totals['transaction_count']:,}"
+        ])
+    widths = [max([len(header)] + [len(row[i]) for row in rows]) for i, header in enumerate(headers)]
+    lines = ["  ".join(f"{header:<{width}}" for header, width in zip(headers, widths)).rstrip()]
+    lines.append("-" * sum(widths + [2 * (len(widths) - 1)]))
+    lines.extend("  ".join(f"{value:<{width}}" for value, width in zip(row, widths)).rstrip() for row in rows)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drill-down queries on a saved sales rollup cube.")
+    parser.add_argument("cube", nargs="?", default=CUBE_FILE, help=f"cube file (default: {CUBE_FILE})")
+    parser.add_argument("--by", nargs="*", default=["Region"], choices=CUBE_DIMENSIONS, metavar="DIMENSION",
+                        help=f"dimensions to group by, any of {', '.join(CUBE_DIMENSIONS)} (default: Region)")
+    parser.add_argument("--where", action="append", default=[], metavar="DIMENSION=VALUE[,VALUE...]",
+                        help="keep only cells with one of these values (repeatable)")
+    args = parser.parse_args(argv)
+
+    filters = {}
+    for condition in args.where:
+        name, sep, values = condition.partition("=")
+        if not sep:
+            parser.error(f"--where expects DIMENSION=VALUE, got '{condition}'")
+        filters[name] = values.split(",")
+
+    cube = load_rollup_cube(args.cube)
+    try:
+        groups = cube.rollup(*args.by, **filters)
+    except ValueError as e:
+        parser.error(str(e))
+    print(format_rollup(groups, args.by))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,625 @@
+from collections import Counter
+from operator import methodcaller
+
+from utils.hyperloglog import HyperLogLog
+from utils.space_saving import (
+    SpaceSaving,
+    new_heavy_hitters,
+    add_heavy_hitters,
+    merge_heavy_hitters,
+    heavy_hitter_top_products,
+    heavy_hitter_top_customers,
+    heavy_hitter_error_bounds,
+)
+from utils.top_k import top_products, top_customers
+from utils.product_bitsets import ProductBits
+from utils.transaction_table import TransactionTable, EnrichedRows, encoded_columns
+from utils.instrumentation import instrumented
+
+
+def new_accumulators(distinct_error=None, heavy_hitter_capacity=None):
+    """
+    Creates an empty set of accumulators for single-pass aggregation.
+
+    Parameters:
+        distinct_error (float): if given, daily unique customers are counted with a
+                                HyperLogLog sketch of this relative error instead of a set
+        heavy_hitter_capacity (int): if given, products and customers are tracked with
+                                     Space-Saving sketches of this capacity instead of
+                                     exact per-key dictionaries (fixed memory)
+
+    Returns:
+        dict: accumulator state in format:
+        {
+            'total_revenue': 0,
+            'transaction_count': 0,
+            'regions': {'North': {'total_sales': 0.0, 'transaction_count': 0}, ...},
+            'products': {'Mouse': {'quantity': 0, 'revenue': 0.0}, ...},
+            'customers': {'C001': {'total_spent': 0.0, 'purchase_count': 0, 'products_bought': 0b101}, ...},
+            'product_bits': ProductBits(),  # bit position of each product in products_bought
+            'daily': {'2024-12-01': {'revenue': 0.0, 'transaction_count': 0, 'unique_customers': set()}, ...},
+            'distinct_error': None,
+            'heavy_hitter_capacity': None,
+            'heavy_hitters': None       # new_heavy_hitters() sketches in sketch mode
+        }
+    """
+    return {
+        "total_revenue": 0,
+        "transaction_count": 0,
+        "regions": {},
+        "products": {},
+        "customers": {},
+        "daily": {},
+        "product_bits": ProductBits(),
+        "distinct_error": distinct_error,
+        "heavy_hitter_capacity": heavy_hitter_capacity,
+        "heavy_hitters": new_heavy_hitters(heavy_hitter_capacity) if heavy_hitter_capacity else None,
+    }
+
+
+def accumulator_mode(acc):
+    """
+    Returns the counting mode of an accumulator state (live or serialized):
+    (distinct_error, heavy_hitter_capacity), both None for exact counting.
+    """
+    return acc.get("distinct_error"), acc.get("heavy_hitter_capacity")
+
+
+def _new_daily(acc):
+    distinct_error = acc.get("distinct_error")
+    return {
+        "revenue": 0.0,
+        "transaction_count": 0,
+        "unique_customers": HyperLogLog.from_error(distinct_error) if distinct_error else set(),
+    }
+
+
+def accumulate_transaction(acc, txn):
+    """
+    Adds a single transaction to every accumulator.
+
+    Parameters:
+        acc (dict): accumulator state from new_accumulators()
+        txn (dict): transaction dictionary
+
+    Requirements:
+    - Compute Quantity * UnitPrice once per transaction
+    - Update region, product, customer and daily accumulators in the same step
+    - In sketch mode, feed products and customers into the heavy-hitter sketches
+    """
+
+    amount = txn["Quantity"] * txn["UnitPrice"]
+    region = txn["Region"]
+    product = txn["ProductName"]
+    cust_id = txn["CustomerID"]
+    date = txn["Date"]
+
+    acc["total_revenue"] += amount
+    acc["transaction_count"] += 1
+
+    region_acc = acc["regions"].get(region)
+    if region_acc is None:
+        region_acc = acc["regions"][region] = {"total_sales": 0.0, "transaction_count": 0}
+    region_acc["total_sales"] += amount
+    region_acc["transaction_count"] += 1
+
+    heavy_hitters = acc.get("heavy_hitters")
+    if heavy_hitters is not None:
+        add_heavy_hitters(heavy_hitters, txn, amount)
+    else:
+        product_acc = acc["products"].get(product)
+        if product_acc is None:
+            product_acc = acc["products"][product] = {"quantity": 0, "revenue": 0.0}
+        product_acc["quantity"] += txn["Quantity"]
+        product_acc["revenue"] += amount
+
+        customer_acc = acc["customers"].get(cust_id)
+        if customer_acc is None:
+            customer_acc = acc["customers"][cust_id] = {
+                "total_spent": 0.0,
+                "purchase_count": 0,
+                "products_bought": 0,
+            }
+        customer_acc["total_spent"] += amount
+        customer_acc["purchase_count"] += 1
+        customer_acc["products_bought"] |= acc["product_bits"].mask(product)
+
+    daily_acc = acc["daily"].get(date)
+    if daily_acc is None:
+        daily_acc = acc["daily"][date] = _new_daily(acc)
+    daily_acc["revenue"] += amount
+    daily_acc["transaction_count"] += 1
+    daily_acc["unique_customers"].add(cust_id)
+
+
+def accumulate_table(acc, table):
+    """
+    Adds every row of a TransactionTable to the accumulators.
+
+    Parameters:
+        acc (dict): accumulator state from new_accumulators()
+        table (TransactionTable): rows to add
+
+    Requirements:
+    - Group on the integer codes of the Region, ProductName, CustomerID and Date
+      columns with lists indexed by code, so no string is hashed per row
+    - Decode each distinct value once, when the groups are folded into acc
+      (products_bought bitsets use acc's product bit positions directly)
+    - Keep first-seen key order and row-order sums, so a fresh acc ends up exactly
+      as if every row had gone through accumulate_transaction()
+    - In sketch mode, feed rows one by one (Space-Saving depends on row order)
+    """
+
+    columns = encoded_columns(table, "Region", "ProductName", "CustomerID", "Date")
+    if columns is None or acc.get("heavy_hitters") is not None:
+        for txn in table:
+            accumulate_transaction(acc, txn)
+        return acc
+
+    region_column, product_column, customer_column, date_column = columns
+    product_bits = acc["product_bits"]
+    regions = [None] * len(region_column.values)
+    products = [None] * len(product_column.values)
+    product_masks = [0] * len(product_column.values)
+    customers = [None] * len(customer_column.values)
+    daily = [None] * len(date_column.values)
+    region_order, product_order, customer_order, date_order = [], [], [], []
+    total = 0
+
+    for region, product, cust_id, date, qty, price in zip(
+        region_column.codes, product_column.codes, customer_column.codes, date_column.codes,
+        table.columns["Quantity"], table.columns["UnitPrice"],
+    ):
+        amount = qty * price
+        total += amount
+
+        stats = regions[region]
+        if stats is None:
+            stats = regions[region] = [0.0, 0]
+            region_order.append(region)
+        stats[0] += amount
+        stats[1] += 1
+
+        stats = products[product]
+        if stats is None:
+            stats = products[product] = [0, 0.0]
+            product_order.append(product)
+            product_masks[product] = product_bits.mask(product_column.values[product])
+        stats[0] += qty
+        stats[1] += amount
+
+        stats = customers[cust_id]
+        if stats is None:
+            stats = customers[cust_id] = [0.0, 0, 0]
+            customer_order.append(cust_id)
+        stats[0] += amount
+        stats[1] += 1
+        stats[2] |= product_masks[product]
+
+        stats = daily[date]
+        if stats is None:
+            stats = daily[date] = [0.0, 0, set()]
+            date_order.append(date)
+        stats[0] += amount
+        stats[1] += 1
+        stats[2].add(cust_id)
+
+    # Fold the code-indexed groups into the string-keyed accumulators
+    acc["total_revenue"] += total
+    acc["transaction_count"] += len(table)
+
+    for region in region_order:
+        sales, count = regions[region]
+        region_acc = acc["regions"].get(region_column.values[region])
+        if region_acc is None:
+            region_acc = acc["regions"][region_column.values[region]] = {"total_sales": 0.0, "transaction_count": 0}
+        region_acc["total_sales"] += sales
+        region_acc["transaction_count"] += count
+
+    for product in product_order:
+        qty, revenue = products[product]
+        product_acc = acc["products"].get(product_column.values[product])
+        if product_acc is None:
+            product_acc = acc["products"][product_column.values[product]] = {"quantity": 0, "revenue": 0.0}
+        product_acc["quantity"] += qty
+        product_acc["revenue"] += revenue
+
+    for cust_id in customer_order:
+        spent, count, bought = customers[cust_id]
+        customer_acc = acc["customers"].get(customer_column.values[cust_id])
+        if customer_acc is None:
+            customer_acc = acc["customers"][customer_column.values[cust_id]] = {
+                "total_spent": 0.0,
+                "purchase_count": 0,
+                "products_bought": 0,
+            }
+        customer_acc["total_spent"] += spent
+        customer_acc["purchase_count"] += count
+        customer_acc["products_bought"] |= bought
+
+    customer_ids = customer_column.values
+    for date in date_order:
+        revenue, count, seen = daily[date]
+        daily_acc = acc["daily"].get(date_column.values[date])
+        if daily_acc is None:
+            daily_acc = acc["daily"][date_column.values[date]] = _new_daily(acc)
+        daily_acc["revenue"] += revenue
+        daily_acc["transaction_count"] += count
+        daily_acc["unique_customers"].update(customer_ids[cust_id] for cust_id in seen)
+
+    return acc
+
+
+def merge_accumulators(acc, other):
+    """
+    Merges another accumulator state into acc.
+
+    Parameters:
+        acc (dict): accumulator state that receives the totals
+        other (dict): accumulator state from a later part of the data
+
+    Returns:
+        dict: acc, updated in place
+
+    Requirements:
+    - Keys first seen in acc keep their position, new keys from other follow in
+      other's order, so merging partial results in file order keeps first-seen order
+    - Both states must use the same counting mode (see accumulator_mode())
+    """
+
+    if accumulator_mode(acc) != accumulator_mode(other):
+        raise ValueError("Cannot merge accumulators with different counting modes")
+
+    if acc.get("heavy_hitters") is not None:
+        merge_heavy_hitters(acc["heavy_hitters"], other["heavy_hitters"])
+
+    acc["total_revenue"] += other["total_revenue"]
+    acc["transaction_count"] += other["transaction_count"]
+
+    for region, stats in other["regions"].items():
+        region_acc = acc["regions"].setdefault(region, {"total_sales": 0.0, "transaction_count": 0})
+        region_acc["total_sales"] += stats["total_sales"]
+        region_acc["transaction_count"] += stats["transaction_count"]
+
+    for product, stats in other["products"].items():
+        product_acc = acc["products"].setdefault(product, {"quantity": 0, "revenue": 0.0})
+        product_acc["quantity"] += stats["quantity"]
+        product_acc["revenue"] += stats["revenue"]
+
+    # Product bit positions depend on first-seen order: convert other's bitsets
+    remap = acc["product_bits"].remapper(other["product_bits"])
+    for cust_id, stats in other["customers"].items():
+        customer_acc = acc["customers"].setdefault(
+            cust_id, {"total_spent": 0.0, "purchase_count": 0, "products_bought": 0}
+        )
+        customer_acc["total_spent"] += stats["total_spent"]
+        customer_acc["purchase_count"] += stats["purchase_count"]
+        customer_acc["products_bought"] |= remap(stats["products_bought"])
+
+    for date, stats in other["daily"].items():
+        daily_acc = acc["daily"].get(date)
+        if daily_acc is None:
+            daily_acc = acc["daily"][date] = _new_daily(acc)
+        daily_acc["revenue"] += stats["revenue"]
+        daily_acc["transaction_count"] += stats["transaction_count"]
+        daily_acc["unique_customers"] |= stats["unique_customers"]
+
+    return acc
+
+
+def accumulators_to_dict(acc):
+    """
+    Converts accumulator state into JSON-serializable form (sets and product
+    bitsets become sorted lists, sketches their to_dict() form).
+
+    Parameters:
+        acc (dict): accumulator state from new_accumulators()
+
+    Returns:
+        dict: serializable copy, restored with accumulators_from_dict()
+    """
+
+    return {
+        "total_revenue": acc["total_revenue"],
+        "transaction_count": acc["transaction_count"],
+        "regions": acc["regions"],
+        "products": acc["products"],
+        "customers": {
+            cust_id: dict(stats, products_bought=acc["product_bits"].decode(stats["products_bought"]))
+            for cust_id, stats in acc["customers"].items()
+        },
+        "daily": {
+            date: dict(stats, unique_customers=(
+                stats["unique_customers"].to_dict()
+                if isinstance(stats["unique_customers"], HyperLogLog)
+                else sorted(stats["unique_customers"])
+            ))
+            for date, stats in acc["daily"].items()
+        },
+        "distinct_error": acc.get("distinct_error"),
+        "heavy_hitter_capacity": acc.get("heavy_hitter_capacity"),
+        "heavy_hitters": (
+            {metric: sketch.to_dict() for metric, sketch in acc["heavy_hitters"].items()}
+            if acc.get("heavy_hitters") is not None
+            else None
+        ),
+    }
+
+
+def accumulators_from_dict(data):
+    """
+    Restores accumulator state saved with accumulators_to_dict().
+
+    Parameters:
+        data (dict): serialized accumulator state
+
+    Returns:
+        dict: accumulator state that can keep receiving transactions
+    """
+
+    product_bits = ProductBits()
+    return {
+        "total_revenue": data["total_revenue"],
+        "transaction_count": data["transaction_count"],
+        "regions": data["regions"],
+        "products": data["products"],
+        "customers": {
+            cust_id: dict(stats, products_bought=product_bits.encode(stats["products_bought"]))
+            for cust_id, stats in data["customers"].items()
+        },
+        "daily": {
+            date: dict(stats, unique_customers=(
+                HyperLogLog.from_dict(stats["unique_customers"])
+                if data.get("distinct_error")
+                else set(stats["unique_customers"])
+            ))
+            for date, stats in data["daily"].items()
+        },
+        "product_bits": product_bits,
+        "distinct_error": data.get("distinct_error"),
+        "heavy_hitter_capacity": data.get("heavy_hitter_capacity"),
+        "heavy_hitters": (
+            {metric: SpaceSaving.from_dict(sketch) for metric, sketch in data["heavy_hitters"].items()}
+            if data.get("heavy_hitters") is not None
+            else None
+        ),
+    }
+
+
+def finalize_analysis(acc, top_n=5, low_threshold=10):
+    """
+    Converts accumulator state into the structures returned by the analysis functions.
+
+    Parameters:
+        acc (dict): accumulator state from new_accumulators()
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+
+    Returns:
+        dict: analysis results in format:
+        {
+            'total_revenue': 120126.0,                 # calculate_total_revenue()
+            'transaction_count': 28,
+            'date_range': ('2024-12-01', '2024-12-30'),
+            'region_stats': {...},                     # region_wise_sales()
+            'top_products': [...],                     # top_selling_products()
+            'top_customers': {...},                    # top_customers()
+            'customer_count': 12,
+            'daily_stats': {...},                      # daily_sales_trend()
+            'peak_day': ('2024-12-07', 22013.0, 3),    # find_peak_sales_day()
+            'low_products': [...]                      # low_performing_products()
+        }
+        In sketch mode top products and customers are estimates, customer_count and
+        low_products are None, and 'heavy_hitter_error' holds each sketch's maximum
+        overestimate (see heavy_hitter_error_bounds()).
+
+    Requirements:
+    - Leave the accumulators untouched so they can keep receiving transactions
+    - Keep the same ordering rules as the individual analysis functions
+    - Daily unique_customers are estimates when the accumulators use sketches
+    - Select top products and customers with a heap; build per-customer detail
+      only for the customers returned
+    """
+
+    total_revenue = acc["total_revenue"]
+
+    # Region stats sorted by total_sales descending
+    region_stats = {}
+    for region, stats in acc["regions"].items():
+        region_stats[region] = {
+            "total_sales": stats["total_sales"],
+            "transaction_count": stats["transaction_count"],
+            "percentage": round((stats["total_sales"] / total_revenue) * 100, 2),
+        }
+    region_stats = dict(
+        sorted(region_stats.items(), key=lambda x: x[1]["total_sales"], reverse=True)
+    )
+
+    # Low performing products sorted by quantity ascending
+    heavy_hitters = acc.get("heavy_hitters")
+    low_products = None if heavy_hitters is not None else sorted(
+        (
+            (product, stats["quantity"], stats["revenue"])
+            for product, stats in acc["products"].items()
+            if stats["quantity"] < low_threshold
+        ),
+        key=lambda x: x[1],
+    )
+
+    # Peak day uses first-seen order for ties, like find_peak_sales_day()
+    peak_day = None
+    if acc["daily"]:
+        peak_date, peak_data = max(acc["daily"].items(), key=lambda x: x[1]["revenue"])
+        peak_day = (peak_date, peak_data["revenue"], peak_data["transaction_count"])
+
+    # Daily stats sorted chronologically
+    daily_stats = {
+        date: {
+            "revenue": stats["revenue"],
+            "transaction_count": stats["transaction_count"],
+            "unique_customers": len(stats["unique_customers"]),
+        }
+        for date, stats in sorted(acc["daily"].items(), key=lambda x: x[0])
+    }
+    dates = list(daily_stats)
+    date_range = (dates[0], dates[-1]) if dates else None
+
+    analysis = {
+        "total_revenue": total_revenue,
+        "transaction_count": acc["transaction_count"],
+        "date_range": date_range,
+        "region_stats": region_stats,
+        "top_products": top_products(acc["products"], top_n),
+        "top_customers": top_customers(acc["customers"], top_n, acc["product_bits"]),
+        "customer_count": len(acc["customers"]),
+        "daily_stats": daily_stats,
+        "peak_day": peak_day,
+        "low_products": low_products,
+    }
+
+    if heavy_hitters is not None:
+        # Bottom-ranked products cannot be recovered from heavy-hitter sketches
+        analysis["top_products"] = heavy_hitter_top_products(heavy_hitters, top_n)
+        analysis["top_customers"] = heavy_hitter_top_customers(heavy_hitters, top_n)
+        analysis["customer_count"] = None
+        analysis["heavy_hitter_error"] = heavy_hitter_error_bounds(heavy_hitters)
+
+    return analysis
+
+
+@instrumented()
+def analyze_sales(
+    transactions,
+    top_n=5,
+    low_threshold=10,
+    backend="python",
+    distinct_error=None,
+    heavy_hitter_capacity=None,
+):
+    """
+    Runs every sales analysis in a single pass over the transactions.
+
+    Parameters:
+        transactions (iterable): transaction dictionaries or a TransactionTable
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+        backend (str): 'python' (default) or 'numpy' for the vectorized backend
+        distinct_error (float): estimate daily unique customers with HyperLogLog
+                                sketches of this relative error (python backend only)
+        heavy_hitter_capacity (int): track products and customers with Space-Saving
+                                     sketches of this capacity (python backend only)
+
+    Returns:
+        dict: analysis results from finalize_analysis()
+    """
+
+    if backend == "numpy":
+        if distinct_error or heavy_hitter_capacity:
+            raise ValueError("Approximate counting is only supported by the python backend")
+        from utils import numpy_backend
+        return numpy_backend.analyze_sales(transactions, top_n=top_n, low_threshold=low_threshold)
+    if backend != "python":
+        raise ValueError(f"Unknown analysis backend: {backend}")
+
+    acc = new_accumulators(distinct_error, heavy_hitter_capacity)
+    if isinstance(transactions, TransactionTable):
+        accumulate_table(acc, transactions)
+    else:
+        for txn in transactions:
+            accumulate_transaction(acc, txn)
+
+    return finalize_analysis(acc, top_n=top_n, low_threshold=low_threshold)
+
+
+def summarize_enrichment(enriched_transactions):
+    """
+    Summarizes API enrichment results.
+
+    Parameters:
+        enriched_transactions (iterable): enriched transaction dictionaries
+                                          (an EnrichedRows view is summarized
+                                          per ProductID, without reading rows)
+
+    Returns:
+        dict: enrichment summary in format:
+        {
+            'enriched_count': 26,
+            'total': 28,
+            'success_rate': 92.86,
+            'failed_products': ['P999', 'P998'],     # distinct, in first-seen order
+            'failed_counts': {'P999': 1, 'P998': 1}  # unmatched rows per product
+        }
+    """
+
+    summary = new_enrichment_summary()
+    if isinstance(enriched_transactions, EnrichedRows):
+        fields = enriched_transactions.fields
+        rows_per_product = Counter(map(methodcaller("get", "ProductID"), enriched_transactions.transactions))
+        for product_id, rows in rows_per_product.items():
+            summary["total"] += rows
+            if fields[product_id]["API_Match"]:
+                summary["enriched_count"] += rows
+            else:
+                summary["failed_counts"][product_id] = rows
+        return finalize_enrichment(summary)
+
+    for txn in enriched_transactions:
+        accumulate_enrichment(summary, txn)
+
+    return finalize_enrichment(summary)
+
+
+def new_enrichment_summary():
+    """
+    Creates an empty enrichment summary (see summarize_enrichment()).
+    """
+    return {"enriched_count": 0, "total": 0, "success_rate": 0, "failed_products": [], "failed_counts": {}}
+
+
+def accumulate_enrichment(summary, txn):
+    """
+    Adds one enriched transaction to an enrichment summary.
+
+    Parameters:
+        summary (dict): summary in the format returned by summarize_enrichment()
+        txn (dict): enriched transaction dictionary
+    """
+
+    summary["total"] += 1
+    if txn.get("API_Match"):
+        summary["enriched_count"] += 1
+    else:
+        # Distinct IDs only: memory follows the catalog misses, not the unmatched rows
+        failed_counts = summary["failed_counts"]
+        product_id = txn["ProductID"]
+        failed_counts[product_id] = failed_counts.get(product_id, 0) + 1
+
+
+def merge_enrichment(summary, other):
+    """
+    Merges another enrichment summary into summary (new failed products appended in order).
+    """
+    summary["enriched_count"] += other["enriched_count"]
+    summary["total"] += other["total"]
+    failed_counts = summary["failed_counts"]
+    for product_id, count in other["failed_counts"].items():
+        failed_counts[product_id] = failed_counts.get(product_id, 0) + count
+    return finalize_enrichment(summary)
+
+
+def finalize_enrichment(summary):
+    """
+    Recomputes the success rate and failed product list of an enrichment summary.
+
+    Parameters:
+        summary (dict): summary in the format returned by summarize_enrichment()
+
+    Returns:
+        dict: the same summary with success_rate and failed_products updated
+    """
+    summary["failed_products"] = list(summary["failed_counts"])
+
+    summary["success_rate"] = (
+        round((summary["enriched_count"] / summary["total"]) * 100, 2) if summary["total"] else 0
+    )
+    return summary
@@ -0,0 +1,288 @@
+import json
+import os
+import re
+from collections import deque
+
+from utils.file_handler import iter_sales_data
+from utils.parse_transactions import iter_parse_transactions
+from utils.validate_filter import is_valid_transaction, FILTER_COUNTS
+from utils.dedup import new_id_set, default_store_path, DEFAULT_CAPACITY
+from utils.filter_index import FilterIndex
+from utils.report_generator import generate_sales_report
+from utils.sales_aggregator import (
+    analyze_sales,
+    summarize_enrichment,
+    new_accumulators,
+    accumulate_transaction,
+    finalize_analysis,
+    new_enrichment_summary,
+    accumulate_enrichment,
+    finalize_enrichment,
+)
+from utils.instrumentation import instrumented
+
+SCENARIO_FIELDS = ["name", "region", "min_amount", "max_amount"]
+SCENARIO_REPORT_DIR = "output/scenarios"
+
+
+def load_scenarios(path):
+    """
+    Reads filter scenarios from a JSON file.
+
+    The file holds a list (or {"scenarios": [...]}) of objects such as
+    {"name": "north-large", "region": "North", "min_amount": 1000}; every key
+    except name is optional and a missing name defaults to "scenario_<n>".
+
+    Returns:
+        list of scenario dictionaries with the keys in SCENARIO_FIELDS
+
+    Raises:
+        ValueError if the file is not a list of objects, has unknown keys or
+        two scenarios would share a report file
+    """
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("scenarios")
+    if not isinstance(data, list):
+        raise ValueError(f"'{path}' must contain a list of scenarios")
+
+    scenarios = []
+    for i, item in enumerate(data, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Scenario {i} in '{path}' is not an object")
+        unknown = set(item) - set(SCENARIO_FIELDS)
+        if unknown:
+            raise ValueError(f"Scenario {i} in '{path}' has unknown keys: {', '.join(sorted(unknown))}")
+        scenario = {field: item.get(field) for field in SCENARIO_FIELDS}
+        scenario["name"] = str(scenario["name"] or f"scenario_{i}")
+        for field in ("min_amount", "max_amount"):
+            if scenario[field] is not None:
+                scenario[field] = float(scenario[field])
+        scenarios.append(scenario)
+
+    paths = [scenario_report_path(scenario) for scenario in scenarios]
+    if len(set(paths)) != len(paths):
+        raise ValueError(f"Scenario names in '{path}' must be unique (ignoring punctuation)")
+    return scenarios
+
+
+def scenario_report_path(scenario, output_dir=SCENARIO_REPORT_DIR):
+    """
+    Returns the report file of a scenario (its name made filename-safe).
+    """
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", scenario["name"]).strip("_") or "scenario"
+    return os.path.join(output_dir, f"sales_report_{slug}.txt")
+
+
+@instrumented(rows_out=None)
+def run_scenarios(
+    filename,
+    scenarios,
+    product_mapping=None,
+    top_n=5,
+    low_threshold=10,
+    distinct_error=None,
+    heavy_hitter_capacity=None,
+    dedup=None,
+    dedup_capacity=DEFAULT_CAPACITY,
+):
+    """
+    Analyzes every filter scenario in a single pass over a sales file.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        scenarios (list): scenario dictionaries from load_scenarios()
+        product_mapping (dict): mapping from create_product_mapping() (optional)
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+        distinct_error, heavy_hitter_capacity: approximate counting options
+                                               (see new_accumulators())
+        dedup (str): drop repeated TransactionIDs, 'exact' or 'bloom' (optional,
+                     see stream_sales_analysis()); one ID set serves every scenario
+        dedup_capacity (int): IDs the bloom filter is sized for
+
+    Returns:
+        list of tuples (scenario, analysis, filter_summary), in scenario order;
+        analysis always has an 'enrichment' summary so it can go straight to
+        generate_sales_report()
+
+    Requirements:
+    - Read, parse, validate and enrich every row once, whatever the number of scenarios
+    - Compute each row's amount once and route the row into the accumulators of
+      every scenario it matches
+    - Produce the same results as stream_sales_analysis() run once per scenario
+    """
+
+    states = []
+    by_region = {}
+    any_region = []
+    for scenario in scenarios:
+        state = {
+            "scenario": scenario,
+            "acc": new_accumulators(distinct_error, heavy_hitter_capacity),
+            "enrichment": new_enrichment_summary(),
+            "summary": dict.fromkeys(FILTER_COUNTS, 0),
+        }
+        states.append(state)
+        if scenario["region"]:
+            by_region.setdefault(scenario["region"], []).append(state)
+        else:
+            any_region.append(state)
+
+    counts = {"total_input": 0, "invalid": 0, "duplicates": 0}
+    pending = deque()
+    seen = None
+    if dedup:
+        seen = new_id_set(dedup, default_store_path(filename) if dedup == "bloom" else None, dedup_capacity)
+
+    def routed_rows():
+        # Yields each row that matches a scenario; its matching states go to pending
+        for txn in iter_parse_transactions(iter_sales_data(filename)):
+            counts["total_input"] += 1
+            if not is_valid_transaction(txn):
+                counts["invalid"] += 1
+                continue
+            if seen is not None and not seen.add(txn["TransactionID"]):
+                counts["duplicates"] += 1
+                continue
+
+            region_states = by_region.get(txn["Region"], ())
+            if not region_states and not any_region:
+                continue
+
+            amount = txn["Quantity"] * txn["UnitPrice"]
+            matches = []
+            for state in (*any_region, *region_states):
+                scenario = state["scenario"]
+                if (scenario["min_amount"] is not None and amount < scenario["min_amount"]) or (
+                    scenario["max_amount"] is not None and amount > scenario["max_amount"]
+                ):
+                    state["summary"]["filtered_by_amount"] += 1
+                    continue
+                matches.append(state)
+            if matches:
+                pending.append(matches)
+                yield txn
+
+    rows = routed_rows()
+    if product_mapping is not None:
+        # Imported here so scenario runs work without the requests package
+        from utils.api_handler import iter_enrich_sales_data
+
+        # One enrichment per row, shared by every scenario it matches
+        rows = iter_enrich_sales_data(rows, product_mapping)
+
+    try:
+        for txn in rows:
+            for state in pending.popleft():
+                state["summary"]["final_count"] += 1
+                accumulate_transaction(state["acc"], txn)
+                if product_mapping is not None:
+                    accumulate_enrichment(state["enrichment"], txn)
+    finally:
+        if seen is not None:
+            seen.close()
+
+    total_input, invalid, duplicates = counts["total_input"], counts["invalid"], counts["duplicates"]
+    valid = total_input - invalid - duplicates
+    results = []
+    for state in states:
+        summary = state["summary"]
+        summary["total_input"] = total_input
+        summary["invalid"] = invalid
+        if seen is not None:
+            summary["duplicates"] = duplicates
+        summary["filtered_by_region"] = valid - summary["filtered_by_amount"] - summary["final_count"]
+
+        analysis = finalize_analysis(state["acc"], top_n=top_n, low_threshold=low_threshold)
+        analysis["enrichment"] = finalize_enrichment(state["enrichment"])
+        if seen is not None:
+            analysis["duplicates"] = duplicates
+        results.append((state["scenario"], analysis, summary))
+
+    return results
+
+
+@instrumented(rows_out=None)
+def run_indexed_scenarios(
+    transactions,
+    scenarios,
+    product_mapping=None,
+    top_n=5,
+    low_threshold=10,
+    backend="python",
+    distinct_error=None,
+    heavy_hitter_capacity=None,
+    duplicates=None,
+):
+    """
+    Analyzes every filter scenario over rows already in memory, through a FilterIndex.
+
+    The rows are validated and indexed once; each scenario is then answered with
+    FilterIndex.select() instead of another validation and filter pass.
+
+    Parameters:
+        transactions (list): list of transaction dictionaries or a TransactionTable,
+                             already deduplicated if duplicates is given
+        scenarios (list): scenario dictionaries from load_scenarios()
+        product_mapping (dict): mapping from create_product_mapping() (optional)
+        top_n, low_threshold, backend, distinct_error, heavy_hitter_capacity:
+            analysis options (see analyze_sales())
+        duplicates (int): rows removed by deduplicate() before indexing (optional)
+
+    Returns:
+        list of tuples (scenario, analysis, filter_summary), as run_scenarios()
+
+    Requirements:
+    - Produce the same results as run_scenarios() over the same rows
+    """
+
+    index = FilterIndex(transactions)
+    if product_mapping is not None:
+        from utils.api_handler import enrich_sales_data
+
+    results = []
+    for scenario in scenarios:
+        rows, summary = index.select(scenario["region"], scenario["min_amount"], scenario["max_amount"])
+        analysis = analyze_sales(
+            rows,
+            top_n=top_n,
+            low_threshold=low_threshold,
+            backend=backend,
+            distinct_error=distinct_error,
+            heavy_hitter_capacity=heavy_hitter_capacity,
+        )
+        if product_mapping is not None:
+            analysis["enrichment"] = summarize_enrichment(enrich_sales_data(rows, product_mapping))
+        else:
+            analysis["enrichment"] = finalize_enrichment(new_enrichment_summary())
+        if duplicates is not None:
+            summary["total_input"] += duplicates
+            summary["duplicates"] = duplicates
+            analysis["duplicates"] = duplicates
+        results.append((scenario, analysis, summary))
+
+    return results
+
+
+@instrumented(rows_out=None)
+def write_scenario_reports(results, output_dir=SCENARIO_REPORT_DIR):
+    """
+    Writes one report per scenario with generate_sales_report().
+
+    Parameters:
+        results (list): output of run_scenarios()
+        output_dir (str): directory for the reports
+
+    Returns:
+        list of report paths, in scenario order
+    """
+
+    paths = []
+    for scenario, analysis, _ in results:
+        path = scenario_report_path(scenario, output_dir)
+        generate_sales_report(None, None, path, analysis=analysis)
+        paths.append(path)
+    return paths
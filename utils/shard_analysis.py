@@ -0,0 +1,372 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_handler import iter_range_lines
+from utils.parallel_ingest import compute_byte_ranges, default_workers
+from utils.stream_pipeline import aggregate_lines, FILTER_COUNTS
+from utils.dedup import new_id_set, id_set_from_dict, default_store_path, IdSetUnion, DEFAULT_CAPACITY
+from utils.sales_aggregator import (
+    new_accumulators,
+    merge_accumulators,
+    accumulators_to_dict,
+    accumulators_from_dict,
+    finalize_analysis,
+    new_enrichment_summary,
+    merge_enrichment,
+    finalize_enrichment,
+)
+from utils.instrumentation import instrumented
+
+PARTIAL_VERSION = 5
+SHARD_PATTERN = "*.txt"
+
+
+def resolve_shards(source, pattern=SHARD_PATTERN):
+    """
+    Lists the shard files of a directory (files matching pattern) or a glob.
+
+    Parameters:
+        source (str): directory such as 'data/shards', glob such as 'data/shards/2024-12-*.txt',
+                      or a single file
+        pattern (str): file pattern used inside a directory (default='*.txt')
+
+    Returns:
+        list: shard paths sorted by name, so merges always happen in the same order
+
+    Raises:
+        FileNotFoundError if nothing matches
+    """
+
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, pattern))
+    elif glob.has_magic(source):
+        paths = glob.glob(source)
+    else:
+        paths = [source] if os.path.isfile(source) else []
+
+    shards = sorted(path for path in paths if os.path.isfile(path))
+    if not shards:
+        raise FileNotFoundError(f"No shard files found for '{source}'")
+    return shards
+
+
+def default_partial_path(shard):
+    """
+    Returns the partial aggregate path used for a shard (stored next to it).
+    """
+    return f"{shard}.partial.json"
+
+
+def catalog_fingerprint(product_mapping):
+    """
+    Identifies a product mapping, so partials enriched against another catalog are rebuilt.
+    """
+    if product_mapping is None:
+        return None
+    text = json.dumps(product_mapping, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _shard_key(shard, filters, counting_mode, catalog, dedup):
+    """
+    Everything a partial depends on: the shard's size and mtime, and the run settings.
+    """
+    stat = os.stat(shard)
+    return {
+        "version": PARTIAL_VERSION,
+        "source": os.path.abspath(shard),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "filters": list(filters),
+        "counting_mode": list(counting_mode),
+        "catalog": catalog,
+        "dedup": list(dedup) if dedup else None,
+    }
+
+
+def load_partial(partial_file, key):
+    """
+    Loads a shard partial if it was built under the same key.
+
+    Returns:
+        tuple: (partial, reason) - partial is None if it is missing, unreadable or stale
+    """
+    try:
+        with open(partial_file, "r", encoding="utf-8") as f:
+            partial = json.load(f)
+    except FileNotFoundError:
+        return None, "no partial"
+    except (OSError, ValueError) as e:
+        return None, f"unreadable partial ({e})"
+
+    cached = partial.get("key") or {}
+    for name, reason in [
+        ("version", "partial version changed"),
+        ("source", "different source file"),
+        ("size", "shard size changed"),
+        ("mtime_ns", "shard modified"),
+        ("filters", "filters changed"),
+        ("counting_mode", "counting mode changed"),
+        ("catalog", "catalog changed"),
+        ("dedup", "deduplication setting changed"),
+    ]:
+        if cached.get(name) != key[name]:
+            return None, reason
+    return partial, "partial matches"
+
+
+def save_partial(partial_file, partial):
+    """
+    Writes a shard partial atomically (temporary file + rename).
+    """
+    tmp_file = f"{partial_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(partial, f)
+    os.replace(tmp_file, partial_file)
+
+
+def aggregate_shard(task):
+    """
+    Worker: deduplicates, validates, filters, optionally enriches and aggregates one whole shard.
+
+    Parameters:
+        task (tuple): (shard, key, filters, product_mapping, counting_mode, dedup, excluded, earlier)
+                      dedup is (mode, capacity) or None; excluded lists TransactionIDs
+                      already seen in earlier shards, whose rows count as duplicates;
+                      earlier identifies those shards (see _earlier_fingerprints())
+
+    Returns:
+        dict: serializable partial aggregate in format:
+        {
+            'key': {...},                     # what the partial was built from
+            'accumulators': {...},            # accumulators_to_dict() form
+            'filter_summary': {...},
+            'enrichment': {...} or None,
+            'date_range': ('2024-12-01', '2024-12-31') or None,
+            'dedup': {...} or None,           # the shard's ID set, to_dict() form
+            'excluded': [...],
+            'earlier': 'fingerprint' or None
+        }
+    """
+
+    shard, key, filters, product_mapping, counting_mode, dedup, excluded, earlier = task
+    region, min_amount, max_amount = filters
+
+    filter_summary = {}
+    acc = new_accumulators(*counting_mode)
+    enrichment = new_enrichment_summary() if product_mapping is not None else None
+    seen = None
+    if dedup:
+        mode, capacity = dedup
+        seen = new_id_set(mode, os.path.abspath(default_store_path(shard, mode)), capacity)
+        for txn_id in excluded:
+            seen.add(txn_id)
+
+    try:
+        encoding, ranges = compute_byte_ranges(shard, 1)
+        for start, end in ranges:
+            aggregate_lines(
+                iter_range_lines(shard, start, end, encoding), acc, region, min_amount, max_amount,
+                filter_summary=filter_summary,
+                product_mapping=product_mapping,
+                enrichment=enrichment,
+                seen=seen,
+            )
+        dedup_state = seen.to_dict() if seen is not None else None
+    finally:
+        if seen is not None:
+            seen.close()
+    for name in FILTER_COUNTS:
+        filter_summary.setdefault(name, 0)
+
+    dates = list(acc["daily"])
+    return {
+        "key": key,
+        "accumulators": accumulators_to_dict(acc),
+        "filter_summary": filter_summary,
+        "enrichment": enrichment,
+        "date_range": (min(dates), max(dates)) if dates else None,
+        "dedup": dedup_state,
+        "excluded": list(excluded),
+        "earlier": earlier,
+    }
+
+
+def _earlier_fingerprints(partials):
+    """
+    Fingerprint of the partial keys before each shard: a shard's cross-shard
+    duplicates only need recomputing when its fingerprint changes.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    fingerprints = []
+    for partial in partials:
+        fingerprints.append(hasher.hexdigest())
+        hasher.update(json.dumps(partial["key"], sort_keys=True).encode("utf-8"))
+    return fingerprints
+
+
+def _run_shards(tasks, workers):
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            return list(executor.map(aggregate_shard, tasks))
+    return [aggregate_shard(task) for task in tasks]
+
+
+def merge_partials(partials, counting_mode=(None, None)):
+    """
+    Merges shard partials into live accumulators, filter counts and enrichment summary.
+
+    The merge is associative, so partials may be combined in any grouping; they
+    are merged in the order given to keep results deterministic.
+
+    Returns:
+        tuple: (accumulators, filter_summary, enrichment) - enrichment is None if
+        the partials were not enriched
+    """
+
+    acc = new_accumulators(*counting_mode)
+    filter_summary = dict.fromkeys(FILTER_COUNTS, 0)
+    enrichment = None
+
+    for partial in partials:
+        merge_accumulators(acc, accumulators_from_dict(partial["accumulators"]))
+        for name, count in partial["filter_summary"].items():
+            filter_summary[name] = filter_summary.get(name, 0) + count
+        if partial["enrichment"] is not None:
+            if enrichment is None:
+                enrichment = new_enrichment_summary()
+            merge_enrichment(enrichment, partial["enrichment"])
+
+    return acc, filter_summary, enrichment
+
+
+@instrumented(rows_out=lambda result: result[1]["final_count"])
+def sharded_sales_analysis(
+    source,
+    region=None,
+    min_amount=None,
+    max_amount=None,
+    product_mapping=None,
+    workers=None,
+    top_n=5,
+    low_threshold=10,
+    distinct_error=None,
+    heavy_hitter_capacity=None,
+    reuse_partials=True,
+    dedup=None,
+    dedup_capacity=DEFAULT_CAPACITY,
+):
+    """
+    Map-reduce analysis of a partitioned data set: one partial aggregate per shard file.
+
+    Parameters:
+        source (str): directory of shard files or a glob (see resolve_shards())
+        region, min_amount, max_amount: optional filters (see validate_and_filter())
+        product_mapping (dict): mapping from create_product_mapping() (optional)
+        workers (int): number of worker processes (default: one per CPU)
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+        distinct_error (float): estimate daily unique customers with HyperLogLog
+                                sketches of this relative error (optional)
+        heavy_hitter_capacity (int): track products and customers with Space-Saving
+                                     sketches of this capacity (optional)
+        reuse_partials (bool): reuse and save per-shard partials (default=True)
+        dedup (str): drop repeated TransactionIDs across all shards, 'exact' or
+                     'bloom' (optional); the ID store of each shard is kept next to it
+        dedup_capacity (int): IDs each shard's bloom filter is sized for
+
+    Returns:
+        tuple: (analysis, filter_summary, run_info)
+        - analysis, filter_summary: as returned by stream_sales_analysis()
+        - run_info: {'shards': int, 'processed': [paths], 'reused': int,
+                     'rerun': [paths re-aggregated for duplicates of earlier shards]}
+
+    Requirements:
+    - Aggregate each shard in a process pool; one shard is the unit of work
+    - Save each shard's partial next to it, keyed on the shard's size and mtime,
+      the filters, the counting mode, the catalog and the dedup mode, so adding
+      or changing a shard only processes that shard
+    - Merge partials in shard name order so results do not depend on which
+      worker finishes first
+    - With dedup, the first occurrence of a TransactionID in shard name order is
+      kept: shards are deduplicated on their own in parallel, then each shard's
+      IDs are checked against the earlier shards, and only shards whose overlap
+      changed are aggregated again with those IDs excluded
+    """
+
+    workers = workers or default_workers()
+    shards = resolve_shards(source)
+    filters = (region, min_amount, max_amount)
+    counting_mode = (distinct_error, heavy_hitter_capacity)
+    catalog = catalog_fingerprint(product_mapping)
+    dedup_mode = (dedup, dedup_capacity if dedup == "bloom" else None) if dedup else None
+
+    partials = [None] * len(shards)
+    id_sets = [None] * len(shards)
+    tasks = []
+    try:
+        for i, shard in enumerate(shards):
+            key = _shard_key(shard, filters, counting_mode, catalog, dedup_mode)
+            if reuse_partials:
+                partials[i], _ = load_partial(default_partial_path(shard), key)
+            if partials[i] is not None and dedup:
+                try:
+                    id_sets[i] = id_set_from_dict(partials[i]["dedup"])
+                except ValueError:
+                    # The dedup store of the shard is gone: rebuild it
+                    partials[i] = None
+            if partials[i] is None:
+                tasks.append((i, (shard, key, filters, product_mapping, counting_mode, dedup_mode, [], None)))
+
+        for (i, (shard, *_)), partial in zip(tasks, _run_shards([task for _, task in tasks], workers)):
+            partials[i] = partial
+            if dedup:
+                id_sets[i] = id_set_from_dict(partial["dedup"])
+            if reuse_partials:
+                save_partial(default_partial_path(shard), partial)
+
+        reruns = []
+        if dedup:
+            earlier = _earlier_fingerprints(partials)
+            union = IdSetUnion()
+            stale = [i for i, partial in enumerate(partials) if partial["earlier"] != earlier[i]]
+            for i in range(stale[-1] + 1 if stale else 0):
+                if partials[i]["earlier"] != earlier[i]:
+                    excluded = sorted(txn_id for txn_id in id_sets[i].iter_ids() if txn_id in union)
+                    if excluded == partials[i]["excluded"]:
+                        partials[i]["earlier"] = earlier[i]
+                        if reuse_partials:
+                            save_partial(default_partial_path(shards[i]), partials[i])
+                    else:
+                        reruns.append((i, (
+                            shards[i], partials[i]["key"], filters, product_mapping, counting_mode,
+                            dedup_mode, excluded, earlier[i],
+                        )))
+                union.add(id_sets[i])
+    finally:
+        for id_set in id_sets:
+            if id_set is not None:
+                id_set.close()
+
+    for (i, (shard, *_)), partial in zip(reruns, _run_shards([task for _, task in reruns], workers)):
+        partials[i] = partial
+        if reuse_partials:
+            save_partial(default_partial_path(shard), partial)
+
+    acc, filter_summary, enrichment = merge_partials(partials, counting_mode)
+    analysis = finalize_analysis(acc, top_n=top_n, low_threshold=low_threshold)
+    if product_mapping is not None:
+        analysis["enrichment"] = finalize_enrichment(enrichment or new_enrichment_summary())
+    if dedup:
+        analysis["duplicates"] = filter_summary["duplicates"]
+
+    run_info = {
+        "shards": len(shards),
+        "processed": [shard for _, (shard, *_) in tasks],
+        "reused": len(shards) - len(tasks),
+        "rerun": [shard for _, (shard, *_) in reruns],
+    }
+    return analysis, filter_summary, run_info
@@ -0,0 +1,278 @@
+import heapq
+import itertools
+
+DEFAULT_CAPACITY = 1000
+HEAVY_HITTER_METRICS = ["product_quantity", "product_revenue", "customer_spent", "customer_orders"]
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving sketch: tracks the heaviest items of a stream in fixed memory.
+
+    At most capacity items are monitored. When a new item arrives and the sketch is
+    full, the item with the smallest count is replaced and the newcomer inherits that
+    count as its error. For every monitored item:
+
+        true total <= count <= true total + error,  error <= total_weight / capacity
+
+    and every item whose true total exceeds total_weight / capacity is monitored.
+    Until an item is evicted, every count is exact and error_bound is 0.
+
+    Attributes:
+        capacity (int): maximum number of monitored items
+        counters (dict): item -> [count, error]
+        total_weight (float): sum of all weights added
+        dropped (bool): whether an item was ever evicted (or dropped by a merge)
+    """
+
+    __slots__ = ("capacity", "counters", "total_weight", "dropped", "_heap", "_sequence")
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError(f"Capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.counters = {}
+        self.total_weight = 0
+        self.dropped = False
+        # Lazy min-heap of (count, sequence, item); stale entries are skipped on pop
+        self._heap = []
+        self._sequence = itertools.count()
+
+    def add(self, item, weight=1):
+        """
+        Adds weight (>= 0) to item.
+        """
+        self.total_weight += weight
+        counter = self.counters.get(item)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[item] = [0, 0]
+            else:
+                floor = self._pop_min()
+                self.dropped = True
+                counter = self.counters[item] = [floor, floor]
+        counter[0] += weight
+        heapq.heappush(self._heap, (counter[0], next(self._sequence), item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(counter[0], next(self._sequence), item) for item, counter in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        """
+        Removes the monitored item with the smallest count and returns that count.
+        """
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                del self.counters[item]
+                return count
+
+    def min_count(self):
+        """
+        Upper bound for the total of an unmonitored item: the smallest monitored
+        count once an item was dropped, else 0 (unmonitored items were never seen).
+        """
+        if not self.dropped or not self.counters:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    @property
+    def error_bound(self):
+        """
+        Maximum overestimate of any count: the largest counter error, or the
+        min_count() charged to unmonitored items if larger; 0 while nothing was
+        dropped. Never more than total_weight / capacity.
+        """
+        max_error = max((counter[1] for counter in self.counters.values()), default=0)
+        return max(max_error, self.min_count())
+
+    def estimate(self, item):
+        """
+        Returns (count, error) for item; unmonitored items get the min_count() upper bound.
+        """
+        counter = self.counters.get(item)
+        if counter is None:
+            floor = self.min_count()
+            return floor, floor
+        return counter[0], counter[1]
+
+    def top(self, n):
+        """
+        Returns the n heaviest monitored items.
+
+        Returns:
+            list of tuples (item, count, error), count descending, ties in first-monitored order
+        """
+        return heapq.nlargest(
+            n, ((item, count, error) for item, (count, error) in self.counters.items()),
+            key=lambda x: x[1],
+        )
+
+    def merge(self, other):
+        """
+        Merges another sketch of the same capacity into this one (mergeable summary).
+
+        Items missing from one side are charged that side's min_count() as both
+        count and error, then only the capacity heaviest items are kept.
+
+        Returns:
+            SpaceSaving: self, updated in place
+        """
+        if other.capacity != self.capacity:
+            raise ValueError(f"Cannot merge sketches of capacity {self.capacity} and {other.capacity}")
+
+        floor, other_floor = self.min_count(), other.min_count()
+        merged = {}
+        for item, (count, error) in self.counters.items():
+            other_count, other_error = other.counters.get(item, (other_floor, other_floor))
+            merged[item] = [count + other_count, error + other_error]
+        for item, (count, error) in other.counters.items():
+            if item not in merged:
+                merged[item] = [count + floor, error + floor]
+
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda x: x[1][0])
+        self.dropped = self.dropped or other.dropped or len(merged) > self.capacity
+        self.counters = dict(kept)
+        self.total_weight += other.total_weight
+        self._rebuild_heap()
+        return self
+
+    def copy(self):
+        return SpaceSaving.from_dict(self.to_dict())
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable form, restored with from_dict().
+        """
+        return {
+            "capacity": self.capacity,
+            "total_weight": self.total_weight,
+            "dropped": self.dropped,
+            "counters": [[item, count, error] for item, (count, error) in self.counters.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["capacity"])
+        sketch.total_weight = data["total_weight"]
+        # Sketches saved before dropped was recorded are treated as lossy
+        sketch.dropped = data.get("dropped", True)
+        sketch.counters = {item: [count, error] for item, count, error in data["counters"]}
+        sketch._rebuild_heap()
+        return sketch
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        restored = SpaceSaving.from_dict(state)
+        for name in SpaceSaving.__slots__:
+            setattr(self, name, getattr(restored, name))
+
+    def __len__(self):
+        return len(self.counters)
+
+    def __repr__(self):
+        return f"SpaceSaving(capacity={self.capacity}, monitored={len(self.counters)})"
+
+
+def new_heavy_hitters(capacity=DEFAULT_CAPACITY):
+    """
+    Creates one Space-Saving sketch per tracked metric.
+
+    Returns:
+        dict: {'product_quantity': SpaceSaving, 'product_revenue': ...,
+               'customer_spent': ..., 'customer_orders': ...}
+    """
+    return {metric: SpaceSaving(capacity) for metric in HEAVY_HITTER_METRICS}
+
+
+def track_heavy_hitters(transactions, capacity=DEFAULT_CAPACITY, sketches=None):
+    """
+    Feeds transactions into heavy-hitter sketches for products and customers.
+
+    Parameters:
+        transactions (iterable): transaction dictionaries
+        capacity (int): items monitored per sketch (default=1000)
+        sketches (dict): sketches from new_heavy_hitters() to update (optional)
+
+    Returns:
+        dict: the updated sketches
+    """
+
+    if sketches is None:
+        sketches = new_heavy_hitters(capacity)
+    for txn in transactions:
+        add_heavy_hitters(sketches, txn)
+    return sketches
+
+
+def add_heavy_hitters(sketches, txn, amount=None):
+    """
+    Adds one transaction to the sketches from new_heavy_hitters().
+
+    amount (Quantity * UnitPrice) may be passed in when already computed.
+    """
+    if amount is None:
+        amount = txn["Quantity"] * txn["UnitPrice"]
+    product = txn["ProductName"]
+    cust_id = txn["CustomerID"]
+    sketches["product_quantity"].add(product, txn["Quantity"])
+    sketches["product_revenue"].add(product, amount)
+    sketches["customer_spent"].add(cust_id, amount)
+    sketches["customer_orders"].add(cust_id, 1)
+
+
+def merge_heavy_hitters(sketches, other):
+    """
+    Merges heavy-hitter sketches from another shard or run into sketches.
+    """
+    for metric in HEAVY_HITTER_METRICS:
+        sketches[metric].merge(other[metric])
+    return sketches
+
+
+def heavy_hitter_top_products(sketches, n=5, by="quantity"):
+    """
+    Estimated top n products, in the (ProductName, TotalQuantity, TotalRevenue)
+    format of top_selling_products(); each total may be overestimated by at most
+    the matching sketch's error_bound (0 while the sketch has dropped nothing).
+    """
+    if by not in ("quantity", "revenue"):
+        raise ValueError(f"Unknown product metric: {by}")
+    quantities, revenues = sketches["product_quantity"], sketches["product_revenue"]
+    ranked = quantities if by == "quantity" else revenues
+    return [
+        (product, quantities.estimate(product)[0], revenues.estimate(product)[0])
+        for product, _, _ in ranked.top(n)
+    ]
+
+
+def heavy_hitter_top_customers(sketches, n=5):
+    """
+    Estimated top n customers by spend, in the format of top_customers().
+
+    products_bought is not tracked in sketch mode and is always empty.
+    """
+    orders = sketches["customer_orders"]
+    top = {}
+    for cust_id, total_spent, _ in sketches["customer_spent"].top(n):
+        purchase_count = orders.estimate(cust_id)[0]
+        top[cust_id] = {
+            "total_spent": total_spent,
+            "purchase_count": purchase_count,
+            "products_bought": [],
+            "avg_order_value": round(total_spent / purchase_count, 2) if purchase_count else 0,
+        }
+    return top
+
+
+def heavy_hitter_error_bounds(sketches):
+    """
+    Returns {metric: maximum overestimate} for every sketch (see SpaceSaving.error_bound).
+    """
+    return {metric: sketch.error_bound for metric, sketch in sketches.items()}
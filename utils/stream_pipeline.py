@@ -0,0 +1,163 @@
+from utils.file_handler import iter_sales_data
+from utils.parse_transactions import iter_parse_transactions
+from utils.validate_filter import iter_validate_and_filter, FILTER_COUNTS
+from utils.dedup import new_id_set, default_store_path, DEFAULT_CAPACITY
+from utils.sales_aggregator import (
+    new_accumulators,
+    accumulate_transaction,
+    finalize_analysis,
+    new_enrichment_summary,
+    accumulate_enrichment,
+    finalize_enrichment,
+)
+from utils.enriched_writer import EnrichedWriter, guess_enriched_format
+from utils.instrumentation import instrumented
+
+
+def count_lines(lines, stats):
+    """
+    Passes lines through, counting them in stats['lines'].
+    """
+    stats["lines"] = 0
+    for line in lines:
+        stats["lines"] += 1
+        yield line
+
+
+def aggregate_lines(
+    lines,
+    acc,
+    region=None,
+    min_amount=None,
+    max_amount=None,
+    filter_summary=None,
+    product_mapping=None,
+    enrichment=None,
+    out=None,
+    seen=None,
+):
+    """
+    Parses, validates, deduplicates, filters, optionally enriches and accumulates raw lines.
+
+    Parameters:
+        lines (iterable): raw transaction lines (no header)
+        acc (dict): accumulator state from new_accumulators(), updated in place
+        region, min_amount, max_amount: optional filters (see validate_and_filter())
+        filter_summary (dict): running counts from iter_validate_and_filter() (optional)
+        product_mapping (dict): mapping from create_product_mapping() (optional)
+        enrichment (dict): enrichment summary updated in place (optional, needs product_mapping)
+        out (EnrichedWriter): receives every enriched row (optional, needs product_mapping)
+        seen: ID set from new_id_set(), updated in place; valid rows whose TransactionID
+              it already holds are dropped and counted as 'duplicates' (optional)
+    """
+
+    valid_txns = iter_validate_and_filter(
+        iter_parse_transactions(lines), region, min_amount, max_amount, summary=filter_summary, seen=seen
+    )
+
+    if product_mapping is None:
+        for txn in valid_txns:
+            accumulate_transaction(acc, txn)
+        return
+
+    # Imported here so analysis-only streaming works without the requests package
+    from utils.api_handler import iter_enrich_sales_data
+
+    for txn in iter_enrich_sales_data(valid_txns, product_mapping):
+        accumulate_transaction(acc, txn)
+        if enrichment is not None:
+            accumulate_enrichment(enrichment, txn)
+        if out is not None:
+            out.write(txn)
+
+
+@instrumented(rows_out=lambda result: result[1]["final_count"])
+def stream_sales_analysis(
+    filename,
+    region=None,
+    min_amount=None,
+    max_amount=None,
+    product_mapping=None,
+    enriched_file=None,
+    enriched_format=None,
+    top_n=5,
+    low_threshold=10,
+    distinct_error=None,
+    heavy_hitter_capacity=None,
+    dedup=None,
+    dedup_capacity=DEFAULT_CAPACITY,
+):
+    """
+    Runs read, parse, validate/deduplicate/filter, enrichment and analysis as one lazy pass.
+
+    Parameters:
+        filename (str): path of the pipe-delimited sales file
+        region (str): filter by specific region (optional)
+        min_amount (float): minimum transaction amount (optional)
+        max_amount (float): maximum transaction amount (optional)
+        product_mapping (dict): mapping from create_product_mapping() (optional);
+                                rows are enriched on the fly when given
+        enriched_file (str): path to write enriched rows to as they stream (optional)
+        enriched_format (str): 'text' or 'gzip' (default: from enriched_file); the
+                               columnar format is written in one piece from all
+                               the rows, which a stream does not keep
+        top_n (int): number of top products and customers to keep (default=5)
+        low_threshold (int): quantity threshold for low performing products (default=10)
+        distinct_error (float): estimate daily unique customers with HyperLogLog
+                                sketches of this relative error (optional)
+        heavy_hitter_capacity (int): track products and customers with Space-Saving
+                                     sketches of this capacity (optional)
+        dedup (str): drop repeated TransactionIDs, 'exact' or 'bloom' (optional,
+                     see new_id_set(); bloom mode keeps its store next to filename)
+        dedup_capacity (int): IDs the bloom filter is sized for
+
+    Returns:
+        tuple: (analysis, filter_summary)
+        - analysis: dict from finalize_analysis(), with an 'enrichment' summary
+          when product_mapping is given and a 'duplicates' count when dedup is set
+        - filter_summary: counts from iter_validate_and_filter() (and 'duplicates')
+
+    Requirements:
+    - Never materialize the file, the parsed rows or the filtered rows as lists
+    - Memory depends on the number of distinct regions, products, customers and dates only
+      (plus the TransactionIDs in exact dedup mode; bloom mode keeps them on disk)
+    """
+
+    filter_summary = {}
+    acc = new_accumulators(distinct_error, heavy_hitter_capacity)
+    enrichment = new_enrichment_summary() if product_mapping is not None else None
+    out = None
+    seen = None
+    if dedup:
+        # Nothing is saved across runs here, so only bloom mode needs its store
+        seen = new_id_set(dedup, default_store_path(filename) if dedup == "bloom" else None, dedup_capacity)
+
+    if enriched_file and product_mapping is not None:
+        enriched_format = enriched_format or guess_enriched_format(enriched_file)
+        if enriched_format == "columnar":
+            raise ValueError("The columnar enriched format holds every row until it is written (drop --stream)")
+        # Formatting and writing overlap the pass in the writer thread
+        out = EnrichedWriter(enriched_file, enriched_format, background=True)
+
+    try:
+        aggregate_lines(
+            iter_sales_data(filename), acc, region, min_amount, max_amount,
+            filter_summary=filter_summary,
+            product_mapping=product_mapping,
+            enrichment=enrichment,
+            out=out,
+            seen=seen,
+        )
+    finally:
+        if out is not None:
+            out.close()
+        if seen is not None:
+            seen.close()
+
+    analysis = finalize_analysis(acc, top_n=top_n, low_threshold=low_threshold)
+    if enrichment is not None:
+        analysis["enrichment"] = finalize_enrichment(enrichment)
+    if seen is not None:
+        analysis["duplicates"] = filter_summary["duplicates"]
+
+    return analysis, filter_summary
@@ -0,0 +1,162 @@
+import io
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils.instrumentation import stage, count_rows
+
+DEFAULT_WORKERS = 4
+
+
+class _ThreadStdout:
+    """
+    sys.stdout stand-in that sends the writes of a thread to its capture buffer, if it has one.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class TaskGraph:
+    """
+    Runs named tasks on a thread pool as soon as the tasks they depend on finish.
+
+    A task is submitted to the pool only once all its dependencies have results,
+    so waiting tasks never hold a worker and the graph cannot deadlock on a small
+    pool. Each task runs as an instrumentation stage of its own name.
+
+    With capture_output=True, whatever a task prints is kept (see output())
+    instead of going to the console, so the caller can print it in step order
+    rather than interleaved with other tasks and with input() prompts.
+
+    Example:
+        with TaskGraph() as graph:
+            graph.add("catalog", load_catalog)          # starts right away
+            valid_txns = ...                            # meanwhile, on the main thread
+            graph.set_result("valid", valid_txns)
+            graph.add("enrich", enrich, "valid", "catalog")
+            enriched = graph.result("enrich")
+
+    Attributes:
+        futures (dict): task name -> concurrent.futures.Future
+        outputs (dict): task name -> text printed by the task (with capture_output)
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, capture_output=False):
+        self.futures = {}
+        self.outputs = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._lock = threading.Lock()
+        self._stdout = None
+        if capture_output:
+            self._stdout = sys.stdout = _ThreadStdout(sys.stdout)
+
+    def add(self, name, func, *dependencies):
+        """
+        Adds a task that calls func with the results of dependencies, in order.
+
+        Dependencies must already be in the graph (added with add() or set_result()).
+        If a dependency fails, the task fails with the same exception without running.
+
+        Returns:
+            Future: the task's future
+        """
+
+        if name in self.futures:
+            raise ValueError(f"Task '{name}' is already in the graph")
+        missing = [dep for dep in dependencies if dep not in self.futures]
+        if missing:
+            raise ValueError(f"Task '{name}' depends on unknown tasks: {', '.join(missing)}")
+
+        future = self.futures[name] = Future()
+        inputs = [self.futures[dep] for dep in dependencies]
+        remaining = [len(inputs)]
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            buffer = None
+            if self._stdout is not None:
+                buffer = self._stdout.local.buffer = io.StringIO()
+            try:
+                args = [dep.result() for dep in inputs]
+                with stage(name, count_rows(args[0]) if args else None) as record:
+                    result = func(*args)
+                    record["rows_out"] = count_rows(result)
+            except BaseException as e:
+                error, result = e, None
+            else:
+                error = None
+            finally:
+                if buffer is not None:
+                    self._stdout.local.buffer = None
+                    self.outputs[name] = buffer.getvalue()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def on_dependency_done(dep):
+            with self._lock:
+                if future.done():
+                    return
+                if dep.exception() is not None:
+                    future.set_exception(dep.exception())
+                    return
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._executor.submit(run)
+
+        if not inputs:
+            self._executor.submit(run)
+        for dep in inputs:
+            dep.add_done_callback(on_dependency_done)
+        return future
+
+    def set_result(self, name, value):
+        """
+        Adds a value computed outside the graph (e.g. on the main thread) as a finished task.
+        """
+        if name in self.futures:
+            raise ValueError(f"Task '{name}' is already in the graph")
+        future = self.futures[name] = Future()
+        future.set_result(value)
+        return future
+
+    def result(self, name, timeout=None):
+        """
+        Waits for task name and returns its result (raises its exception if it failed).
+        """
+        return self.futures[name].result(timeout)
+
+    def output(self, name):
+        """
+        Returns what a finished task printed (empty without capture_output).
+        """
+        return self.outputs.get(name, "")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        if self._stdout is not None and sys.stdout is self._stdout:
+            sys.stdout = self._stdout.stream
+        self._stdout = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # On errors, drop queued tasks but let running ones finish
+        self.shutdown(cancel_futures=exc_type is not None)
+        return False
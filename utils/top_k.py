@@ -0,0 +1,76 @@
+import heapq
+
+PRODUCT_METRICS = {"quantity": 1, "revenue": 2}
+
+
+def top_k(items, k, key):
+    """
+    Returns the k largest items by key, ties in input order.
+
+    Same result as sorted(items, key=key, reverse=True)[:k], but only a heap of
+    k items is kept: O(n log k) time, O(k) memory, and items may be any
+    iterable (it is consumed once).
+    """
+    return heapq.nlargest(k, items, key=key)
+
+
+def top_products(product_totals, k=5, by="quantity"):
+    """
+    Picks the top k products from per-product totals.
+
+    Parameters:
+        product_totals (dict): {'Mouse': {'quantity': 59, 'revenue': 39005.0}, ...}
+        k (int): number of products to return (default=5)
+        by (str): 'quantity' (default) or 'revenue'
+
+    Returns:
+        list of tuples in format:
+        [
+            (ProductName, TotalQuantity, TotalRevenue),
+            ...
+        ]
+        sorted by the chosen metric descending, ties in first-seen order
+    """
+
+    if by not in PRODUCT_METRICS:
+        raise ValueError(f"Unknown product metric: {by}")
+    position = PRODUCT_METRICS[by]
+
+    items = (
+        (product, stats["quantity"], stats["revenue"])
+        for product, stats in product_totals.items()
+    )
+    return top_k(items, k, key=lambda x: x[position])
+
+
+def top_customers(customer_totals, k=5, product_bits=None):
+    """
+    Picks the top k customers by total spent from per-customer totals.
+
+    Parameters:
+        customer_totals (dict): {'C001': {'total_spent': 95000.0, 'purchase_count': 3,
+                                          'products_bought': {'Laptop', ...}}, ...}
+        k (int): number of customers to return (default=5)
+        product_bits (ProductBits): decodes products_bought when it is a bitset
+                                    (optional)
+
+    Returns:
+        dict: the first k entries of customer_analysis(), in the same format
+
+    Requirements:
+    - Only build avg_order_value and the sorted products list for the winners
+    """
+
+    winners = top_k(customer_totals.items(), k, key=lambda x: x[1]["total_spent"])
+    return {
+        cust_id: {
+            "total_spent": stats["total_spent"],
+            "purchase_count": stats["purchase_count"],
+            "products_bought": (
+                product_bits.decode(stats["products_bought"]) if product_bits is not None
+                else sorted(stats["products_bought"])
+            ),
+            "avg_order_value": round(stats["total_spent"] / stats["purchase_count"], 2),
+        }
+        for cust_id, stats in winners
+    }
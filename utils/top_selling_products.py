@@ -1,10 +1,18 @@
-def top_selling_products(transactions, n=5):
+from utils.top_k import top_products
+from utils.rollup_cube import RollupCube
+from utils.transaction_table import encoded_columns, group_totals
+from utils.instrumentation import instrumented
+
+
+@instrumented()
+def top_selling_products(transactions, n=5, by="quantity"):
     """
     Finds top n products by total quantity sold.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        transactions (list): list of transaction dictionaries, or a RollupCube
         n (int): number of top products to return (default=5)
+        by (str): 'quantity' (default) or 'revenue' to rank by total revenue
 
     Returns:
         list of tuples in format:
@@ -18,30 +26,32 @@ def top_selling_products(transactions, n=5):
     - Calculate total quantity sold
     - Calculate total revenue for each product
     - Sort by TotalQuantity descending
-    - Return top n products
+    - Return top n products (heap selection, no full sort)
     """
 
-    product_stats = {}
-
-    # Aggregate by ProductName
-    for txn in transactions:
-        product = txn["ProductName"]
-        qty = txn["Quantity"]
-        revenue = txn["Quantity"] * txn["UnitPrice"]
-
-        if product not in product_stats:
-            product_stats[product] = {"quantity": 0, "revenue": 0.0}
-
-        product_stats[product]["quantity"] += qty
-        product_stats[product]["revenue"] += revenue
-
-    # Convert to list of tuples
-    product_list = [
-        (product, stats["quantity"], stats["revenue"])
-        for product, stats in product_stats.items()
-    ]
-
-    # Sort by quantity descending
-    product_list.sort(key=lambda x: x[1], reverse=True)
-
-    return product_list[:n]
\ No newline at end of file
+    if isinstance(transactions, RollupCube):
+        # Per-product totals straight from the cube
+        product_stats = transactions.rollup("ProductName")
+    elif encoded_columns(transactions, "ProductName"):
+        # Group a TransactionTable on its ProductName codes
+        product_stats = {
+            product: {"quantity": qty, "revenue": revenue}
+            for product, (qty, revenue, _) in group_totals(transactions, "ProductName").items()
+        }
+    else:
+        product_stats = {}
+
+        # Aggregate by ProductName
+        for txn in transactions:
+            product = txn["ProductName"]
+            qty = txn["Quantity"]
+            revenue = txn["Quantity"] * txn["UnitPrice"]
+
+            if product not in product_stats:
+                product_stats[product] = {"quantity": 0, "revenue": 0.0}
+
+            product_stats[product]["quantity"] += qty
+            product_stats[product]["revenue"] += revenue
+
+    # Keep the n largest with a heap instead of sorting every product
+    return top_products(product_stats, n, by=by)
@@ -1,13 +1,21 @@
+from utils.rollup_cube import RollupCube
+from utils.instrumentation import instrumented
+
+
+@instrumented()
 def calculate_total_revenue(transactions):
     """
     Calculates total revenue from all transactions.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        transactions (list): list of transaction dictionaries, or a RollupCube
 
     Returns:
         float: total revenue (sum of Quantity * UnitPrice)
     """
 
+    if isinstance(transactions, RollupCube):
+        return sum(cell[1] for cell in transactions.cells.values())
+
     total = sum(txn["Quantity"] * txn["UnitPrice"] for txn in transactions)
     return total
\ No newline at end of file
@@ -0,0 +1,312 @@
+from array import array
+from collections.abc import Mapping, Sequence
+
+TRANSACTION_FIELDS = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region"
+]
+ENCODED_FIELDS = ["Date", "ProductID", "ProductName", "CustomerID", "Region"]
+
+
+class EncodedColumn:
+    """
+    Dictionary-encoded column: one small integer code per row plus a lookup table.
+
+    Attributes:
+        codes (array): code of each row
+        values (list): distinct values, indexed by code
+        index (dict): value -> code
+    """
+
+    __slots__ = ("codes", "values", "index")
+
+    def __init__(self, values=None, index=None, codes=None):
+        self.values = values if values is not None else []
+        self.index = index if index is not None else {}
+        self.codes = codes if codes is not None else array("i")
+
+    def encode(self, value):
+        """
+        Returns the code for value, adding it to the lookup table if new.
+        """
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.index[value] = code
+        return code
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def take(self, row_ids):
+        """
+        Returns a column with the given rows that shares this column's lookup table.
+        """
+        codes = self.codes
+        return EncodedColumn(self.values, self.index, array("i", (codes[i] for i in row_ids)))
+
+    def __getitem__(self, row_id):
+        return self.values[self.codes[row_id]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        values = self.values
+        return (values[code] for code in self.codes)
+
+
+class TransactionRow(Mapping):
+    """
+    Read-only dictionary view of one row of a TransactionTable.
+
+    Supports txn["Quantity"], txn.get("API_Match"), "Region" in txn and txn.copy(),
+    so the analysis functions written for transaction dictionaries work unchanged.
+    """
+
+    __slots__ = ("table", "row_id")
+
+    def __init__(self, table, row_id):
+        self.table = table
+        self.row_id = row_id
+
+    def __getitem__(self, key):
+        return self.table.columns[key][self.row_id]
+
+    def __iter__(self):
+        return iter(self.table.columns)
+
+    def __len__(self):
+        return len(self.table.columns)
+
+    def copy(self):
+        return dict(self)
+
+    def __repr__(self):
+        return f"TransactionRow({dict(self)!r})"
+
+
+class TransactionTable:
+    """
+    Columnar, array-backed store of parsed transactions.
+
+    Columns:
+    - Quantity: array('q'), UnitPrice: array('d')
+    - Date, ProductID, ProductName, CustomerID, Region: EncodedColumn
+    - TransactionID: list of strings (unique per row)
+    - Extra columns (e.g. API_* from enrichment) added with add_column()
+
+    Iterating or indexing yields TransactionRow views instead of dictionaries.
+    """
+
+    def __init__(self, columns=None):
+        if columns is None:
+            columns = {
+                "TransactionID": [],
+                "Date": EncodedColumn(),
+                "ProductID": EncodedColumn(),
+                "ProductName": EncodedColumn(),
+                "Quantity": array("q"),
+                "UnitPrice": array("d"),
+                "CustomerID": EncodedColumn(),
+                "Region": EncodedColumn(),
+            }
+        self.columns = columns
+
+    @classmethod
+    def from_records(cls, transactions):
+        """
+        Builds a table from transaction dictionaries (e.g. iter_parse_transactions()).
+        """
+        table = cls()
+        for txn in transactions:
+            table.append(txn)
+        return table
+
+    def append(self, txn):
+        """
+        Appends one transaction dictionary with the TRANSACTION_FIELDS keys.
+        """
+        columns = self.columns
+        for field in TRANSACTION_FIELDS:
+            columns[field].append(txn[field])
+
+    def add_column(self, name, column):
+        """
+        Adds (or replaces) a column; it must have one entry per row.
+        """
+        if len(column) != len(self):
+            raise ValueError(f"Column '{name}' has {len(column)} rows, table has {len(self)}")
+        self.columns[name] = column
+
+    def take(self, row_ids):
+        """
+        Returns a new table with the given rows, sharing the lookup tables.
+        """
+        columns = {}
+        for name, column in self.columns.items():
+            if isinstance(column, EncodedColumn):
+                columns[name] = column.take(row_ids)
+            elif isinstance(column, array):
+                columns[name] = array(column.typecode, (column[i] for i in row_ids))
+            else:
+                columns[name] = [column[i] for i in row_ids]
+        return TransactionTable(columns)
+
+    def to_records(self):
+        """
+        Returns the rows as a list of plain dictionaries.
+        """
+        return [dict(row) for row in self]
+
+    def __len__(self):
+        return len(self.columns["TransactionID"])
+
+    def __getitem__(self, row_id):
+        if row_id < 0:
+            row_id += len(self)
+        if not 0 <= row_id < len(self):
+            raise IndexError("TransactionTable index out of range")
+        return TransactionRow(self, row_id)
+
+    def __iter__(self):
+        for row_id in range(len(self)):
+            yield TransactionRow(self, row_id)
+
+
+
+class EnrichedRow(Mapping):
+    """
+    Read-only dictionary view of a transaction plus the API fields of its ProductID.
+    """
+
+    __slots__ = ("txn", "fields")
+
+    def __init__(self, txn, fields):
+        self.txn = txn
+        self.fields = fields
+
+    def __getitem__(self, key):
+        fields = self.fields
+        if key in fields:
+            return fields[key]
+        return self.txn[key]
+
+    def __iter__(self):
+        yield from self.txn
+        yield from (key for key in self.fields if key not in self.txn)
+
+    def __len__(self):
+        return len(self.txn.keys() | self.fields.keys())
+
+    def copy(self):
+        return {**self.txn, **self.fields}
+
+    def __repr__(self):
+        return f"EnrichedRow({self.copy()!r})"
+
+
+class EnrichedRows(Sequence):
+    """
+    Enriched view of a list of transactions, from enrich_sales_data().
+
+    The API fields of each distinct ProductID are stored once and attached to a
+    row when it is read, so enriching copies no rows. Indexing or iterating
+    yields EnrichedRow views, slicing yields another EnrichedRows, and the view
+    compares equal to the list of enriched dictionaries it stands for. Like a
+    tuple, it is read-only.
+
+    Attributes:
+        transactions (list): the transaction dictionaries, unchanged
+        fields (dict): ProductID -> dictionary of API fields
+    """
+
+    __hash__ = None
+
+    def __init__(self, transactions, fields):
+        self.transactions = transactions
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __getitem__(self, row_id):
+        if isinstance(row_id, slice):
+            return EnrichedRows(self.transactions[row_id], self.fields)
+        txn = self.transactions[row_id]
+        return EnrichedRow(txn, self.fields[txn.get("ProductID")])
+
+    def __iter__(self):
+        fields = self.fields
+        for txn in self.transactions:
+            yield EnrichedRow(txn, fields[txn.get("ProductID")])
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(row == other_row for row, other_row in zip(self, other))
+
+    def __repr__(self):
+        return f"EnrichedRows({[row.copy() for row in self]!r})"
+
+    def to_table(self):
+        """
+        Builds an enriched TransactionTable: the transaction columns plus one
+        encoded column per API field, filled through the ProductID codes.
+        """
+        table = TransactionTable.from_records(self.transactions)
+        product_column = table.columns["ProductID"]
+        for name in next(iter(self.fields.values()), {}):
+            column = EncodedColumn()
+            code_map = [column.encode(self.fields[product_id][name]) for product_id in product_column.values]
+            column.codes.extend(code_map[code] for code in product_column.codes)
+            table.add_column(name, column)
+        return table
+
+
+def encoded_columns(table, *fields):
+    """
+    Returns the EncodedColumns of fields, or None if table is not a TransactionTable
+    with all of them encoded (callers then fall back to iterating rows).
+    """
+    if not isinstance(table, TransactionTable):
+        return None
+    columns = [table.columns.get(field) for field in fields]
+    if not all(isinstance(column, EncodedColumn) for column in columns):
+        return None
+    return columns
+
+
+def group_totals(table, field):
+    """
+    Totals quantity, revenue and row count per value of an encoded column.
+
+    Groups on the integer codes with lists indexed by code, so no string is
+    hashed per row; each value is decoded once at the end.
+
+    Parameters:
+        table (TransactionTable): table whose field column is an EncodedColumn
+        field (str): column to group by, e.g. 'Region'
+
+    Returns:
+        dict: {value: [quantity, revenue, count]} in order of first appearance in
+        the table, with revenue summed in row order (same result as a row scan)
+    """
+
+    column = table.columns[field]
+    size = len(column.values)
+    quantities = [0] * size
+    revenues = [0.0] * size
+    counts = [0] * size
+    order = []
+
+    for code, qty, price in zip(column.codes, table.columns["Quantity"], table.columns["UnitPrice"]):
+        if not counts[code]:
+            order.append(code)
+        quantities[code] += qty
+        revenues[code] += qty * price
+        counts[code] += 1
+
+    values = column.values
+    return {values[code]: [quantities[code], revenues[code], counts[code]] for code in order}
@@ -1,15 +1,112 @@
+from utils.transaction_table import TransactionTable
+from utils.instrumentation import instrumented
+
+REQUIRED_FIELDS = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region"
+]
+# Running counts kept by iter_validate_and_filter() (plus 'duplicates' with dedup)
+FILTER_COUNTS = ["total_input", "invalid", "filtered_by_region", "filtered_by_amount", "final_count"]
+
+
+def is_valid_transaction(txn):
+    """
+    Checks a single transaction against the validation rules of validate_and_filter().
+
+    Parameters:
+        txn (dict): transaction dictionary
+
+    Returns:
+        bool: True if the transaction is valid
+    """
+
+    # Check all required fields present
+    if not all(field in txn and txn[field] for field in REQUIRED_FIELDS):
+        return False
+
+    # Check rules
+    if txn["Quantity"] <= 0 or txn["UnitPrice"] <= 0:
+        return False
+    if not txn["TransactionID"].startswith("T"):
+        return False
+    if not txn["ProductID"].startswith("P"):
+        return False
+    if not txn["CustomerID"].startswith("C"):
+        return False
+
+    return True
+
+
+def iter_validate_and_filter(transactions, region=None, min_amount=None, max_amount=None, summary=None, seen=None):
+    """
+    Lazily validates transactions and applies optional filters.
+
+    Parameters:
+        transactions (iterable): transaction dictionaries, e.g. from iter_parse_transactions()
+        region (str): filter by specific region (optional)
+        min_amount (float): minimum transaction amount (Quantity * UnitPrice) (optional)
+        max_amount (float): maximum transaction amount (optional)
+        summary (dict): dictionary updated with running counts (optional):
+                        total_input, invalid, filtered_by_region, filtered_by_amount, final_count
+                        (and duplicates, with seen)
+        seen: ID set from new_id_set(), updated in place (optional); valid rows
+              whose TransactionID it already holds are dropped as duplicates
+              before the filters, and only valid rows are recorded
+
+    Yields:
+        transactions that pass validation and all filters, in input order
+    """
+
+    if summary is None:
+        summary = {}
+    for key in FILTER_COUNTS:
+        summary.setdefault(key, 0)
+    if seen is not None:
+        summary.setdefault("duplicates", 0)
+
+    check_amount = min_amount is not None or max_amount is not None
+
+    for txn in transactions:
+        summary["total_input"] += 1
+
+        if not is_valid_transaction(txn):
+            summary["invalid"] += 1
+            continue
+
+        if seen is not None and not seen.add(txn["TransactionID"]):
+            summary["duplicates"] += 1
+            continue
+
+        if region and txn["Region"] != region:
+            summary["filtered_by_region"] += 1
+            continue
+
+        if check_amount:
+            amount = txn["Quantity"] * txn["UnitPrice"]
+            if (min_amount is not None and amount < min_amount) or (
+                max_amount is not None and amount > max_amount
+            ):
+                summary["filtered_by_amount"] += 1
+                continue
+
+        summary["final_count"] += 1
+        yield txn
+
+
+@instrumented()
 def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
     """
     Validates transactions and applies optional filters.
 
     Parameters:
-        transactions (list): list of transaction dictionaries
+        transactions (list): list of transaction dictionaries or a TransactionTable
         region (str): filter by specific region (optional)
         min_amount (float): minimum transaction amount (Quantity * UnitPrice) (optional)
         max_amount (float): maximum transaction amount (optional)
 
     Returns:
         tuple: (valid_transactions, invalid_count)
+        valid_transactions is a TransactionTable when a table is passed in
 
     Validation Rules:
     - Quantity must be > 0
@@ -23,77 +120,56 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     - Print available regions to user before filtering
     - Print transaction amount range (min/max) to user
     - Show count of records after each filter applied
-    """
 
-    required_fields = [
-        "TransactionID", "Date", "ProductID", "ProductName",
-        "Quantity", "UnitPrice", "CustomerID", "Region"
-    ]
+    To run many filter combinations on the same rows, build a FilterIndex
+    (utils/filter_index.py) once and call its select() instead.
+    """
 
-    total_input = len(transactions)
+    is_table = isinstance(transactions, TransactionTable)
+    check_amount = min_amount is not None or max_amount is not None
     invalid_count = 0
-    valid_records = []
-
-    # Step 1: Validation
-    for txn in transactions:
-        # Check all required fields present
-        if not all(field in txn and txn[field] for field in required_fields):
+    regions = set()
+    min_seen = max_seen = None
+    in_region = 0
+    filtered_records = []
+
+    # One pass: validation, the displayed region and amount range, and both filters
+    for row_id, txn in enumerate(transactions):
+        if not is_valid_transaction(txn):
             invalid_count += 1
             continue
 
-        # Check rules
-        if txn["Quantity"] <= 0 or txn["UnitPrice"] <= 0:
-            invalid_count += 1
-            continue
-        if not txn["TransactionID"].startswith("T"):
-            invalid_count += 1
-            continue
-        if not txn["ProductID"].startswith("P"):
-            invalid_count += 1
+        txn_region = txn["Region"]
+        amount = txn["Quantity"] * txn["UnitPrice"]
+        regions.add(txn_region)
+        if min_seen is None or amount < min_seen:
+            min_seen = amount
+        if max_seen is None or amount > max_seen:
+            max_seen = amount
+
+        if region and txn_region != region:
             continue
-        if not txn["CustomerID"].startswith("C"):
-            invalid_count += 1
+        in_region += 1
+        if check_amount and (
+            (min_amount is not None and amount < min_amount) or (max_amount is not None and amount > max_amount)
+        ):
             continue
+        filtered_records.append(row_id if is_table else txn)
 
-        valid_records.append(txn)
-
-    # Step 2: Display available regions
-    regions = sorted(set(txn["Region"] for txn in valid_records if txn.get("Region")))
-    print(f"Available regions: {', '.join(regions)}")
-
-    # Step 3: Display transaction amount range
-    amounts = [txn["Quantity"] * txn["UnitPrice"] for txn in valid_records]
-    if amounts:
-        print(f"Transaction amount range: min={min(amounts)}, max={max(amounts)}")
+    # Display available regions
+    print(f"Available regions: {', '.join(sorted(region for region in regions if region))}")
 
-    # Step 4: Apply filters
-    filtered_by_region = 0
-    filtered_by_amount = 0
-    filtered_records = valid_records
+    # Display transaction amount range
+    if min_seen is not None:
+        print(f"Transaction amount range: min={min_seen}, max={max_seen}")
 
+    # Show count of records after each filter applied
     if region:
-        before = len(filtered_records)
-        filtered_records = [txn for txn in filtered_records if txn["Region"] == region]
-        filtered_by_region = before - len(filtered_records)
-        print(f"Records after region filter ({region}): {len(filtered_records)}")
-
-    if min_amount is not None or max_amount is not None:
-        before = len(filtered_records)
-        filtered_records = [
-            txn for txn in filtered_records
-            if (min_amount is None or txn["Quantity"] * txn["UnitPrice"] >= min_amount)
-            and (max_amount is None or txn["Quantity"] * txn["UnitPrice"] <= max_amount)
-        ]
-        filtered_by_amount = before - len(filtered_records)
+        print(f"Records after region filter ({region}): {in_region}")
+    if check_amount:
         print(f"Records after amount filter: {len(filtered_records)}")
 
-    # Step 5: Summary
-    filter_summary = {
-        "total_input": total_input,
-        "invalid": invalid_count,
-        "filtered_by_region": filtered_by_region,
-        "filtered_by_amount": filtered_by_amount,
-        "final_count": len(filtered_records),
-    }
+    if is_table:
+        filtered_records = transactions.take(filtered_records)
 
-    return filtered_records, invalid_count
\ No newline at end of file
+    return filtered_records, invalid_count